@@ -46,9 +46,9 @@ export const releaseEscrow = async (escrowId) => {
   return response.data;
 };
 
-// Transaction history
-export const getTransactionHistory = async () => {
-  const response = await api.get('/transactions/');
+// Transaction history (paginée par curseur : passer `next` pour la page suivante)
+export const getTransactionHistory = async (next = null) => {
+  const response = await api.get(next || '/transactions/');
   return response.data;
 };
 
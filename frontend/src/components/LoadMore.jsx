@@ -0,0 +1,13 @@
+const LoadMore = ({ hasMore, loading, onLoadMore, label = 'Voir plus de logements' }) => {
+  if (!hasMore) return null;
+
+  return (
+    <div className="text-center mt-8">
+      <button onClick={onLoadMore} disabled={loading} className="btn-secondary disabled:opacity-60">
+        {loading ? 'Chargement...' : label}
+      </button>
+    </div>
+  );
+};
+
+export default LoadMore;
@@ -4,16 +4,20 @@ import {
     Marker,
     Popup,
     useMap,
+    useMapEvents,
     LayersControl,
     GeoJSON
 } from 'react-leaflet';
 import 'leaflet/dist/leaflet.css';
 import L from 'leaflet';
 import {
+    useCallback,
     useEffect,
+    useRef,
     useState
 } from 'react';
 import {Link} from 'react-router-dom';
+import api from '../api/axios';
 
 // Custom Marker Icons (SVG Pins for perfect transparency)
 const getMarkerIcon = (type) => {
@@ -141,7 +145,204 @@ const MapUpdater = ({center, zoom, bounds}) => {
 };
 
 
-const PropertyMap = ({properties, selectedRegion, userLocation}) => { // Centre de la Guinée (Conakry) par défaut
+// Clusters pré-calculés par tuile (properties/tiles/{z}/{x}/{y}/) : le nombre de
+// marqueurs reste borné quel que soit le nombre de logements, sans charger le listing.
+const MAX_TILE_ZOOM = 18;
+const MAX_TILES = 36;
+
+const tileForPoint = (lat, lng, z) => {
+    const n = 2 ** z;
+    const clampedLat = Math.max(Math.min(lat, 85.0511), -85.0511);
+    const x = Math.floor((lng + 180) / 360 * n);
+    const y = Math.floor((1 - Math.asinh(Math.tan(clampedLat * Math.PI / 180)) / Math.PI) / 2 * n);
+    return [Math.min(Math.max(x, 0), n - 1), Math.min(Math.max(y, 0), n - 1)];
+};
+
+const visibleTiles = (map) => {
+    const z = Math.min(Math.max(Math.round(map.getZoom()), 0), MAX_TILE_ZOOM);
+    const bounds = map.getBounds();
+    const [west, north] = tileForPoint(bounds.getNorth(), bounds.getWest(), z);
+    const [east, south] = tileForPoint(bounds.getSouth(), bounds.getEast(), z);
+    const tiles = [];
+    for (let x = west; x <= east; x++) {
+        for (let y = north; y <= south; y++) {
+            tiles.push([z, x, y]);
+        }
+    }
+    return tiles.slice(0, MAX_TILES);
+};
+
+const getClusterIcon = (count) => L.divIcon({
+    className: 'custom-marker',
+    html: `
+      <div class="flex items-center justify-center w-10 h-10 rounded-full bg-primary-600 border-2 border-white shadow-lg text-white text-sm font-bold">
+        ${count}
+      </div>
+    `,
+    iconSize: [40, 40],
+    iconAnchor: [20, 20]
+});
+
+const PropertyPopup = ({property}) => (
+    <Popup maxWidth={280}
+        autoPan={true}
+        autoPanPadding={
+            [50, 50]
+    }>
+        <div className="p-1 min-w-[200px]">
+            <Link to={
+                    `/property/${
+                        property.id
+                    }`
+                }
+                className="font-bold text-primary-600 hover:text-primary-800 transition-colors block mb-1 text-base">
+                {
+                property.title
+            } </Link>
+            <p className="font-black text-gray-900 text-lg">
+                {
+                parseInt(property.price).toLocaleString()
+            }
+                GNF</p>
+            <div className="text-sm text-gray-500 mt-2 space-y-1">
+                <p className="flex items-center">
+                    <svg className="w-3.5 h-3.5 mr-1 text-gray-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                        <path strokeLinecap="round" strokeLinejoin="round"
+                            strokeWidth={2}
+                            d="M17.657 16.657L13.414 20.9a1.998 1.998 0 01-2.827 0l-4.244-4.243a8 8 0 1111.314 0z"/>
+                        <path strokeLinecap="round" strokeLinejoin="round"
+                            strokeWidth={2}
+                            d="M15 11a3 3 0 11-6 0 3 3 0 016 0z"/>
+                    </svg>
+                    {
+                    property.quartier_name
+                }, {
+                    property.secteur_name
+                } </p>
+                {
+                property.distance !== undefined && (
+                    <p className="text-primary-600 font-bold flex items-center bg-primary-50 px-2 py-0.5 rounded-lg w-fit">
+                        <svg className="w-3.5 h-3.5 mr-1" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                            <path strokeLinecap="round" strokeLinejoin="round"
+                                strokeWidth={2}
+                                d="M13 7h8m0 0v8m0-8l-8 8-4-4-6 6"/>
+                        </svg>
+                        À {
+                        property.distance
+                    }
+                        km
+                    </p>
+                )
+            } </div>
+
+            <div className="mt-2 pt-2 border-t border-gray-100 flex items-center text-xs text-gray-600 font-medium">
+                <span className="mr-1.5 opacity-70">👤</span>
+                {
+                property.agent_name ? (
+                    <span>Géré par :
+                        <span className="font-bold text-gray-900">
+                            {
+                            property.agent_name
+                        }</span>
+                    </span>
+                ) : (
+                    <span>Propriétaire :
+                        <span className="font-bold text-gray-900">
+                            {
+                            property.owner_name
+                        }</span>
+                    </span>
+                )
+            } </div>
+
+            <Link to={
+                    `/property/${
+                        property.id
+                    }`
+                }
+                className="mt-3 block w-full bg-slate-800 !text-white text-center py-2.5 rounded-xl font-bold text-xs shadow-md hover:bg-slate-900 transition-colors uppercase tracking-wider">
+                VOIR DÉTAILS
+            </Link>
+        </div>
+    </Popup>
+);
+
+const TileClusters = ({properties}) => {
+    const map = useMap();
+    const cache = useRef(new Map());
+    const [clusters, setClusters] = useState([]);
+
+    const refresh = useCallback(async () => {
+        const tiles = visibleTiles(map);
+        try {
+            const results = await Promise.all(tiles.map(async ([z, x, y]) => {
+                const key = `${z}/${x}/${y}`;
+                if (!cache.current.has(key)) {
+                    const response = await api.get(`properties/tiles/${key}/`);
+                    cache.current.set(key, response.data.clusters);
+                }
+                return cache.current.get(key);
+            }));
+            setClusters(results.flat());
+        } catch (error) {
+            console.error('Erreur chargement des tuiles:', error);
+        }
+    }, [map]);
+
+    useMapEvents({moveend: refresh});
+
+    useEffect(() => {
+        refresh();
+    }, [refresh]);
+
+    const byId = new Map(properties.map((property) => [property.id, property]));
+
+    return clusters.map((cluster) => {
+        const position = [cluster.latitude, cluster.longitude];
+        if (cluster.count > 1) {
+            return (
+                <Marker key={`${cluster.latitude}:${cluster.longitude}`}
+                    position={position}
+                    icon={getClusterIcon(cluster.count)}
+                    eventHandlers={{
+                        click: () => map.setView(position, Math.min(map.getZoom() + 2, MAX_TILE_ZOOM))
+                    }}/>
+            );
+        }
+        const property = byId.get(cluster.property_id);
+        return (
+            <Marker key={cluster.property_id}
+                position={position}
+                icon={getMarkerIcon(property?.property_type)}>
+                {property ? (
+                    <PropertyPopup property={property}/>
+                ) : (
+                    <Popup>
+                        <Link to={`/property/${cluster.property_id}`}
+                            className="font-bold text-primary-600 hover:text-primary-800">
+                            Voir le logement
+                        </Link>
+                    </Popup>
+                )}
+            </Marker>
+        );
+    });
+};
+
+// Résultats d'une recherche filtrée : un marqueur par bien chargé
+const PropertyMarkers = ({properties}) => properties
+    .filter((property) => property.latitude && property.longitude)
+    .map((property) => (
+        <Marker key={property.id}
+            position={[property.latitude, property.longitude]}
+            icon={getMarkerIcon(property.property_type)}>
+            <PropertyPopup property={property}/>
+        </Marker>
+    ));
+
+// `clustered` : clusters des tuiles (tous les biens disponibles). Les tuiles ignorent
+// les filtres de recherche, une recherche filtrée passe donc clustered={false}.
+const PropertyMap = ({properties, selectedRegion, userLocation, clustered = true}) => { // Centre de la Guinée (Conakry) par défaut
     const defaultCenter = [9.6412, -13.5784];
     const defaultZoom = 7;
 
@@ -260,106 +461,13 @@ const PropertyMap = ({properties, selectedRegion, userLocation}) => { // Centre
                 )
             }
                 {
-                properties.map((property) => {
-
-                    if (property.latitude && property.longitude) {
-                        return (
-                            <Marker key={
-                                    property.id
-                                }
-                                position={
-                                    [property.latitude, property.longitude]
-                                }
-                                icon={
-                                    getMarkerIcon(property.property_type)
-                            }>
-                                <Popup maxWidth={280}
-                                    autoPan={true}
-                                    autoPanPadding={
-                                        [50, 50]
-                                }>
-                                    <div className="p-1 min-w-[200px]">
-                                        <Link to={
-                                                `/property/${
-                                                    property.id
-                                                }`
-                                            }
-                                            className="font-bold text-primary-600 hover:text-primary-800 transition-colors block mb-1 text-base">
-                                            {
-                                            property.title
-                                        } </Link>
-                                        <p className="font-black text-gray-900 text-lg">
-                                            {
-                                            parseInt(property.price).toLocaleString()
-                                        }
-                                            GNF</p>
-                                        <div className="text-sm text-gray-500 mt-2 space-y-1">
-                                            <p className="flex items-center">
-                                                <svg className="w-3.5 h-3.5 mr-1 text-gray-400" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                                                    <path strokeLinecap="round" strokeLinejoin="round"
-                                                        strokeWidth={2}
-                                                        d="M17.657 16.657L13.414 20.9a1.998 1.998 0 01-2.827 0l-4.244-4.243a8 8 0 1111.314 0z"/>
-                                                    <path strokeLinecap="round" strokeLinejoin="round"
-                                                        strokeWidth={2}
-                                                        d="M15 11a3 3 0 11-6 0 3 3 0 016 0z"/>
-                                                </svg>
-                                                {
-                                                property.quartier_name
-                                            }, {
-                                                property.secteur_name
-                                            } </p>
-                                            {
-                                            property.distance !== undefined && (
-                                                <p className="text-primary-600 font-bold flex items-center bg-primary-50 px-2 py-0.5 rounded-lg w-fit">
-                                                    <svg className="w-3.5 h-3.5 mr-1" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                                                        <path strokeLinecap="round" strokeLinejoin="round"
-                                                            strokeWidth={2}
-                                                            d="M13 7h8m0 0v8m0-8l-8 8-4-4-6 6"/>
-                                                    </svg>
-                                                    À {
-                                                    property.distance
-                                                }
-                                                    km
-                                                </p>
-                                            )
-                                        } </div>
-
-                                        <div className="mt-2 pt-2 border-t border-gray-100 flex items-center text-xs text-gray-600 font-medium">
-                                            <span className="mr-1.5 opacity-70">👤</span>
-                                            {
-                                            property.agent_name ? (
-                                                <span>Géré par :
-                                                    <span className="font-bold text-gray-900">
-                                                        {
-                                                        property.agent_name
-                                                    }</span>
-                                                </span>
-                                            ) : (
-                                                <span>Propriétaire :
-                                                    <span className="font-bold text-gray-900">
-                                                        {
-                                                        property.owner_name
-                                                    }</span>
-                                                </span>
-                                            )
-                                        } </div>
-
-                                        <Link to={
-                                                `/property/${
-                                                    property.id
-                                                }`
-                                            }
-                                            className="mt-3 block w-full bg-slate-800 !text-white text-center py-2.5 rounded-xl font-bold text-xs shadow-md hover:bg-slate-900 transition-colors uppercase tracking-wider">
-                                            VOIR DÉTAILS
-                                        </Link>
-                                    </div>
-                                </Popup>
-                            </Marker>
-                        );
-                    }
-                    return null;
-                })
-            } </MapContainer>
+                clustered ? (
+                    <TileClusters properties={properties}/>
+                ) : (
+                    <PropertyMarkers properties={properties}/>
+                )
+            }
+            </MapContainer>
         </div>
     );
 };
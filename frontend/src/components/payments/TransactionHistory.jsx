@@ -2,10 +2,13 @@ import React, { useState, useEffect } from 'react';
 import { Search, Filter, Download, ArrowUpDown, Calendar, DollarSign } from 'lucide-react';
 import { getTransactionHistory } from '../../api/paymentApi';
 import { toast } from 'react-hot-toast';
+import LoadMore from '../LoadMore';
 
 const TransactionHistory = () => {
   const [transactions, setTransactions] = useState([]);
+  const [next, setNext] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filter, setFilter] = useState('all');
   const [search, setSearch] = useState('');
 
@@ -17,6 +20,7 @@ const TransactionHistory = () => {
     try {
       const data = await getTransactionHistory();
       setTransactions(Array.isArray(data) ? data : data.results || []);
+      setNext(Array.isArray(data) ? null : data.next);
     } catch (error) {
       toast.error('Erreur lors du chargement des transactions');
       console.error(error);
@@ -25,6 +29,21 @@ const TransactionHistory = () => {
     }
   };
 
+  const loadMore = async () => {
+    if (!next || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const data = await getTransactionHistory(next);
+      setTransactions((current) => [...current, ...data.results]);
+      setNext(data.next);
+    } catch (error) {
+      toast.error('Erreur lors du chargement des transactions');
+      console.error(error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const getTransactionIcon = (type) => {
     switch (type) {
       case 'PAYMENT':
@@ -195,6 +214,7 @@ const TransactionHistory = () => {
               </div>
             </div>
           ))}
+          <LoadMore hasMore={Boolean(next)} loading={loadingMore} onLoadMore={loadMore} label="Voir plus de transactions" />
         </div>
       )}
     </div>
@@ -0,0 +1,66 @@
+import { useState, useCallback } from 'react';
+import api from '../api/axios';
+
+// Paramètres sans effet sur la carte : les tuiles ne montrent que les biens disponibles
+const MAP_NEUTRAL_PARAMS = ['is_available'];
+
+// Listing des biens paginé par curseur : la première page donne le total
+// (?with_count=1), les suivantes sont chargées en suivant `next`.
+// `filtered` indique une recherche filtrée (ou à proximité) : la carte affiche
+// alors les résultats eux-mêmes plutôt que les clusters de tous les biens.
+const usePropertyList = () => {
+  const [properties, setProperties] = useState([]);
+  const [count, setCount] = useState(0);
+  const [next, setNext] = useState(null);
+  const [filtered, setFiltered] = useState(false);
+  const [loadingMore, setLoadingMore] = useState(false);
+
+  const load = useCallback(async (endpoint = 'properties/', params = {}) => {
+    setFiltered(
+      endpoint !== 'properties/' ||
+      Object.keys(params).some((key) => !MAP_NEUTRAL_PARAMS.includes(key))
+    );
+    const response = await api.get(endpoint, { params: { ...params, with_count: 1 } });
+    const data = response.data;
+    // properties/nearby/ renvoie une liste non paginée
+    const results = Array.isArray(data) ? data : data.results || [];
+    setProperties(results);
+    setNext(Array.isArray(data) ? null : data.next);
+    setCount(data.count ?? results.length);
+    return results;
+  }, []);
+
+  const loadMore = useCallback(async () => {
+    if (!next || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await api.get(next);
+      setProperties((current) => [...current, ...response.data.results]);
+      setNext(response.data.next);
+    } catch (error) {
+      console.error('Erreur lors du chargement de la page suivante:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [next, loadingMore]);
+
+  const reset = useCallback(() => {
+    setProperties([]);
+    setCount(0);
+    setNext(null);
+    setFiltered(false);
+  }, []);
+
+  return {
+    properties,
+    count,
+    hasMore: Boolean(next),
+    filtered,
+    loadingMore,
+    load,
+    loadMore,
+    reset,
+  };
+};
+
+export default usePropertyList;
@@ -2,11 +2,21 @@ import React, { useState, useEffect } from 'react';
 import api from '../api/axios';
 import PropertyCard from '../components/PropertyCard';
 import PropertyMap from '../components/PropertyMap';
+import LoadMore from '../components/LoadMore';
+import usePropertyList from '../hooks/usePropertyList';
 
 const AdvancedSearch = () => {
-  const [properties, setProperties] = useState([]);
+  const {
+    properties,
+    count: totalCount,
+    hasMore,
+    filtered,
+    loadingMore,
+    load,
+    loadMore,
+    reset: resetProperties,
+  } = usePropertyList();
   const [loading, setLoading] = useState(false);
-  const [totalCount, setTotalCount] = useState(0);
   const [viewMode, setViewMode] = useState('grid'); // 'grid' or 'map'
   const [showFilters, setShowFilters] = useState(false); // Mobile filter toggle
 
@@ -44,9 +54,7 @@ const AdvancedSearch = () => {
   const loadInitialProperties = async () => {
     setLoading(true);
     try {
-      const response = await api.get('properties/');
-      setProperties(response.data);
-      setTotalCount(response.data.length);
+      await load('properties/');
     } catch (error) {
       console.error('Erreur lors du chargement initial:', error);
     } finally {
@@ -228,9 +236,7 @@ const AdvancedSearch = () => {
       if (filters.religion_preference) params.religion_preference = filters.religion_preference;
       if (filters.ethnic_preference) params.ethnic_preference = filters.ethnic_preference;
 
-      const response = await api.get('properties/', { params });
-      setProperties(response.data);
-      setTotalCount(response.data.length);
+      await load('properties/', params);
     } catch (error) {
       console.error('Erreur lors de la recherche:', error);
     } finally {
@@ -259,8 +265,7 @@ const AdvancedSearch = () => {
     setVilles([]);
     setQuartiers([]);
     setSecteurs([]);
-    setProperties([]);
-    setTotalCount(0);
+    resetProperties();
   };
 
   return (
@@ -565,16 +570,20 @@ const AdvancedSearch = () => {
         ) : properties.length > 0 ? (
           <>
             {viewMode === 'grid' ? (
-              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-                {properties.map((property) => (
-                  <PropertyCard key={property.id} property={property} />
-                ))}
-              </div>
+              <>
+                <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+                  {properties.map((property) => (
+                    <PropertyCard key={property.id} property={property} />
+                  ))}
+                </div>
+                <LoadMore hasMore={hasMore} loading={loadingMore} onLoadMore={loadMore} />
+              </>
             ) : (
               <div className="bg-white rounded-2xl shadow-xl p-4 border border-gray-100">
                 <PropertyMap 
                   properties={properties}
                   selectedRegion={regions.find(r => r.id === parseInt(filters.region))}
+                  clustered={!filtered}
                 />
               </div>
             )}
@@ -3,12 +3,14 @@ import api from '../api/axios';
 import PropertyMap from '../components/PropertyMap';
 import SearchFilters from '../components/SearchFilters';
 import PropertyCard from '../components/PropertyCard';
+import LoadMore from '../components/LoadMore';
 import useGeolocation from '../hooks/useGeolocation';
+import usePropertyList from '../hooks/usePropertyList';
 
 
 
 const Home = () => {
-  const [properties, setProperties] = useState([]);
+  const { properties, hasMore, filtered, loadingMore, load, loadMore } = usePropertyList();
   const [regions, setRegions] = useState([]);
   const [loading, setLoading] = useState(true);
   const [filters, setFilters] = useState({
@@ -33,18 +35,17 @@ const Home = () => {
       if (currentFilters.region) params.region = currentFilters.region;
       if (currentFilters.property_type) params.property_type = currentFilters.property_type;
       
-      const [propertiesRes, regionsRes] = await Promise.all([
-        api.get('properties/', { params }),
+      const [, regionsRes] = await Promise.all([
+        load('properties/', params),
         api.get('regions/'),
       ]);
-      setProperties(propertiesRes.data);
       setRegions(regionsRes.data);
     } catch (error) {
       console.error('Erreur lors du chargement des données:', error);
     } finally {
       setLoading(false);
     }
-  }, [filters]);
+  }, [filters, load]);
 
   useEffect(() => {
     fetchData();
@@ -81,15 +82,12 @@ const Home = () => {
         // Immediate API call once we have coordinates
         setLoading(true);
         try {
-          const response = await api.get('properties/nearby/', {
-            params: {
-              lat: coords.latitude,
-              lng: coords.longitude,
-              dist: 10
-            }
+          const results = await load('properties/nearby/', {
+            lat: coords.latitude,
+            lng: coords.longitude,
+            dist: 10
           });
-          setProperties(response.data);
-          if (response.data.length === 0) {
+          if (results.length === 0) {
             alert("Aucun logement trouvé dans un rayon de 10km autour de votre position.");
           }
         } catch (apiError) {
@@ -177,7 +175,7 @@ const Home = () => {
           <div className="w-full">
             <div className="card p-4">
               <h2 className="text-2xl font-bold mb-4">Carte des logements</h2>
-              <PropertyMap properties={properties} selectedRegion={regions.find(r => r.id.toString() === filters.region?.toString())} userLocation={userLocation} />
+              <PropertyMap properties={properties} selectedRegion={regions.find(r => r.id.toString() === filters.region?.toString())} userLocation={userLocation} clustered={!filtered} />
 
             </div>
           </div>
@@ -227,11 +225,14 @@ const Home = () => {
                 <p className="text-gray-500 font-medium">Chargement des logements...</p>
               </div>
             ) : properties.length > 0 ? (
-              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-                {properties.map((property) => (
-                  <PropertyCard key={property.id} property={property} />
-                ))}
-              </div>
+              <>
+                <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+                  {properties.map((property) => (
+                    <PropertyCard key={property.id} property={property} />
+                  ))}
+                </div>
+                <LoadMore hasMore={hasMore} loading={loadingMore} onLoadMore={loadMore} />
+              </>
             ) : (
               <div className="card p-12 text-center bg-gray-50 border-2 border-dashed border-gray-200">
                 <div className="mb-4">
@@ -4,10 +4,12 @@ import api from '../api/axios';
 import PropertyCard from '../components/PropertyCard';
 import SearchFilters from '../components/SearchFilters';
 import PropertyMap from '../components/PropertyMap';
+import LoadMore from '../components/LoadMore';
+import usePropertyList from '../hooks/usePropertyList';
 
 const Properties = () => {
   const [searchParams, setSearchParams] = useSearchParams();
-  const [properties, setProperties] = useState([]);
+  const { properties, hasMore, filtered, loadingMore, load, loadMore } = usePropertyList();
   const [regions, setRegions] = useState([]);
   const [loading, setLoading] = useState(true);
   const [viewMode, setViewMode] = useState(searchParams.get('view') || 'grid');
@@ -38,11 +40,10 @@ const Properties = () => {
       
       if (currentFilters.property_type) params.property_type = currentFilters.property_type;
       
-      const [propertiesRes, regionsRes] = await Promise.all([
-        api.get(endpoint, { params }),
+      const [, regionsRes] = await Promise.all([
+        load(endpoint, params),
         api.get('regions/'),
       ]);
-      setProperties(propertiesRes.data);
       setRegions(regionsRes.data);
     } catch (error) {
       console.error('Erreur lors du chargement des données:', error);
@@ -50,7 +51,7 @@ const Properties = () => {
     } finally {
       setLoading(false);
     }
-  }, [filters, searchParams]);
+  }, [filters, searchParams, load]);
 
 
   useEffect(() => {
@@ -195,17 +196,21 @@ const Properties = () => {
       ) : properties.length > 0 ? (
         <>
           {viewMode === 'grid' ? (
-            <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
-              {properties.map((property) => (
-                <PropertyCard key={property.id} property={property} />
-              ))}
-            </div>
+            <>
+              <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
+                {properties.map((property) => (
+                  <PropertyCard key={property.id} property={property} />
+                ))}
+              </div>
+              <LoadMore hasMore={hasMore} loading={loadingMore} onLoadMore={loadMore} />
+            </>
           ) : (
             <div className="h-[600px] w-full bg-white rounded-xl shadow-lg border border-gray-100 overflow-hidden">
                <PropertyMap 
                   properties={properties} 
                   selectedRegion={regions.find(r => r.id.toString() === filters.region?.toString())}
                   userLocation={filters.lat && filters.lng ? { latitude: filters.lat, longitude: filters.lng } : null}
+                  clustered={!filtered}
                />
             </div>
           )}
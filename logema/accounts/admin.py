@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .notifications import SENSITIVE_KINDS
+from .models import AnalyticsRollup, DailyStats, Notification, User
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'kyc_status', 'is_demarcheur', 'is_proprietaire', 'is_locataire', 'is_staff', 'is_active')
@@ -15,3 +16,29 @@ class CustomUserAdmin(UserAdmin):
     )
 
 admin.site.register(User, CustomUserAdmin)
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'channel', 'recipient', 'kind', 'status', 'attempts', 'created_at', 'sent_at')
+    list_filter = ('channel', 'status', 'kind')
+    search_fields = ('recipient',)
+    readonly_fields = ('created_at', 'sent_at', 'locked_at', 'last_error')
+
+    def get_exclude(self, request, obj=None):
+        # Le message d'une réinitialisation contient le code OTP en clair
+        if obj is not None and obj.kind in SENSITIVE_KINDS:
+            return ('message',)
+        return super().get_exclude(request, obj)
+
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'total_users', 'total_properties', 'total_mandates', 'total_occupations', 'computed_at')
+    readonly_fields = ('computed_at',)
+
+
+@admin.register(AnalyticsRollup)
+class AnalyticsRollupAdmin(admin.ModelAdmin):
+    list_display = ('period_start', 'granularity', 'source', 'region_name', 'property_type', 'status', 'count', 'amount')
+    list_filter = ('granularity', 'source', 'status')
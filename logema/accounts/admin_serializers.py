@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import User
+from .models import DailyStats, User
 from properties.models import Property, ManagementMandate
 from transactions.models import OccupationRequest
 
@@ -52,3 +52,9 @@ class AdminStatsSerializer(serializers.Serializer):
     pending_kyc = serializers.IntegerField()
     pending_mandates = serializers.IntegerField()
     available_properties = serializers.IntegerField()
+
+
+class DailyStatsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyStats
+        exclude = ['id']
@@ -0,0 +1,61 @@
+"""
+Statistiques du tableau de bord d'administration
+
+compute_stats calcule tous les compteurs de AdminStatsView et AdminAnalyticsView
+avec des agrégats conditionnels : une requête par table, à chaque appel, pour que
+les changements de statut et les suppressions apparaissent immédiatement. La
+commande `snapshot_stats` les enregistre dans DailyStats (une ligne par jour, mise
+à jour à chaque exécution) ; ces instantanés ne servent qu'à l'historique
+(/stats/history/).
+"""
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from properties.models import Property, ManagementMandate
+from transactions.models import OccupationRequest
+from .models import DailyStats, User
+
+def count_by(field, choices):
+    """Un Count(filter=...) par valeur : la répartition tient dans la même requête."""
+    return {value: Count('id', filter=Q(**{field: value})) for value, _label in choices}
+
+
+def compute_stats():
+    """Compteurs du tableau de bord, en quatre requêtes (une par table)."""
+    stats = User.objects.aggregate(
+        total_users=Count('id'),
+        pending_kyc=Count('id', filter=Q(kyc_status='PENDING')),
+        demarcheurs=Count('id', filter=Q(is_demarcheur=True)),
+        proprietaires=Count('id', filter=Q(is_proprietaire=True)),
+        locataires=Count('id', filter=Q(is_locataire=True)),
+    )
+
+    by_type = Property.objects.aggregate(
+        total_properties=Count('id'),
+        available_properties=Count('id', filter=Q(is_available=True)),
+        **count_by('property_type', Property.TYPE_CHOICES)
+    )
+    stats['total_properties'] = by_type.pop('total_properties')
+    stats['available_properties'] = by_type.pop('available_properties')
+    stats['properties_by_type'] = by_type
+
+    by_status = ManagementMandate.objects.aggregate(
+        total_mandates=Count('id'), **count_by('status', ManagementMandate.STATUS_CHOICES)
+    )
+    stats['total_mandates'] = by_status.pop('total_mandates')
+    stats['pending_mandates'] = by_status['PENDING']
+    stats['mandates_by_status'] = by_status
+
+    stats['total_occupations'] = OccupationRequest.objects.aggregate(total=Count('id'))['total']
+    return stats
+
+
+def take_snapshot():
+    """Enregistre les compteurs du jour (crée ou remplace la ligne DailyStats du jour)."""
+    now = timezone.now()
+    snapshot, _created = DailyStats.objects.update_or_create(
+        date=timezone.localdate(now),
+        defaults={**compute_stats(), 'computed_at': now},
+    )
+    return snapshot
+
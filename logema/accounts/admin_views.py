@@ -1,34 +1,45 @@
-from rest_framework import viewsets, views, status, permissions
+from datetime import timedelta
+
+from rest_framework import generics, viewsets, views, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Count
-from .models import User
+from django.utils import timezone
+from .admin_stats import compute_stats
+from .analytics import MAX_TIMESERIES_DAYS, TIMESERIES
+from .models import DailyStats, User
 from properties.models import Property, ManagementMandate
 from transactions.models import OccupationRequest
 from .admin_serializers import (
     AdminUserSerializer, AdminPropertySerializer, 
     AdminMandateSerializer, AdminStatsSerializer,
-    AdminOccupationRequestSerializer
+    AdminOccupationRequestSerializer, DailyStatsSerializer
 )
 from properties.serializers import MandateHistorySerializer
+from properties.fulltext import search as fulltext_search
 from .permissions import IsAdminUser
 
 class AdminStatsView(views.APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        data = {
-            'total_users': User.objects.count(),
-            'total_properties': Property.objects.count(),
-            'total_mandates': ManagementMandate.objects.count(),
-            'total_occupations': OccupationRequest.objects.count(),
-            'pending_kyc': User.objects.filter(kyc_status='PENDING').count(),
-            'pending_mandates': ManagementMandate.objects.filter(status='PENDING').count(),
-            'available_properties': Property.objects.filter(is_available=True).count(),
-        }
-        serializer = AdminStatsSerializer(data)
+        # Agrégats conditionnels, une requête par table (accounts.admin_stats)
+        serializer = AdminStatsSerializer(compute_stats())
         return Response(serializer.data)
 
+class AdminStatsHistoryView(generics.ListAPIView):
+    """Instantanés quotidiens (?days=30 par défaut) pour les graphiques du tableau de bord"""
+    serializer_class = DailyStatsSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = None
+
+    def get_queryset(self):
+        try:
+            days = int(self.request.query_params.get('days', 30))
+        except ValueError:
+            days = 30
+        since = timezone.localdate() - timedelta(days=days)
+        return DailyStats.objects.filter(date__gt=since).order_by('date')
+
 class AdminUserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all().order_by('-date_joined')
     serializer_class = AdminUserSerializer
@@ -41,7 +52,14 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
     serializer_class = AdminPropertySerializer
     permission_classes = [IsAdminUser]
     filterset_fields = ['property_type', 'is_available', 'secteur']
-    search_fields = ['title', 'description']
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # ?search= est servi par l'index plein texte (titre, description, repères, localisation)
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            queryset = fulltext_search(queryset, search).order_by('search_rank', '-created_at')
+        return queryset
 
 class AdminMandateViewSet(viewsets.ModelViewSet):
     queryset = ManagementMandate.objects.all().order_by('-created_at')
@@ -68,20 +86,59 @@ class AdminAnalyticsView(views.APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        # Pour simplifier, on renvoie quelques agrégations
-        # En production, on utiliserait des requêtes plus complexes par date
+        stats = compute_stats()
         users_by_role = {
-            'demarcheurs': User.objects.filter(is_demarcheur=True).count(),
-            'proprietaires': User.objects.filter(is_proprietaire=True).count(),
-            'locataires': User.objects.filter(is_locataire=True).count(),
+            'demarcheurs': stats['demarcheurs'],
+            'proprietaires': stats['proprietaires'],
+            'locataires': stats['locataires'],
         }
         
-        properties_by_type = Property.objects.values('property_type').annotate(count=Count('id'))
+        properties_by_type = [
+            {'property_type': property_type, 'count': count}
+            for property_type, count in stats['properties_by_type'].items() if count
+        ]
         
-        mandates_by_status = ManagementMandate.objects.values('status').annotate(count=Count('id'))
+        mandates_by_status = [
+            {'status': mandate_status, 'count': count}
+            for mandate_status, count in stats['mandates_by_status'].items() if count
+        ]
         
         return Response({
             'users_by_role': users_by_role,
             'properties_by_type': properties_by_type,
             'mandates_by_status': mandates_by_status,
         })
+
+
+class AdminTimeseriesView(views.APIView):
+    """
+    Séries temporelles lues dans les cubes AnalyticsRollup (commande `rollup_analytics`).
+    Paramètres : granularity=day|week, days (30 par défaut, 730 au plus), region (id), property_type.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, metric):
+        if metric not in TIMESERIES:
+            return Response({"error": "Série inconnue"}, status=status.HTTP_404_NOT_FOUND)
+
+        granularity = request.query_params.get('granularity', 'day').upper()
+        if granularity not in ('DAY', 'WEEK'):
+            return Response({"error": "Granularité invalide (day ou week)"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            days = int(request.query_params.get('days', 30))
+            filters = {}
+            if request.query_params.get('region'):
+                filters['region_id'] = int(request.query_params['region'])
+        except ValueError:
+            return Response({"error": "Paramètre numérique invalide"}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('property_type'):
+            filters['property_type'] = request.query_params['property_type']
+
+        # Borné : un grand nombre de jours déborderait timedelta et la liste des périodes
+        days = min(max(days, 0), MAX_TIMESERIES_DAYS)
+        since = timezone.localdate() - timedelta(days=days)
+        return Response({
+            'metric': metric,
+            'granularity': granularity,
+            'series': TIMESERIES[metric](granularity, since, filters),
+        })
@@ -0,0 +1,270 @@
+"""
+Cubes d'analyse de l'administration (AnalyticsRollup)
+
+La commande `rollup_analytics` lit les paiements, demandes d'occupation, visites et
+mandats par lots (`.iterator(chunk_size=...)`, seules les colonnes utiles via
+values_list), agrège chaque lot avec pandas par jour × région × type de bien × statut,
+fusionne les agrégats partiels puis en déduit le cube hebdomadaire. Les cubes de la
+fenêtre recalculée sont remplacés en une transaction. La région vient de
+PropertySearch (une jointure au lieu de toute la hiérarchie de localisation).
+
+Les séries temporelles (GMV, conversion visite → occupation → paiement, latence de
+l'escrow) sont lues dans les cubes : une requête par source, quel que soit le volume.
+Le statut est celui des lignes au moment du calcul ; une ligne qui change de statut
+passe dans la bonne cellule au prochain calcul de sa période.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from payments.models import Payment
+from properties.models import ManagementMandate
+from transactions.models import OccupationRequest, VisitVoucher
+from .models import AnalyticsRollup
+
+DIMENSIONS = ['period_start', 'source', 'region_id', 'region_name', 'property_type', 'status']
+MEASURES = ['count', 'amount', 'latency_seconds', 'latency_count']
+
+# Colonnes lues pour chaque source (absentes = vides)
+COLUMNS = ['created_at', 'status', 'region_id', 'region_name', 'property_type', 'amount', 'held_at', 'released_at']
+
+# Fenêtre maximale des séries temporelles (paramètre days)
+MAX_TIMESERIES_DAYS = 730
+
+# Paiements encaissés : comptés dans le GMV et comme conversions
+SUCCESSFUL_PAYMENTS = ['HELD_IN_ESCROW', 'RELEASED']
+
+# source -> (modèle, chemin vers le bien, colonnes propres à la source)
+SOURCES = {
+    'PAYMENT': (Payment, 'occupation_request__property', {
+        'amount': 'amount',
+        'held_at': 'escrow__held_at',
+        'released_at': 'escrow__released_at',
+    }),
+    'OCCUPATION': (OccupationRequest, 'property', {}),
+    'VISIT': (VisitVoucher, 'property', {}),
+    'MANDATE': (ManagementMandate, None, {}),
+}
+
+
+def source_values(source, since=None):
+    """
+    Lignes d'une source sous forme de tuples.
+
+    Returns:
+        (queryset values_list, noms des colonnes)
+    """
+    model, property_path, extra = SOURCES[source]
+    fields = {'created_at': 'created_at', 'status': 'status'}
+    if property_path:
+        fields['region_id'] = f'{property_path}__search_entry__region_id'
+        fields['region_name'] = f'{property_path}__search_entry__region_name'
+        fields['property_type'] = f'{property_path}__property_type'
+    else:
+        # Un mandat porte son type de bien mais pas de localisation structurée
+        fields['property_type'] = 'property_type'
+    fields.update(extra)
+
+    queryset = model.objects.order_by()
+    if since is not None:
+        queryset = queryset.filter(created_at__gte=since)
+    return queryset.values_list(*fields.values()), list(fields)
+
+
+def combine(cubes):
+    """Fusionne des agrégats partiels (mêmes dimensions) en sommant les mesures."""
+    return pd.concat(cubes).groupby(DIMENSIONS, dropna=False, sort=False)[MEASURES].sum().reset_index()
+
+
+def rollup_chunk(records, columns, source):
+    """Agrège un lot de lignes par jour (fuseau du projet) et dimensions."""
+    frame = pd.DataFrame.from_records(records, columns=columns).reindex(columns=COLUMNS)
+    created = pd.to_datetime(frame['created_at'], utc=True).dt.tz_convert(timezone.get_current_timezone())
+    latency = (
+        pd.to_datetime(frame['released_at'], utc=True) - pd.to_datetime(frame['held_at'], utc=True)
+    ).dt.total_seconds()
+
+    chunk = pd.DataFrame({
+        'period_start': created.dt.tz_localize(None).dt.normalize(),
+        'source': source,
+        'region_id': frame['region_id'].astype('Int64'),
+        'region_name': frame['region_name'].fillna(''),
+        'property_type': frame['property_type'].fillna(''),
+        'status': frame['status'],
+        'count': 1,
+        # Centimes entiers : les sommes restent exactes
+        'amount': pd.to_numeric(frame['amount']).fillna(0).mul(100).round().astype('int64'),
+        'latency_seconds': latency.fillna(0),
+        'latency_count': latency.notna().astype('int64'),
+    })
+    return combine([chunk])
+
+
+def build_cubes(since=None, chunk_size=2000):
+    """
+    Cubes quotidien et hebdomadaire des lignes créées depuis `since`.
+
+    Returns:
+        (DataFrame quotidien, DataFrame hebdomadaire), None si aucune ligne
+    """
+    daily = None
+    for source in SOURCES:
+        queryset, columns = source_values(source, since)
+        rows = queryset.iterator(chunk_size=chunk_size)
+        while True:
+            records = list(islice(rows, chunk_size))
+            if not records:
+                break
+            chunk = rollup_chunk(records, columns, source)
+            daily = chunk if daily is None else combine([daily, chunk])
+    if daily is None:
+        return None, None
+
+    weekly = daily.copy()
+    weekly['period_start'] -= pd.to_timedelta(weekly['period_start'].dt.weekday, unit='D')
+    return daily, combine([weekly])
+
+
+def cube_rows(cube, granularity, computed_at):
+    """Lignes AnalyticsRollup d'un cube pandas."""
+    if cube is None:
+        return []
+    return [
+        AnalyticsRollup(
+            granularity=granularity,
+            period_start=cell.period_start.date(),
+            source=cell.source,
+            region_id=None if pd.isna(cell.region_id) else int(cell.region_id),
+            region_name=cell.region_name,
+            property_type=cell.property_type,
+            status=cell.status,
+            count=int(cell.count),
+            amount=Decimal(int(cell.amount)).scaleb(-2),
+            latency_seconds=float(cell.latency_seconds),
+            latency_count=int(cell.latency_count),
+            computed_at=computed_at,
+        )
+        for cell in cube.itertuples(index=False)
+    ]
+
+
+def rollup_analytics(days=None, chunk_size=2000):
+    """
+    Recalcule les cubes à partir du lundi qui précède `days` jours (tout l'historique
+    si None), pour que les semaines de la fenêtre soient complètes.
+    Retourne le nombre de cellules enregistrées.
+    """
+    now = timezone.now()
+    start_day = since = None
+    if days is not None:
+        start_day = timezone.localdate(now) - timedelta(days=days)
+        start_day -= timedelta(days=start_day.weekday())
+        since = timezone.make_aware(datetime.combine(start_day, time.min))
+
+    daily, weekly = build_cubes(since, chunk_size=chunk_size)
+    rollups = cube_rows(daily, 'DAY', now) + cube_rows(weekly, 'WEEK', now)
+
+    with transaction.atomic():
+        stale = AnalyticsRollup.objects.all()
+        if start_day is not None:
+            stale = stale.filter(period_start__gte=start_day)
+        stale.delete()
+        AnalyticsRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
+
+
+def period_start(granularity, day):
+    """Début de la période contenant `day` (le lundi pour une semaine)."""
+    return day - timedelta(days=day.weekday()) if granularity == 'WEEK' else day
+
+
+def periods(granularity, since):
+    """Débuts de période de `since` à aujourd'hui (les périodes vides comptent)."""
+    step = timedelta(days=7 if granularity == 'WEEK' else 1)
+    day = period_start(granularity, since)
+    today = timezone.localdate()
+    result = []
+    while day <= today:
+        result.append(day)
+        day += step
+    return result
+
+
+def sum_by_period(source, granularity, since, filters, statuses=None, **aggregates):
+    """
+    Agrégats d'une source par période, lus dans le cube (une requête). La première
+    période est celle qui contient `since`, comme dans periods().
+    """
+    queryset = AnalyticsRollup.objects.filter(
+        granularity=granularity, source=source, period_start__gte=period_start(granularity, since), **filters
+    )
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return {row.pop('period_start'): row for row in queryset.values('period_start').annotate(**aggregates)}
+
+
+def ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if denominator else None
+
+
+def gmv_series(granularity, since, filters):
+    """Montant des paiements encaissés par période."""
+    payments = sum_by_period(
+        'PAYMENT', granularity, since, filters, statuses=SUCCESSFUL_PAYMENTS,
+        gmv=Sum('amount'), payments=Sum('count')
+    )
+    empty = {'gmv': Decimal('0'), 'payments': 0}
+    return [{'period': period, **payments.get(period, empty)} for period in periods(granularity, since)]
+
+
+def conversion_series(granularity, since, filters):
+    """Visites, demandes d'occupation et paiements encaissés créés par période, et leurs taux."""
+    visits = sum_by_period('VISIT', granularity, since, filters, total=Sum('count'))
+    occupations = sum_by_period('OCCUPATION', granularity, since, filters, total=Sum('count'))
+    payments = sum_by_period(
+        'PAYMENT', granularity, since, filters, statuses=SUCCESSFUL_PAYMENTS, total=Sum('count')
+    )
+    series = []
+    for period in periods(granularity, since):
+        visit_count = visits.get(period, {}).get('total', 0)
+        occupation_count = occupations.get(period, {}).get('total', 0)
+        payment_count = payments.get(period, {}).get('total', 0)
+        series.append({
+            'period': period,
+            'visits': visit_count,
+            'occupations': occupation_count,
+            'payments': payment_count,
+            'visit_to_occupation': ratio(occupation_count, visit_count),
+            'occupation_to_payment': ratio(payment_count, occupation_count),
+        })
+    return series
+
+
+def escrow_latency_series(granularity, since, filters):
+    """Durée moyenne (heures) entre la mise en escrow et la libération, par période de paiement."""
+    payments = sum_by_period(
+        'PAYMENT', granularity, since, filters,
+        seconds=Sum('latency_seconds'), released=Sum('latency_count')
+    )
+    series = []
+    for period in periods(granularity, since):
+        row = payments.get(period, {})
+        released = row.get('released') or 0
+        series.append({
+            'period': period,
+            'released': released,
+            'average_hours': round(row['seconds'] / released / 3600, 2) if released else None,
+        })
+    return series
+
+
+TIMESERIES = {
+    'gmv': gmv_series,
+    'conversion': conversion_series,
+    'escrow-latency': escrow_latency_series,
+}
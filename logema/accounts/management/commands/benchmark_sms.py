@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from accounts.sms_service import OrangeSMSService, reset_sms_clients
+
+
+class LegacyOrangeSMSService(OrangeSMSService):
+    """Comportement d'origine : un token neuf et des connexions neuves à chaque SMS"""
+
+    @property
+    def session(self):
+        return requests
+
+    def get_access_token(self):
+        result = self.fetch_access_token()
+        return result[0] if result else None
+
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.tokens = 0
+        self.sms = 0
+        self.connections = 0
+
+    def incr(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+def make_handler(stats, options):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Réponses keep-alive sans attente de l'ACK retardé
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            # Coût d'établissement d'une connexion (handshake TLS de l'API réelle)
+            stats.incr('connections')
+            time.sleep(options['connect_latency'])
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.path == '/oauth/v3/token':
+                stats.incr('tokens')
+                time.sleep(options['token_latency'])
+                body = {'token_type': 'Bearer', 'access_token': 'benchmark-token', 'expires_in': 3600}
+            else:
+                stats.incr('sms')
+                time.sleep(options['sms_latency'])
+                body = {'outboundSMSMessageRequest': {'resourceURL': self.path}}
+            data = json.dumps(body).encode()
+            self.send_response(201 if self.path != '/oauth/v3/token' else 200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks OrangeSMSService sends per second against a local stub of the Orange API: '
+        'legacy (token + new connection per SMS) vs cached token and shared Session.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sends', type=int, default=200)
+        parser.add_argument('--threads', nargs='+', type=int, default=[1, 8])
+        parser.add_argument('--connect-latency', type=float, default=0.03, help='Per new connection (s)')
+        parser.add_argument('--token-latency', type=float, default=0.05, help='Token endpoint (s)')
+        parser.add_argument('--sms-latency', type=float, default=0.01, help='SMS endpoint (s)')
+
+    def handle(self, *args, **options):
+        stats = StubStats()
+        server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(stats, options))
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        stub = override_settings(
+            ORANGE_SMS_API_URL=f'http://127.0.0.1:{server.server_address[1]}',
+            ORANGE_SMS_CLIENT_ID='benchmark',
+            ORANGE_SMS_CLIENT_SECRET='benchmark',
+            ORANGE_SMS_SENDER_NUMBER='tel:+224000000000',
+            DEBUG=False,
+        )
+        self.stdout.write(
+            f"{'mode':<8} {'threads':>8} {'sends':>7} {'seconds':>9} {'sends/s':>9} "
+            f"{'tokens':>7} {'conns':>7} {'failed':>7}"
+        )
+        try:
+            with stub:
+                for threads in options['threads']:
+                    for mode, service_class in (('legacy', LegacyOrangeSMSService), ('cached', OrangeSMSService)):
+                        reset_sms_clients()
+                        self._run(mode, service_class, threads, options['sends'], stats, server)
+        finally:
+            reset_sms_clients()
+            server.shutdown()
+            server.server_close()
+
+    def _run(self, mode, service_class, threads, sends, stats, server):
+        stats.tokens = stats.sms = stats.connections = 0
+        service = service_class()
+
+        def send(i):
+            return service.send_sms(f'62{i:07d}', 'Votre code de récupération Logema est : 123456.')
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            results = list(executor.map(send, range(sends)))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{mode:<8} {threads:>8} {sends:>7} {elapsed:>9.2f} {sends / elapsed:>9.1f} "
+            f"{stats.tokens:>7} {stats.connections:>7} {results.count(False):>7}"
+        )
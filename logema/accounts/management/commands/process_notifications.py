@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts import notifications
+from accounts.sms_service import reset_sms_clients
+
+
+class Command(BaseCommand):
+    help = 'Envoie les notifications en attente (SMS et emails)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Envois SMS simultanés')
+        parser.add_argument('--batch-size', type=int, default=100, help='Notifications réservées par lot')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Pause (s) quand la file est vide')
+        parser.add_argument('--once', action='store_true', help='Vider la file puis s\'arrêter')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = notifications.drain(batch_size=options['batch_size'], workers=options['workers'])
+                total += processed
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            reset_sms_clients()
+        self.stdout.write(self.style.SUCCESS(f'{total} notification(s) traitée(s)'))
@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.notifications import purge_sensitive_notifications
+from accounts.otp import purge_expired_otps
+
+
+class Command(BaseCommand):
+    help = (
+        'Supprime les codes OTP expirés et les notifications de réinitialisation traitées '
+        '(à planifier, par exemple toutes les 10 minutes)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Lignes supprimées par requête')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_otps(batch_size=options['batch_size'])
+        before = timezone.now() - timedelta(seconds=getattr(settings, 'OTP_TTL', 600))
+        notifications = purge_sensitive_notifications(before)
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} code(s) expiré(s) et {notifications} notification(s) supprimé(s)'
+        ))
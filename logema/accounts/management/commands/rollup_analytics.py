@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from accounts.analytics import rollup_analytics
+
+
+class Command(BaseCommand):
+    help = "Recalcule les cubes d'analyse (AnalyticsRollup) des dernières semaines (à planifier, par exemple chaque nuit)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=35, help='Fenêtre recalculée, alignée sur le lundi')
+        parser.add_argument('--full', action='store_true', help="Recalcule tout l'historique")
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Lignes lues par lot')
+
+    def handle(self, *args, **options):
+        days = None if options['full'] else options['days']
+        cells = rollup_analytics(days=days, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"{cells} cellule(s) d'analyse enregistrée(s)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from accounts.admin_stats import take_snapshot
+
+
+class Command(BaseCommand):
+    help = "Enregistre les statistiques du jour pour l'historique du tableau de bord (à planifier, par exemple chaque nuit)"
+
+    def handle(self, *args, **options):
+        snapshot = take_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f'Statistiques du {snapshot.date} enregistrées '
+            f'({snapshot.total_users} utilisateurs, {snapshot.total_properties} propriétés)'
+        ))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:50
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_phoneotp_email_alter_phoneotp_phone_number'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('SMS', 'SMS'), ('EMAIL', 'Email')], max_length=10)),
+                ('recipient', models.CharField(help_text='Numéro de téléphone ou adresse email', max_length=254)),
+                ('kind', models.CharField(blank=True, help_text='Origine (PASSWORD_RESET, VISIT_ACCEPTED...)', max_length=50)),
+                ('subject', models.CharField(blank=True, max_length=255)),
+                ('message', models.TextField()),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('PROCESSING', "En cours d'envoi"), ('SENT', 'Envoyée'), ('FAILED', 'Échouée')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='notification_due'), models.Index(fields=['recipient', 'sent_at'], name='notification_recipient_sent')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def delete_plaintext_otps(apps, schema_editor):
+    # Codes en clair, de courte durée : ils ne peuvent pas être convertis en empreintes
+    apps.get_model('accounts', 'PhoneOTP').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_notification'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_plaintext_otps, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='phoneotp',
+            name='otp',
+        ),
+        migrations.AddField(
+            model_name='phoneotp',
+            name='code_hash',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='phoneotp',
+            name='expires_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='phoneotp',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name='phoneotp',
+            constraint=models.UniqueConstraint(fields=('phone_number',), name='phone_otp_unique_phone'),
+        ),
+        migrations.AddConstraint(
+            model_name='phoneotp',
+            constraint=models.UniqueConstraint(fields=('email',), name='phone_otp_unique_email'),
+        ),
+        migrations.AddIndex(
+            model_name='phoneotp',
+            index=models.Index(fields=['expires_at'], name='phone_otp_expires'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_hashed_otp'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('computed_at', models.DateTimeField(help_text="Date du dernier calcul de l'instantané")),
+                ('total_users', models.PositiveIntegerField(default=0)),
+                ('pending_kyc', models.PositiveIntegerField(default=0)),
+                ('demarcheurs', models.PositiveIntegerField(default=0)),
+                ('proprietaires', models.PositiveIntegerField(default=0)),
+                ('locataires', models.PositiveIntegerField(default=0)),
+                ('total_properties', models.PositiveIntegerField(default=0)),
+                ('available_properties', models.PositiveIntegerField(default=0)),
+                ('total_mandates', models.PositiveIntegerField(default=0)),
+                ('pending_mandates', models.PositiveIntegerField(default=0)),
+                ('total_occupations', models.PositiveIntegerField(default=0)),
+                ('properties_by_type', models.JSONField(default=dict)),
+                ('mandates_by_status', models.JSONField(default=dict)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['date_joined'], name='user_date_joined'),
+        ),
+    ]
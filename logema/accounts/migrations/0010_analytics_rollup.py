@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('DAY', 'Jour'), ('WEEK', 'Semaine')], max_length=5)),
+                ('period_start', models.DateField(help_text='Premier jour de la période (lundi pour une semaine)')),
+                ('source', models.CharField(choices=[('PAYMENT', 'Paiements'), ('OCCUPATION', "Demandes d'occupation"), ('VISIT', 'Visites'), ('MANDATE', 'Mandats')], max_length=20)),
+                ('region_id', models.BigIntegerField(blank=True, null=True)),
+                ('region_name', models.CharField(blank=True, max_length=100)),
+                ('property_type', models.CharField(blank=True, max_length=20)),
+                ('status', models.CharField(help_text='Statut des lignes au moment du calcul', max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('latency_seconds', models.FloatField(default=0, help_text="Somme des durées d'escrow des paiements libérés")),
+                ('latency_count', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'source', 'period_start'], name='rollup_period')],
+            },
+        ),
+    ]
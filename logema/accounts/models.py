@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 
 class User(AbstractUser):
     ROLE_CHOICES = (
@@ -38,15 +39,154 @@ class User(AbstractUser):
         """
         return self.is_proprietaire and self.is_demarcheur
     
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Inscriptions depuis le dernier instantané (accounts.admin_stats)
+            models.Index(fields=['date_joined'], name='user_date_joined'),
+        ]
+
     def __str__(self):
         return f"{self.username} ({self.email})"
 
 class PhoneOTP(models.Model):
+    """
+    Code à usage unique en cours pour une destination (téléphone ou email),
+    géré par accounts.otp. Seule l'empreinte du code est stockée.
+    """
     phone_number = models.CharField(max_length=20, null=True, blank=True)
     email = models.EmailField(null=True, blank=True)
-    otp = models.CharField(max_length=6)
-    created_at = models.DateTimeField(auto_now_add=True)
+    code_hash = models.CharField(max_length=64)
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
     attempts = models.IntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            # Une ligne par destination (les NULL ne se heurtent pas) : upsert à chaque demande
+            models.UniqueConstraint(fields=['phone_number'], name='phone_otp_unique_phone'),
+            models.UniqueConstraint(fields=['email'], name='phone_otp_unique_email'),
+        ]
+        indexes = [
+            # Purge des codes expirés (purge_otps)
+            models.Index(fields=['expires_at'], name='phone_otp_expires'),
+        ]
+
+    def __str__(self):
+        return f"OTP for {self.phone_number or self.email}"
+
+
+class Notification(models.Model):
+    """
+    Notification (SMS ou email) en file d'envoi, traitée par la commande
+    `process_notifications` (voir accounts.notifications).
+    """
+    CHANNEL_CHOICES = (
+        ('SMS', 'SMS'),
+        ('EMAIL', 'Email'),
+    )
+
+    STATUS_CHOICES = (
+        ('PENDING', 'En attente'),
+        ('PROCESSING', 'En cours d\'envoi'),
+        ('SENT', 'Envoyée'),
+        ('FAILED', 'Échouée'),
+    )
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    recipient = models.CharField(max_length=254, help_text="Numéro de téléphone ou adresse email")
+    kind = models.CharField(max_length=50, blank=True, help_text="Origine (PASSWORD_RESET, VISIT_ACCEPTED...)")
+    subject = models.CharField(max_length=255, blank=True)
+    message = models.TextField()
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Notifications dues (claim_due)
+            models.Index(fields=['status', 'next_attempt_at'], name='notification_due'),
+            # Envois récents par destinataire (limite d'envoi)
+            models.Index(fields=['recipient', 'sent_at'], name='notification_recipient_sent'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} {self.recipient} ({self.status})"
+
+
+class DailyStats(models.Model):
+    """
+    Instantané quotidien des compteurs du tableau de bord d'administration,
+    rempli par la commande `snapshot_stats` (voir accounts.admin_stats).
+    """
+    date = models.DateField(unique=True)
+    computed_at = models.DateTimeField(help_text="Date du dernier calcul de l'instantané")
+
+    total_users = models.PositiveIntegerField(default=0)
+    pending_kyc = models.PositiveIntegerField(default=0)
+    demarcheurs = models.PositiveIntegerField(default=0)
+    proprietaires = models.PositiveIntegerField(default=0)
+    locataires = models.PositiveIntegerField(default=0)
+    total_properties = models.PositiveIntegerField(default=0)
+    available_properties = models.PositiveIntegerField(default=0)
+    total_mandates = models.PositiveIntegerField(default=0)
+    pending_mandates = models.PositiveIntegerField(default=0)
+    total_occupations = models.PositiveIntegerField(default=0)
+
+    properties_by_type = models.JSONField(default=dict)
+    mandates_by_status = models.JSONField(default=dict)
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = "Daily stats"
+
+    def __str__(self):
+        return f"Stats {self.date}"
+
+
+class AnalyticsRollup(models.Model):
+    """
+    Cellule d'un cube d'analyse : une période (jour ou semaine) × source × région ×
+    type de bien × statut. Reconstruit par la commande `rollup_analytics`
+    (voir accounts.analytics) ; les séries temporelles de l'administration le lisent.
+    """
+    GRANULARITY_CHOICES = (
+        ('DAY', 'Jour'),
+        ('WEEK', 'Semaine'),
+    )
+
+    SOURCE_CHOICES = (
+        ('PAYMENT', 'Paiements'),
+        ('OCCUPATION', "Demandes d'occupation"),
+        ('VISIT', 'Visites'),
+        ('MANDATE', 'Mandats'),
+    )
+
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period_start = models.DateField(help_text="Premier jour de la période (lundi pour une semaine)")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    region_id = models.BigIntegerField(null=True, blank=True)
+    region_name = models.CharField(max_length=100, blank=True)
+    property_type = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=20, help_text="Statut des lignes au moment du calcul")
+
+    count = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    latency_seconds = models.FloatField(default=0, help_text="Somme des durées d'escrow des paiements libérés")
+    latency_count = models.PositiveIntegerField(default=0)
+
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['granularity', 'source', 'period_start'], name='rollup_period'),
+        ]
+
     def __str__(self):
-        return f"OTP for {self.phone_number}: {self.otp}"
+        return f"{self.get_source_display()} {self.granularity} {self.period_start} ({self.status})"
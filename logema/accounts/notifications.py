@@ -0,0 +1,276 @@
+"""
+File d'envoi des notifications (SMS / email)
+
+Les vues n'appellent plus Orange ni le serveur SMTP pendant la requête : elles
+enregistrent une Notification (un INSERT, dans la transaction du changement métier).
+La commande `process_notifications` réclame les notifications dues par lot
+(SELECT ... FOR UPDATE SKIP LOCKED là où le moteur le permet), envoie les SMS en
+parallèle sur la Session partagée et les emails sur une seule connexion SMTP, puis
+réessaie les échecs avec un backoff exponentiel. Un destinataire ne reçoit pas plus
+de NOTIFICATION_RATE_LIMIT messages par fenêtre de NOTIFICATION_RATE_WINDOW secondes :
+les suivants sont reportés. Un code OTP n'est jamais envoyé expiré : une notification
+qui ne peut plus partir avant OTP_TTL est abandonnée.
+"""
+import random
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from .models import Notification
+from .sms_service import OrangeSMSService
+
+# Notifications contenant un secret (code OTP en clair) : message effacé une fois
+# la notification envoyée ou abandonnée, lignes supprimées par `purge_otps`
+SENSITIVE_KINDS = {'PASSWORD_RESET'}
+
+
+def enqueue(channel, recipient, message, subject='', kind=''):
+    """Enregistre une notification à envoyer par le worker."""
+    return Notification.objects.create(
+        channel=channel, recipient=recipient, message=message, subject=subject, kind=kind
+    )
+
+
+def notify_user(user, message, subject='', kind=''):
+    """
+    Notifie un utilisateur par SMS s'il a un numéro, sinon par email.
+    Retourne la Notification, ou None si l'utilisateur n'est pas joignable.
+    """
+    if user.phone:
+        return enqueue('SMS', user.phone, message, subject=subject, kind=kind)
+    if user.email:
+        return enqueue('EMAIL', user.email, message, subject=subject or message[:80], kind=kind)
+    return None
+
+
+def claim(notification, now):
+    """
+    Passe une notification lue en PROCESSING par un UPDATE conditionnel sur l'état lu.
+    Sans SKIP LOCKED (SQLite), deux workers peuvent lire les mêmes lignes : seul
+    celui dont l'UPDATE aboutit l'envoie. Retourne True si elle est réservée.
+    """
+    if notification.status == 'PENDING':
+        guard = {'status': 'PENDING', 'next_attempt_at__lte': now}
+    else:
+        guard = {'status': 'PROCESSING', 'locked_at': notification.locked_at}
+    if not Notification.objects.filter(pk=notification.pk, **guard).update(
+        status='PROCESSING', attempts=F('attempts') + 1, locked_at=now
+    ):
+        return False
+    notification.status = 'PROCESSING'
+    notification.attempts += 1
+    notification.locked_at = now
+    return True
+
+
+def claim_due(limit=100):
+    """
+    Réserve jusqu'à `limit` notifications dues et les passe en PROCESSING.
+    Les notifications PROCESSING dont le verrou a expiré (worker arrêté) sont reprises.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'NOTIFICATION_LOCK_TIMEOUT', 300))
+
+    with transaction.atomic():
+        queryset = Notification.objects.filter(status='PENDING', next_attempt_at__lte=now)
+        stale = Notification.objects.filter(status='PROCESSING', locked_at__lt=stale_before)
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+            stale = stale.select_for_update(skip_locked=True)
+        notifications = list(queryset.order_by('next_attempt_at')[:limit])
+        if len(notifications) < limit:
+            notifications += list(stale.order_by('locked_at')[:limit - len(notifications)])
+        if not notifications:
+            return []
+
+        notifications = [notification for notification in notifications if claim(notification, now)]
+    return notifications
+
+
+def apply_rate_limit(notifications):
+    """
+    Sépare un lot en (à envoyer, à reporter) selon la limite par destinataire,
+    en comptant les envois de la fenêtre courante (une requête) et ceux du lot.
+
+    Returns:
+        (liste à envoyer, dict notification -> date de report)
+    """
+    limit = getattr(settings, 'NOTIFICATION_RATE_LIMIT', 5)
+    window = timedelta(seconds=getattr(settings, 'NOTIFICATION_RATE_WINDOW', 3600))
+    now = timezone.now()
+
+    recent = {
+        row['recipient']: row for row in
+        Notification.objects.filter(
+            recipient__in={n.recipient for n in notifications}, status='SENT', sent_at__gte=now - window
+        ).values('recipient').annotate(sent=Count('id'), first_sent=Min('sent_at'))
+    }
+    batch_counts = Counter()
+    allowed, deferred = [], {}
+    for notification in sorted(notifications, key=lambda n: (n.created_at, n.pk)):
+        stats = recent.get(notification.recipient, {'sent': 0, 'first_sent': now})
+        if stats['sent'] + batch_counts[notification.recipient] < limit:
+            batch_counts[notification.recipient] += 1
+            allowed.append(notification)
+        else:
+            deferred[notification] = stats['first_sent'] + window
+    return allowed, deferred
+
+
+def expires_at(notification):
+    """
+    Fin de validité du contenu d'une notification (code OTP), None si elle n'expire pas.
+    Une notification expirée est abandonnée au lieu d'être envoyée.
+    """
+    if notification.kind in SENSITIVE_KINDS:
+        return notification.created_at + timedelta(seconds=getattr(settings, 'OTP_TTL', 600))
+    return None
+
+
+def drop_expired(notifications, deferred):
+    """
+    Retire d'un lot les notifications expirées, et celles dont le report (limite
+    d'envoi) dépasserait la validité du code : le destinataire recevrait un code mort.
+
+    Returns:
+        (à envoyer, reports conservés, dict notification -> motif d'abandon)
+    """
+    now = timezone.now()
+    abandoned = {}
+    for notification in notifications:
+        expiry = expires_at(notification)
+        if expiry is not None and expiry <= now:
+            abandoned[notification] = "Code expiré avant l'envoi"
+    for notification, retry_at in deferred.items():
+        expiry = expires_at(notification)
+        if expiry is not None and retry_at >= expiry:
+            abandoned[notification] = "Limite d'envoi atteinte, code expiré avant le prochain envoi possible"
+    return (
+        [n for n in notifications if n not in abandoned],
+        {n: retry_at for n, retry_at in deferred.items() if n not in abandoned},
+        abandoned,
+    )
+
+
+def send_sms(notification):
+    """Envoie un SMS. N'accède pas à la base : peut tourner dans un thread du pool."""
+    if OrangeSMSService().send_sms(notification.recipient, notification.message):
+        return None
+    return "Échec de l'envoi SMS"
+
+
+def send_emails(notifications):
+    """
+    Envoie des emails sur une seule connexion SMTP.
+
+    Returns:
+        dict notification -> message d'erreur (None si envoyé)
+    """
+    results = {}
+    if not notifications:
+        return results
+    try:
+        smtp = get_connection(fail_silently=False)
+        smtp.open()
+    except Exception as e:
+        return {notification: str(e) for notification in notifications}
+    try:
+        for notification in notifications:
+            email = EmailMessage(
+                notification.subject, notification.message, settings.DEFAULT_FROM_EMAIL,
+                [notification.recipient], connection=smtp
+            )
+            try:
+                email.send()
+                results[notification] = None
+            except Exception as e:
+                results[notification] = str(e)
+    finally:
+        smtp.close()
+    return results
+
+
+def send_batch(notifications, workers=1):
+    """
+    Envoie un lot. Retourne un dict notification -> message d'erreur (None si envoyée).
+    """
+    sms = [n for n in notifications if n.channel == 'SMS']
+    results = send_emails([n for n in notifications if n.channel == 'EMAIL'])
+    if workers <= 1:
+        results.update(zip(sms, map(send_sms, sms)))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results.update(zip(sms, executor.map(send_sms, sms)))
+    return results
+
+
+def retry_delay(attempts):
+    """Backoff exponentiel avec gigue : base, 2x base, 4x base..."""
+    base = getattr(settings, 'NOTIFICATION_RETRY_DELAY', 30)
+    return base * (2 ** (attempts - 1)) * random.uniform(1, 1.25)
+
+
+def complete(results, deferred, abandoned=None):
+    """Enregistre le résultat d'un lot en un bulk_update."""
+    abandoned = abandoned or {}
+    now = timezone.now()
+    for notification, error in results.items():
+        notification.locked_at = None
+        if error is None:
+            notification.status = 'SENT'
+            notification.sent_at = now
+            notification.last_error = ''
+        elif notification.attempts < notification.max_attempts:
+            notification.status = 'PENDING'
+            notification.next_attempt_at = now + timedelta(seconds=retry_delay(notification.attempts))
+            notification.last_error = error
+        else:
+            notification.status = 'FAILED'
+            notification.last_error = error
+        if notification.status in ('SENT', 'FAILED') and notification.kind in SENSITIVE_KINDS:
+            notification.message = ''
+    for notification, retry_at in deferred.items():
+        # Report dû à la limite d'envoi : ne compte pas comme un essai
+        notification.status = 'PENDING'
+        notification.attempts -= 1
+        notification.locked_at = None
+        notification.next_attempt_at = retry_at
+    for notification, reason in abandoned.items():
+        notification.status = 'FAILED'
+        notification.locked_at = None
+        notification.last_error = reason
+        if notification.kind in SENSITIVE_KINDS:
+            notification.message = ''
+    Notification.objects.bulk_update(
+        list(results) + list(deferred) + list(abandoned),
+        ['status', 'attempts', 'locked_at', 'next_attempt_at', 'sent_at', 'last_error', 'message']
+    )
+
+
+def drain(batch_size=100, workers=1):
+    """
+    Envoie un lot de notifications dues. Retourne le nombre de notifications traitées.
+    """
+    notifications = claim_due(batch_size)
+    if not notifications:
+        return 0
+    allowed, deferred = apply_rate_limit(notifications)
+    allowed, deferred, abandoned = drop_expired(allowed, deferred)
+    complete(send_batch(allowed, workers=workers), deferred, abandoned)
+    return len(notifications)
+
+
+def purge_sensitive_notifications(before):
+    """
+    Supprime les notifications sensibles envoyées ou abandonnées créées avant `before`.
+    Retourne le nombre de lignes supprimées.
+    """
+    return Notification.objects.filter(
+        kind__in=SENSITIVE_KINDS, status__in=['SENT', 'FAILED'], created_at__lt=before
+    ).delete()[0]
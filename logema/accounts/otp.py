@@ -0,0 +1,125 @@
+"""
+Codes à usage unique (réinitialisation du mot de passe)
+
+Une ligne PhoneOTP par destination (téléphone ou email), remplacée par un upsert à
+chaque nouvelle demande. Seule l'empreinte HMAC du code est stockée. Chaque code
+erroné incrémente `attempts` avec F() ; à OTP_MAX_ATTEMPTS la destination est bloquée.
+Le compteur survit aux nouvelles demandes : redemander un code ne rend pas de
+nouveaux essais. Il repart de zéro quand le dernier code a expiré (aucune demande
+pendant OTP_TTL) ou après une vérification réussie.
+L'empreinte et l'expiration sont aussi mises en cache : une vérification coûte une
+lecture du cache et une écriture. `purge_otps` supprime les codes expirés.
+"""
+import hashlib
+import secrets
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .models import PhoneOTP
+
+INVALID = "Code OTP invalide."
+EXPIRED = "Le code OTP a expiré."
+LOCKED = "Trop de tentatives. Réessayez dans quelques minutes."
+
+
+def get_destination(phone=None, email=None):
+    if phone:
+        return 'phone_number', phone
+    if email:
+        return 'email', email
+    raise ValueError("Un numéro de téléphone ou un email est requis")
+
+
+def hash_code(field, value, code):
+    return salted_hmac('accounts.otp', f"{field}:{value}:{code}", algorithm='sha256').hexdigest()
+
+
+def cache_key(field, value):
+    return f"otp:{field}:{hashlib.sha256(value.encode()).hexdigest()}"
+
+
+def issue_otp(phone=None, email=None):
+    """
+    Génère un code à 6 chiffres pour une destination et remplace le précédent
+    (INSERT ... ON CONFLICT DO UPDATE, en gardant le compteur d'essais).
+    Retourne le code en clair, à envoyer.
+    """
+    field, value = get_destination(phone, email)
+    ttl = getattr(settings, 'OTP_TTL', 600)
+    code = f"{secrets.randbelow(10 ** 6):06d}"
+    code_hash = hash_code(field, value, code)
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl)
+
+    # Un code expiré n'est plus en jeu : ses essais ne comptent plus
+    PhoneOTP.objects.filter(**{field: value}, expires_at__lte=now).delete()
+    # `attempts` n'est pas remis à zéro : les essais erronés restent comptés
+    PhoneOTP.objects.bulk_create(
+        [PhoneOTP(**{field: value}, code_hash=code_hash, created_at=now, expires_at=expires_at)],
+        update_conflicts=True,
+        unique_fields=[field],
+        update_fields=['code_hash', 'created_at', 'expires_at'],
+    )
+    cache.set(cache_key(field, value), (code_hash, expires_at), timeout=ttl)
+    return code
+
+
+def verify_otp(code, phone=None, email=None):
+    """
+    Vérifie et consomme un code.
+
+    Returns:
+        None si le code est valide, sinon le message d'erreur
+    """
+    field, value = get_destination(phone, email)
+    key = cache_key(field, value)
+    max_attempts = getattr(settings, 'OTP_MAX_ATTEMPTS', 5)
+
+    cached = cache.get(key)
+    # La base fait foi : le cache d'un autre processus peut garder un code remplacé
+    for from_cache in ([True] if cached is not None else []) + [False]:
+        if from_cache:
+            code_hash, expires_at = cached
+        else:
+            entry = PhoneOTP.objects.filter(**{field: value}).values_list('code_hash', 'expires_at').first()
+            if entry is None:
+                cache.delete(key)
+                return INVALID
+            code_hash, expires_at = entry
+
+        if expires_at <= timezone.now():
+            if from_cache:
+                continue
+            return EXPIRED
+
+        active = PhoneOTP.objects.filter(**{field: value}, code_hash=code_hash, attempts__lt=max_attempts)
+        if constant_time_compare(hash_code(field, value, code), code_hash):
+            # Suppression conditionnelle : un code n'est consommé qu'une fois
+            if active.delete()[0]:
+                cache.delete(key)
+                return None
+        elif active.update(attempts=F('attempts') + 1):
+            return INVALID
+
+    if PhoneOTP.objects.filter(**{field: value}, attempts__gte=max_attempts).exists():
+        return LOCKED
+    return INVALID
+
+
+def purge_expired_otps(batch_size=1000):
+    """
+    Supprime les codes expirés par lots (index sur expires_at).
+    Retourne le nombre de lignes supprimées.
+    """
+    now = timezone.now()
+    total = 0
+    while True:
+        ids = list(PhoneOTP.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += PhoneOTP.objects.filter(pk__in=ids).delete()[0]
@@ -1,73 +1,191 @@
 import requests
 import base64
 import logging
+import threading
+import time
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+
+class TokenCache:
+    """
+    Token OAuth2 partagé par tous les threads du processus.
+
+    Le token est réutilisé jusqu'à `expires_in` moins une marge de renouvellement.
+    Un seul thread à la fois appelle l'endpoint de token : les autres attendent son
+    résultat, ou gardent l'ancien token tant qu'il n'a pas expiré.
+    """
+
+    def __init__(self):
+        self.token = None
+        self.expires_at = 0
+        self.lock = threading.Lock()
+
+    def is_fresh(self, refresh_margin):
+        return self.token is not None and time.monotonic() < self.expires_at - refresh_margin
+
+    def get(self, fetch, refresh_margin):
+        """
+        Args:
+            fetch: fonction sans argument retournant (token, expires_in) ou None
+            refresh_margin: secondes avant l'expiration à partir desquelles le token est renouvelé
+        """
+        if self.is_fresh(refresh_margin):
+            return self.token
+
+        still_valid = self.token is not None and time.monotonic() < self.expires_at
+        if still_valid:
+            if not self.lock.acquire(blocking=False):
+                # Renouvellement en cours dans un autre thread
+                return self.token
+        else:
+            self.lock.acquire()
+        try:
+            if self.is_fresh(refresh_margin):
+                return self.token
+            result = fetch()
+            if result is None:
+                return self.token if still_valid else None
+            self.token, expires_in = result
+            self.expires_at = time.monotonic() + expires_in
+            return self.token
+        finally:
+            self.lock.release()
+
+    def invalidate(self, token):
+        """Oublie un token refusé par l'API (sauf s'il a déjà été remplacé)."""
+        with self.lock:
+            if self.token == token:
+                self.token = None
+                self.expires_at = 0
+
+
+_session = None
+_token_caches = {}
+_clients_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Session requests partagée par les envois SMS (keep-alive, pool de connexions).
+    """
+    global _session
+    if _session is None:
+        with _clients_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=getattr(settings, 'ORANGE_SMS_POOL_SIZE', 10),
+                    max_retries=0
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def get_token_cache(token_url, client_id):
+    key = (token_url, client_id)
+    cache = _token_caches.get(key)
+    if cache is None:
+        with _clients_lock:
+            cache = _token_caches.get(key)
+            if cache is None:
+                cache = _token_caches[key] = TokenCache()
+    return cache
+
+
+def reset_sms_clients():
+    """Ferme la Session et oublie les tokens (tests, changement de configuration)"""
+    global _session
+    with _clients_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _token_caches.clear()
+
+
 class OrangeSMSService:
     def __init__(self):
         self.client_id = getattr(settings, 'ORANGE_SMS_CLIENT_ID', '')
         self.client_secret = getattr(settings, 'ORANGE_SMS_CLIENT_SECRET', '')
         # Le numéro de l'expéditeur doit être au format tel:+224000000000
         self.sender_number = getattr(settings, 'ORANGE_SMS_SENDER_NUMBER', '')
-        self.token_url = "https://api.orange.com/oauth/v3/token"
-        
+        self.api_url = getattr(settings, 'ORANGE_SMS_API_URL', 'https://api.orange.com').rstrip('/')
+        self.token_url = f"{self.api_url}/oauth/v3/token"
+        self.refresh_margin = getattr(settings, 'ORANGE_SMS_TOKEN_REFRESH_MARGIN', 60)
+
         if self.sender_number:
-            self.sms_url = f"https://api.orange.com/smsmessaging/v1/outbound/{self.sender_number}/requests"
+            self.sms_url = f"{self.api_url}/smsmessaging/v1/outbound/{self.sender_number}/requests"
         else:
             self.sms_url = None
 
-    def get_access_token(self):
-        """Récupère le token OAuth2 d'Orange"""
-        if not self.client_id or not self.client_secret:
-            logger.error("ORANGE_SMS_CLIENT_ID or ORANGE_SMS_CLIENT_SECRET not configured")
-            return None
+    @property
+    def session(self):
+        return get_session()
+
+    @property
+    def token_cache(self):
+        return get_token_cache(self.token_url, self.client_id)
 
+    def fetch_access_token(self):
+        """
+        Demande un nouveau token OAuth2 à Orange.
+
+        Returns:
+            (token, expires_in) ou None en cas d'erreur
+        """
         auth_string = f"{self.client_id}:{self.client_secret}"
         auth_header = base64.b64encode(auth_string.encode()).decode()
-        
+
         headers = {
             "Authorization": f"Basic {auth_header}",
             "Content-Type": "application/x-www-form-urlencoded"
         }
         data = {"grant_type": "client_credentials"}
-        
+
         try:
-            response = requests.post(self.token_url, headers=headers, data=data, timeout=10)
+            response = self.session.post(self.token_url, headers=headers, data=data, timeout=10)
             response.raise_for_status()
-            return response.json().get("access_token")
+            data = response.json()
+            return data["access_token"], int(data.get("expires_in") or 3600)
         except Exception as e:
             logger.error(f"Error fetching Orange Access Token: {e}")
             return None
 
+    def get_access_token(self):
+        """Token OAuth2 d'Orange, depuis le cache du processus tant qu'il est valide"""
+        if not self.client_id or not self.client_secret:
+            logger.error("ORANGE_SMS_CLIENT_ID or ORANGE_SMS_CLIENT_SECRET not configured")
+            return None
+        return self.token_cache.get(self.fetch_access_token, self.refresh_margin)
+
+    def format_address(self, phone_number):
+        """Formate le numéro du destinataire (doit commencer par tel:+224)"""
+        clean_phone = phone_number.replace(" ", "").replace("-", "")
+        if clean_phone.startswith('tel:'):
+            return clean_phone
+        if clean_phone.startswith('+'):
+            return f"tel:{clean_phone}"
+        if clean_phone.startswith('224'):
+            return f"tel:+{clean_phone}"
+        return f"tel:+224{clean_phone}"
+
     def send_sms(self, phone_number, message):
         """Envoie un SMS via l'API Orange"""
         if not self.sms_url:
             logger.error("ORANGE_SMS_SENDER_NUMBER not configured")
             return False
 
-        # Formater le numéro du destinataire (doit commencer par tel:+224)
-        clean_phone = phone_number.replace(" ", "").replace("-", "")
-        if not clean_phone.startswith('tel:'):
-            if clean_phone.startswith('+'):
-                receiver_address = f"tel:{clean_phone}"
-            elif clean_phone.startswith('224'):
-                receiver_address = f"tel:+{clean_phone}"
-            else:
-                receiver_address = f"tel:+224{clean_phone}"
-        else:
-            receiver_address = clean_phone
-        
+        receiver_address = self.format_address(phone_number)
+
         token = self.get_access_token()
         if not token:
             return False
-            
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
-        
+
         payload = {
             "outboundSMSMessageRequest": {
                 "address": receiver_address,
@@ -77,14 +195,22 @@ class OrangeSMSService:
                 }
             }
         }
-        
+
         try:
-            response = requests.post(self.sms_url, headers=headers, json=payload, timeout=15)
+            response = self.post_sms(token, payload)
+            if response.status_code == 401:
+                # Token révoqué avant son expiration : un seul nouvel essai avec un token neuf
+                self.token_cache.invalidate(token)
+                token = self.get_access_token()
+                if not token:
+                    return False
+                response = self.post_sms(token, payload)
+
             # En développement, on affiche aussi dans la console pour débugger
             if settings.DEBUG:
                 print(f"[SMS] Vers {receiver_address}: {message}")
                 print(f"[ORANGE API RESPONSE] {response.status_code}: {response.text}")
-            
+
             response.raise_for_status()
             return True
         except Exception as e:
@@ -92,3 +218,10 @@ class OrangeSMSService:
             if hasattr(e, 'response') and e.response is not None:
                 logger.error(f"Response content: {e.response.text}")
             return False
+
+    def post_sms(self, token, payload):
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "Content-Type": "application/json"
+        }
+        return self.session.post(self.sms_url, headers=headers, json=payload, timeout=15)
@@ -5,6 +5,7 @@ from rest_framework import status
 from django.utils import timezone
 from datetime import timedelta
 from .models import User, PhoneOTP
+from .otp import issue_otp, verify_otp
 from .serializers import RegisterSerializer, UserSerializer
 
 
@@ -378,12 +379,11 @@ class PasswordResetTests(APITestCase):
 
     def test_password_reset_verify_success(self):
         """Test de la vérification OTP et réinitialisation réussie."""
-        # Creer un OTP manuel
-        PhoneOTP.objects.create(phone_number='622000000', otp='123456')
+        code = issue_otp(phone='622000000')
         
         data = {
             'phone': '622000000',
-            'otp': '123456',
+            'otp': code,
             'new_password': 'newpassword123',
             'confirm_password': 'newpassword123'
         }
@@ -398,11 +398,11 @@ class PasswordResetTests(APITestCase):
 
     def test_password_reset_verify_fail_invalid_otp(self):
         """Test avec un OTP incorrect."""
-        PhoneOTP.objects.create(phone_number='622000000', otp='123456')
+        code = issue_otp(phone='622000000')
         
         data = {
             'phone': '622000000',
-            'otp': '999999',
+            'otp': f"{(int(code) + 1) % 10 ** 6:06d}",
             'new_password': 'newpassword123',
             'confirm_password': 'newpassword123'
         }
@@ -428,11 +428,11 @@ class EmailPasswordResetTests(APITestCase):
 
     def test_password_reset_verify_email_success(self):
         """Test de la vérification OTP par email et réinitialisation réussie."""
-        PhoneOTP.objects.create(email='test@logema.com', otp='654321')
+        code = issue_otp(email='test@logema.com')
         
         data = {
             'email': 'test@logema.com',
-            'otp': '654321',
+            'otp': code,
             'new_password': 'newpassword123',
             'confirm_password': 'newpassword123'
         }
@@ -442,3 +442,595 @@ class EmailPasswordResetTests(APITestCase):
         self.user.refresh_from_db()
         self.assertTrue(self.user.check_password('newpassword123'))
         self.assertFalse(PhoneOTP.objects.filter(email='test@logema.com').exists())
+
+
+class OrangeSMSServiceTests(TestCase):
+    """Cache du token OAuth et Session partagée de OrangeSMSService, contre un serveur local"""
+
+    def setUp(self):
+        import json
+        import threading
+        import time
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from django.test import override_settings
+        from .sms_service import reset_sms_clients
+
+        test = self
+        self.token_requests = 0
+        self.connections = 0
+        self.expires_in = 3600
+        self.token_latency = 0
+        self.rejected_tokens = set()
+        self.counter_lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with test.counter_lock:
+                    test.connections += 1
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path == '/oauth/v3/token':
+                    time.sleep(test.token_latency)
+                    with test.counter_lock:
+                        test.token_requests += 1
+                        token = f'token-{test.token_requests}'
+                    code, body = 200, {'access_token': token, 'expires_in': test.expires_in}
+                elif self.headers['Authorization'].split()[-1] in test.rejected_tokens:
+                    code, body = 401, {'error': 'invalid_token'}
+                else:
+                    code, body = 201, {}
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        reset_sms_clients()
+        self.addCleanup(reset_sms_clients)
+        stub = override_settings(
+            ORANGE_SMS_API_URL=f'http://127.0.0.1:{server.server_address[1]}',
+            ORANGE_SMS_CLIENT_ID='client',
+            ORANGE_SMS_CLIENT_SECRET='secret',
+            ORANGE_SMS_SENDER_NUMBER='tel:+224000000000',
+            ORANGE_SMS_TOKEN_REFRESH_MARGIN=60,
+            DEBUG=False,
+        )
+        stub.enable()
+        self.addCleanup(stub.disable)
+
+    def send(self):
+        from .sms_service import OrangeSMSService
+        return OrangeSMSService().send_sms('620000000', 'Code : 123456')
+
+    def test_token_and_connection_reused(self):
+        """Un seul token et une seule connexion pour plusieurs SMS."""
+        for _ in range(3):
+            self.assertTrue(self.send())
+
+        self.assertEqual(self.token_requests, 1)
+        self.assertEqual(self.connections, 1)
+
+    def test_token_refreshed_before_expiry(self):
+        """Un token qui expire dans la marge de renouvellement est redemandé."""
+        self.expires_in = 30
+
+        self.assertTrue(self.send())
+        self.assertTrue(self.send())
+
+        self.assertEqual(self.token_requests, 2)
+
+    def test_concurrent_sends_fetch_token_once(self):
+        """Des envois simultanés attendent le même token au lieu d'en demander chacun un."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.token_latency = 0.2
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: self.send(), range(8)))
+
+        self.assertEqual(results, [True] * 8)
+        self.assertEqual(self.token_requests, 1)
+
+    def test_rejected_token_is_renewed_once(self):
+        """Un token refusé (401) est oublié et l'envoi est réessayé avec un token neuf."""
+        self.rejected_tokens.add('token-1')
+
+        self.assertTrue(self.send())
+        self.assertEqual(self.token_requests, 2)
+
+        self.rejected_tokens.add('token-2')
+        self.rejected_tokens.add('token-3')
+        self.assertFalse(self.send())
+
+
+class NotificationQueueTests(TestCase):
+    """File d'envoi des notifications (accounts.notifications)"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='notified', password='pass123', phone='622000001')
+
+    def test_password_reset_request_only_enqueues(self):
+        """La demande d'OTP enregistre la notification sans appeler Orange."""
+        from unittest.mock import patch
+        from .models import Notification
+
+        with patch('accounts.sms_service.OrangeSMSService.send_sms') as send_sms:
+            response = self.client.post('/api/auth/password/reset/request/', {'phone': '622000001'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        send_sms.assert_not_called()
+        notification = Notification.objects.get()
+        self.assertEqual((notification.channel, notification.recipient), ('SMS', '622000001'))
+        self.assertEqual(notification.kind, 'PASSWORD_RESET')
+        code = notification.message.split(' : ')[1][:6]
+        self.assertIsNone(verify_otp(code, phone='622000001'))
+
+    def test_reset_code_not_kept_after_sending(self):
+        """Le code en clair est effacé à l'envoi et la ligne est purgée par purge_otps."""
+        from io import StringIO
+        from unittest.mock import patch
+        from django.core.management import call_command
+        from . import notifications
+        from .models import Notification
+
+        self.client.post('/api/auth/password/reset/request/', {'phone': '622000001'})
+        with patch('accounts.notifications.OrangeSMSService.send_sms', return_value=True):
+            notifications.drain()
+
+        notification = Notification.objects.get()
+        self.assertEqual((notification.status, notification.message), ('SENT', ''))
+
+        call_command('purge_otps', stdout=StringIO())
+        self.assertTrue(Notification.objects.exists())
+        Notification.objects.update(created_at=timezone.now() - timedelta(hours=1))
+        call_command('purge_otps', stdout=StringIO())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_drain_sends_sms_and_emails(self):
+        from unittest.mock import patch
+        from django.core import mail
+        from . import notifications
+
+        sms = notifications.notify_user(self.user, "Bonjour")
+        email = notifications.enqueue('EMAIL', 'a@logema.com', "Bonjour", subject="Sujet")
+
+        with patch('accounts.notifications.OrangeSMSService.send_sms', return_value=True) as send_sms:
+            self.assertEqual(notifications.drain(workers=2), 2)
+
+        send_sms.assert_called_once_with('622000001', "Bonjour")
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['a@logema.com'])
+        for notification in (sms, email):
+            notification.refresh_from_db()
+            self.assertEqual(notification.status, 'SENT')
+            self.assertIsNotNone(notification.sent_at)
+
+    def test_failed_send_is_retried_then_abandoned(self):
+        from unittest.mock import patch
+        from . import notifications
+
+        notification = notifications.enqueue('SMS', '622000001', "Bonjour")
+        notification.max_attempts = 2
+        notification.save()
+
+        with patch('accounts.notifications.OrangeSMSService.send_sms', return_value=False):
+            notifications.drain()
+            notification.refresh_from_db()
+            self.assertEqual((notification.status, notification.attempts), ('PENDING', 1))
+            self.assertGreater(notification.next_attempt_at, timezone.now())
+
+            # Pas encore dû
+            self.assertEqual(notifications.drain(), 0)
+            Notification = type(notification)
+            Notification.objects.filter(pk=notification.pk).update(next_attempt_at=timezone.now())
+            notifications.drain()
+
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('FAILED', 2))
+        self.assertTrue(notification.last_error)
+
+    def test_rate_limit_per_recipient(self):
+        """Au-delà de la limite, les messages d'un destinataire sont reportés sans compter d'essai."""
+        from unittest.mock import patch
+        from django.test import override_settings
+        from . import notifications
+
+        for i in range(5):
+            notifications.enqueue('SMS', '622000001', f"Message {i}")
+        notifications.enqueue('SMS', '622000002', "Autre destinataire")
+
+        with override_settings(NOTIFICATION_RATE_LIMIT=3), \
+                patch('accounts.notifications.OrangeSMSService.send_sms', return_value=True) as send_sms:
+            self.assertEqual(notifications.drain(), 6)
+            self.assertEqual(send_sms.call_count, 4)
+            # Les messages reportés ne sont pas dus avant la fin de la fenêtre
+            self.assertEqual(notifications.drain(), 0)
+
+        from .models import Notification
+        deferred = Notification.objects.filter(status='PENDING')
+        self.assertEqual(deferred.count(), 2)
+        self.assertEqual(set(deferred.values_list('attempts', flat=True)), {0})
+        self.assertEqual(
+            set(deferred.values_list('message', flat=True)), {"Message 3", "Message 4"}
+        )
+
+    def test_concurrent_claim_is_exclusive(self):
+        """Deux workers ayant lu la même notification : un seul la réserve."""
+        from django.utils import timezone
+        from . import notifications
+        from .models import Notification
+
+        notifications.enqueue('SMS', '622000001', "Bonjour")
+        now = timezone.now()
+        seen_by_first = Notification.objects.get()
+        seen_by_second = Notification.objects.get()
+        self.assertTrue(notifications.claim(seen_by_first, now))
+        self.assertFalse(notifications.claim(seen_by_second, now))
+        self.assertEqual(Notification.objects.get().attempts, 1)
+
+    def test_reset_code_never_sent_expired(self):
+        """Un code de réinitialisation n'est ni reporté au-delà de OTP_TTL ni envoyé expiré."""
+        from datetime import timedelta
+        from unittest.mock import patch
+        from django.test import override_settings
+        from django.utils import timezone
+        from . import notifications
+        from .models import Notification
+
+        for i in range(2):
+            notifications.enqueue('SMS', '622000001', f"Message {i}")
+        over_limit = notifications.enqueue('SMS', '622000001', "Code 123456", kind='PASSWORD_RESET')
+        expired = notifications.enqueue('SMS', '622000002', "Code 654321", kind='PASSWORD_RESET')
+        Notification.objects.filter(pk=expired.pk).update(created_at=timezone.now() - timedelta(seconds=601))
+
+        with override_settings(NOTIFICATION_RATE_LIMIT=2, OTP_TTL=600), \
+                patch('accounts.notifications.OrangeSMSService.send_sms', return_value=True) as send_sms:
+            notifications.drain()
+        self.assertEqual(send_sms.call_count, 2)
+
+        for notification in (over_limit, expired):
+            notification.refresh_from_db()
+            self.assertEqual(notification.status, 'FAILED')
+            self.assertEqual(notification.message, '')
+
+
+class OTPTests(TestCase):
+    """Codes OTP hachés, un par destination (accounts.otp)"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_code_is_stored_hashed(self):
+        code = issue_otp(phone='622000000')
+
+        otp = PhoneOTP.objects.get(phone_number='622000000')
+        self.assertNotIn(code, otp.code_hash)
+        self.assertEqual(len(otp.code_hash), 64)
+
+    def test_new_code_replaces_previous(self):
+        """Upsert : une seule ligne par destination, l'ancien code n'est plus valable."""
+        first = issue_otp(phone='622000000')
+        second = issue_otp(phone='622000000')
+        issue_otp(email='a@logema.com')
+
+        self.assertEqual(PhoneOTP.objects.count(), 2)
+        if first != second:
+            self.assertIsNotNone(verify_otp(first, phone='622000000'))
+        self.assertIsNone(verify_otp(second, phone='622000000'))
+        # Usage unique
+        self.assertIsNotNone(verify_otp(second, phone='622000000'))
+
+    def test_verify_uses_cache_fast_path(self):
+        """Avec le cache, un code valide coûte une seule requête (la consommation)."""
+        code = issue_otp(phone='622000000')
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(verify_otp(code, phone='622000000'))
+
+    def test_stale_cache_falls_back_to_database(self):
+        """Un cache qui garde un code remplacé (autre processus) ne bloque pas le nouveau."""
+        from django.core.cache import cache
+        from .otp import cache_key
+
+        issue_otp(phone='622000000')
+        stale = cache.get(cache_key('phone_number', '622000000'))
+        code = issue_otp(phone='622000000')
+        cache.set(cache_key('phone_number', '622000000'), stale)
+
+        self.assertIsNone(verify_otp(code, phone='622000000'))
+
+    def test_attempts_are_limited(self):
+        from django.test import override_settings
+        from .otp import INVALID, LOCKED
+
+        code = issue_otp(phone='622000000')
+        wrong = f"{(int(code) + 1) % 10 ** 6:06d}"
+
+        with override_settings(OTP_MAX_ATTEMPTS=3):
+            for _ in range(3):
+                self.assertEqual(verify_otp(wrong, phone='622000000'), INVALID)
+            self.assertEqual(PhoneOTP.objects.get().attempts, 3)
+            self.assertEqual(verify_otp(code, phone='622000000'), LOCKED)
+
+    def test_reissue_keeps_attempts(self):
+        """Redemander un code ne rend pas d'essais ; le blocage tombe quand le dernier code expire."""
+        from django.test import override_settings
+        from .otp import LOCKED
+
+        code = issue_otp(phone='622000000')
+        wrong = f"{(int(code) + 1) % 10 ** 6:06d}"
+
+        with override_settings(OTP_MAX_ATTEMPTS=3):
+            for _ in range(3):
+                verify_otp(wrong, phone='622000000')
+            code = issue_otp(phone='622000000')
+            self.assertEqual(PhoneOTP.objects.get().attempts, 3)
+            self.assertEqual(verify_otp(code, phone='622000000'), LOCKED)
+
+            PhoneOTP.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+            code = issue_otp(phone='622000000')
+            self.assertEqual(PhoneOTP.objects.get().attempts, 0)
+            self.assertIsNone(verify_otp(code, phone='622000000'))
+
+    def test_expired_code_rejected_and_purged(self):
+        from io import StringIO
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from .otp import EXPIRED
+
+        code = issue_otp(phone='622000000')
+        issue_otp(phone='622000001')
+        PhoneOTP.objects.filter(phone_number='622000000').update(expires_at=timezone.now() - timedelta(seconds=1))
+        cache.clear()
+
+        self.assertEqual(verify_otp(code, phone='622000000'), EXPIRED)
+
+        call_command('purge_otps', batch_size=1, stdout=StringIO())
+        self.assertEqual(list(PhoneOTP.objects.values_list('phone_number', flat=True)), ['622000001'])
+
+
+class AdminStatsTests(APITestCase):
+    """Statistiques du tableau de bord en direct, instantanés DailyStats pour l'historique (accounts.admin_stats)"""
+
+    def setUp(self):
+        from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+        from properties.models import Property
+
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Conakry", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Kaloum", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Kipé", ville=ville)
+        self.secteur = Secteur.objects.create(name="Secteur 3", quartier=quartier)
+
+        self.admin = User.objects.create_user(username='admin', password='password123', is_staff=True)
+        self.owner = User.objects.create_user(username='owner', password='password123', is_proprietaire=True)
+        Property.objects.create(
+            owner=self.owner, title="Villa", property_type="VILLA", price=1000000, secteur=self.secteur
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def add_property(self, property_type="APPARTEMENT"):
+        from properties.models import Property
+        return Property.objects.create(
+            owner=self.owner, title="Nouveau bien", property_type=property_type, price=2000000, secteur=self.secteur
+        )
+
+    def test_counters_are_live(self):
+        """Changements de statut et suppressions apparaissent sans nouvel instantané."""
+        from io import StringIO
+        from django.core.management import call_command
+        from .models import DailyStats
+
+        call_command('snapshot_stats', stdout=StringIO())
+        self.assertEqual(DailyStats.objects.get().total_properties, 1)
+
+        extra = self.add_property()
+        User.objects.create_user(username='tenant', password='password123', is_locataire=True)
+        self.owner.kyc_status = 'VERIFIED'
+        self.owner.save(update_fields=['kyc_status'])
+
+        response = self.client.get('/api/admin/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_properties'], 2)
+        self.assertEqual(response.data['total_users'], 3)
+        self.assertEqual(response.data['pending_kyc'], 2)
+
+        response = self.client.get('/api/admin/analytics/')
+        self.assertEqual(response.data['users_by_role']['locataires'], 3)
+        self.assertEqual(
+            sorted(response.data['properties_by_type'], key=lambda row: row['property_type']),
+            [{'property_type': 'APPARTEMENT', 'count': 1}, {'property_type': 'VILLA', 'count': 1}]
+        )
+
+        extra.delete()
+        response = self.client.get('/api/admin/stats/')
+        self.assertEqual(response.data['total_properties'], 1)
+
+    def test_query_count_does_not_depend_on_rows(self):
+        """Quatre agrégats, quel que soit le volume."""
+        from .admin_stats import compute_stats
+
+        for _ in range(5):
+            self.add_property()
+        with self.assertNumQueries(4):
+            stats = compute_stats()
+        self.assertEqual(stats['total_properties'], 6)
+        self.assertEqual(stats['properties_by_type']['APPARTEMENT'], 5)
+
+    def test_history(self):
+        from .admin_stats import take_snapshot
+        from .models import DailyStats
+
+        take_snapshot()
+        DailyStats.objects.create(date=timezone.localdate() - timedelta(days=40), computed_at=timezone.now())
+
+        response = self.client.get('/api/admin/stats/history/', {'days': 7})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['date'] for row in response.data], [str(timezone.localdate())])
+
+
+class AnalyticsRollupTests(APITestCase):
+    """Cubes d'analyse et séries temporelles (accounts.analytics)"""
+
+    def setUp(self):
+        from decimal import Decimal
+        from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+        from payments.models import EscrowAccount, Payment
+        from properties.models import ManagementMandate, Property
+        from transactions.models import OccupationRequest, VisitVoucher
+
+        self.region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Conakry", region=self.region)
+        sous_prefecture = SousPrefecture.objects.create(name="Kaloum", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Kipé", ville=ville)
+        secteur = Secteur.objects.create(name="Secteur 3", quartier=quartier)
+
+        self.admin = User.objects.create_user(username='admin', password='password123', is_staff=True)
+        owner = User.objects.create_user(username='owner', password='password123', is_proprietaire=True)
+        agent = User.objects.create_user(username='agent', password='password123', is_demarcheur=True)
+        tenant = User.objects.create_user(username='tenant', password='password123')
+
+        prop = Property.objects.create(
+            owner=owner, agent=agent, title="Villa", property_type="VILLA", price=1000000, secteur=secteur
+        )
+        for _ in range(4):
+            VisitVoucher.objects.create(agent=agent, visitor=tenant, property=prop)
+        occupations = [OccupationRequest.objects.create(property=prop, user=tenant) for _ in range(2)]
+
+        held = Payment.objects.create(
+            occupation_request=occupations[0], payer=tenant, amount=Decimal('1500000.50'),
+            payment_method='ORANGE_MONEY', status='RELEASED'
+        )
+        escrow = EscrowAccount.objects.create(payment=held, held_amount=held.amount)
+        EscrowAccount.objects.filter(pk=escrow.pk).update(released_at=escrow.held_at + timedelta(hours=3))
+        Payment.objects.create(
+            occupation_request=occupations[1], payer=tenant, amount=Decimal('900000'),
+            payment_method='WAVE', status='FAILED'
+        )
+        ManagementMandate.objects.create(
+            owner=owner, property_type='STUDIO', location_description="Kipé",
+            property_description="Studio meublé", owner_phone='622000000'
+        )
+        self.client.force_authenticate(user=self.admin)
+
+    def rollup(self, **options):
+        from io import StringIO
+        from django.core.management import call_command
+        call_command('rollup_analytics', stdout=StringIO(), **options)
+
+    def test_daily_and_weekly_cubes(self):
+        from decimal import Decimal
+        from .models import AnalyticsRollup
+
+        self.rollup()
+
+        for granularity in ('DAY', 'WEEK'):
+            cells = AnalyticsRollup.objects.filter(granularity=granularity)
+            payment = cells.get(source='PAYMENT', status='RELEASED')
+            self.assertEqual(payment.region_id, self.region.pk)
+            self.assertEqual(payment.region_name, "Conakry")
+            self.assertEqual(payment.property_type, "VILLA")
+            self.assertEqual(payment.amount, Decimal('1500000.50'))
+            self.assertEqual(payment.latency_count, 1)
+            self.assertAlmostEqual(payment.latency_seconds, 3 * 3600)
+            self.assertEqual(cells.get(source='VISIT').count, 4)
+            self.assertEqual(cells.get(source='OCCUPATION').count, 2)
+            mandate = cells.get(source='MANDATE')
+            self.assertIsNone(mandate.region_id)
+            self.assertEqual(mandate.property_type, 'STUDIO')
+        self.assertEqual(
+            AnalyticsRollup.objects.get(granularity='WEEK', source='VISIT').period_start.weekday(), 0
+        )
+
+    def test_chunked_rollup_matches_single_chunk(self):
+        from .models import AnalyticsRollup
+
+        fields = ('granularity', 'period_start', 'source', 'region_id', 'property_type', 'status',
+                  'count', 'amount', 'latency_seconds', 'latency_count')
+        self.rollup(chunk_size=1)
+        chunked = sorted(AnalyticsRollup.objects.values_list(*fields), key=str)
+        self.rollup(full=True)
+        self.assertEqual(sorted(AnalyticsRollup.objects.values_list(*fields), key=str), chunked)
+
+    def test_rerun_replaces_window(self):
+        from .models import AnalyticsRollup
+
+        self.rollup()
+        cells = AnalyticsRollup.objects.count()
+        self.rollup()
+        self.assertEqual(AnalyticsRollup.objects.count(), cells)
+
+    def test_timeseries_endpoints(self):
+        from decimal import Decimal
+
+        self.rollup()
+        today = timezone.localdate()
+
+        response = self.client.get('/api/admin/analytics/timeseries/gmv/', {'days': 7})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['series']), 8)
+        self.assertEqual(response.data['series'][-1], {
+            'period': today, 'gmv': Decimal('1500000.50'), 'payments': 1
+        })
+
+        response = self.client.get('/api/admin/analytics/timeseries/conversion/', {'granularity': 'week'})
+        point = response.data['series'][-1]
+        self.assertEqual((point['visits'], point['occupations'], point['payments']), (4, 2, 1))
+        self.assertEqual(point['visit_to_occupation'], 0.5)
+        self.assertEqual(point['occupation_to_payment'], 0.5)
+
+        response = self.client.get('/api/admin/analytics/timeseries/escrow-latency/', {'region': self.region.pk})
+        self.assertEqual(response.data['series'][-1]['average_hours'], 3.0)
+
+        response = self.client.get('/api/admin/analytics/timeseries/gmv/', {'property_type': 'STUDIO'})
+        self.assertEqual(response.data['series'][-1]['gmv'], Decimal('0'))
+
+        self.assertEqual(self.client.get('/api/admin/analytics/timeseries/churn/').status_code, 404)
+        response = self.client.get('/api/admin/analytics/timeseries/gmv/', {'granularity': 'month'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_timeseries_query_count(self):
+        """Une requête par source lue, quel que soit le volume."""
+        from .analytics import conversion_series
+
+        self.rollup()
+        with self.assertNumQueries(3):
+            conversion_series('DAY', timezone.localdate() - timedelta(days=30), {})
+
+    def test_weekly_series_includes_first_week(self):
+        """La première semaine (qui contient `since`) est lue depuis son lundi."""
+        from .analytics import conversion_series, period_start
+        from .models import AnalyticsRollup
+
+        monday = period_start('WEEK', timezone.localdate() - timedelta(days=21))
+        AnalyticsRollup.objects.create(
+            granularity='WEEK', period_start=monday, source='VISIT', status='REQUESTED',
+            count=5, computed_at=timezone.now()
+        )
+        series = conversion_series('WEEK', monday + timedelta(days=2), {})
+        self.assertEqual(series[0]['period'], monday)
+        self.assertEqual(series[0]['visits'], 5)
+
+    def test_timeseries_days_clamped(self):
+        from .analytics import MAX_TIMESERIES_DAYS
+
+        response = self.client.get('/api/admin/analytics/timeseries/gmv/', {'days': 10 ** 9})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['series']), MAX_TIMESERIES_DAYS + 1)
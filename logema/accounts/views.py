@@ -1,4 +1,3 @@
-from django.core.mail import send_mail
 from django.conf import settings
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
@@ -17,10 +16,9 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         return self.request.user
 
-import random
-from .models import PhoneOTP
+from .otp import issue_otp, verify_otp
 from .serializers import PasswordResetRequestSerializer, PasswordResetVerifySerializer
-from .sms_service import OrangeSMSService
+from .notifications import enqueue
 
 class PasswordResetRequestView(generics.GenericAPIView):
     serializer_class = PasswordResetRequestSerializer
@@ -32,60 +30,23 @@ class PasswordResetRequestView(generics.GenericAPIView):
         phone = serializer.validated_data.get('phone')
         email = serializer.validated_data.get('email')
         
-        # Generer OTP (6 chiffres)
-        otp = str(random.randint(100000, 999999))
+        # Code à 6 chiffres, remplace le code en cours de la destination
+        otp = issue_otp(phone=phone, email=email)
         
-        # Sauvegarder ou mettre à jour l'OTP
+        # Envoi par le worker (process_notifications) : la requête n'attend ni Orange ni le SMTP
+        message = f"Votre code de récupération Logema est : {otp}. Ne le partagez pas."
         if phone:
-            PhoneOTP.objects.filter(phone_number=phone).delete() # Clean old ones to avoid ambiguity
-            PhoneOTP.objects.create(phone_number=phone, otp=otp)
-        elif email:
-            PhoneOTP.objects.filter(email=email).delete()
-            PhoneOTP.objects.create(email=email, otp=otp)
-        
-        if phone:
-            # Envoi SMS réel via Orange
-            sms_service = OrangeSMSService()
-            message = f"Votre code de récupération Logema est : {otp}. Ne le partagez pas."
-            sent = sms_service.send_sms(phone, message)
-            
-            if not sent:
-                logger = logging.getLogger(__name__)
-                logger.error(f"Échec de l'envoi SMS à {phone}")
-                # Don't fail in tests or debug if SMS fails
-                if not (settings.DEBUG or getattr(settings, 'TESTING', False)):
-                    return Response({
-                        "error": "Impossible d'envoyer le code SMS pour le moment. Réessayez plus tard."
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            
+            enqueue('SMS', phone, message, kind='PASSWORD_RESET')
             return Response({
                 "message": "Un code de vérification a été envoyé à votre numéro de téléphone.",
                 "mode_debug": settings.DEBUG
             }, status=status.HTTP_200_OK)
 
-        elif email:
-            # Envoi Email
-            subject = "Récupération de mot de passe Logema"
-            message = f"Votre code de récupération Logema est : {otp}. Ne le partagez pas."
-            from_email = settings.DEFAULT_FROM_EMAIL
-            try:
-                send_mail(subject, message, from_email, [email])
-            except Exception as e:
-                logger = logging.getLogger(__name__)
-                logger.error(f"Échec de l'envoi Email à {email}: {str(e)}")
-                if not settings.DEBUG:
-                    return Response({
-                        "error": "Impossible d'envoyer l'email de récupération pour le moment."
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            return Response({
-                "message": "Un code de vérification a été envoyé à votre adresse email.",
-                "mode_debug": settings.DEBUG
-            }, status=status.HTTP_200_OK)
-
-import logging
-
-from django.utils import timezone
+        enqueue('EMAIL', email, message, subject="Récupération de mot de passe Logema", kind='PASSWORD_RESET')
+        return Response({
+            "message": "Un code de vérification a été envoyé à votre adresse email.",
+            "mode_debug": settings.DEBUG
+        }, status=status.HTTP_200_OK)
 
 class PasswordResetVerifyView(generics.GenericAPIView):
     serializer_class = PasswordResetVerifySerializer
@@ -100,20 +61,13 @@ class PasswordResetVerifyView(generics.GenericAPIView):
         otp = serializer.validated_data['otp']
         new_password = serializer.validated_data['new_password']
         
-        # Vérifier l'OTP
-        try:
-            if phone:
-                otp_obj = PhoneOTP.objects.get(phone_number=phone, otp=otp)
-            elif email:
-                otp_obj = PhoneOTP.objects.get(email=email, otp=otp)
-            else:
-                return Response({"error": "Données manquantes pour la vérification."}, status=status.HTTP_400_BAD_REQUEST)
-                
-            # Vérifier l'expiration (ex: 10 minutes)
-            if timezone.now() - otp_obj.created_at > timedelta(minutes=10):
-                return Response({"error": "Le code OTP a expiré."}, status=status.HTTP_400_BAD_REQUEST)
-        except PhoneOTP.DoesNotExist:
-            return Response({"error": "Code OTP invalide."}, status=status.HTTP_400_BAD_REQUEST)
+        if not phone and not email:
+            return Response({"error": "Données manquantes pour la vérification."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Vérifier et consommer l'OTP
+        error = verify_otp(otp, phone=phone, email=email)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
             
         # Réinitialiser le mot de passe
         if phone:
@@ -124,11 +78,6 @@ class PasswordResetVerifyView(generics.GenericAPIView):
         user.set_password(new_password)
         user.save()
         
-        # Supprimer l'OTP utilisé
-        otp_obj.delete()
-        
         return Response({
             "message": "Votre mot de passe a été réinitialisé avec succès."
         }, status=status.HTTP_200_OK)
-
-from datetime import timedelta
@@ -0,0 +1,171 @@
+"""
+Compteurs property_count de la hiérarchie de localisation
+
+Chaque nœud (Region ... Secteur) stocke le nombre de biens disponibles situés
+sous lui. Les compteurs sont ajustés par delta au commit de chaque changement de
+bien (voir properties.signals) et peuvent être recalculés avec `recount_locations`.
+Quand un nœud change de parent, seules les chaînes d'ancêtres de l'ancien et du
+nouveau parent sont recalculées (`recount_moved_location`).
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+
+# Modèle de chaque niveau et chemin depuis Property jusqu'à ce niveau
+LEVELS = [
+    (Secteur, 'secteur_id'),
+    (Quartier, 'secteur__quartier_id'),
+    (Ville, 'secteur__quartier__ville_id'),
+    (SousPrefecture, 'secteur__quartier__ville__sous_prefecture_id'),
+    (Prefecture, 'secteur__quartier__ville__sous_prefecture__prefecture_id'),
+    (Region, 'secteur__quartier__ville__sous_prefecture__prefecture__region_id'),
+]
+
+# Champ parent de chaque niveau (une région n'a pas de parent)
+PARENT_FIELDS = {
+    Secteur: 'quartier_id',
+    Quartier: 'ville_id',
+    Ville: 'sous_prefecture_id',
+    SousPrefecture: 'prefecture_id',
+    Prefecture: 'region_id',
+}
+
+
+def get_ancestor_ids(secteur_id):
+    """
+    Retourne les ids (secteur, quartier, ville, sous-préfecture, préfecture, région)
+    d'un secteur, dans l'ordre de LEVELS, en une requête.
+    """
+    ancestors = Secteur.objects.filter(pk=secteur_id).values_list(
+        'quartier_id',
+        'quartier__ville_id',
+        'quartier__ville__sous_prefecture_id',
+        'quartier__ville__sous_prefecture__prefecture_id',
+        'quartier__ville__sous_prefecture__prefecture__region_id',
+    ).first()
+    if ancestors is None:
+        return None
+    return (secteur_id,) + ancestors
+
+
+def adjust_property_count(secteur_id, delta):
+    """
+    Ajoute delta au compteur du secteur et de tous ses ancêtres.
+    Les mises à jour utilisent F() et sont regroupées dans une transaction.
+    """
+    if not delta or secteur_id is None:
+        return
+    ancestor_ids = get_ancestor_ids(secteur_id)
+    if ancestor_ids is None:
+        return
+    with transaction.atomic():
+        for (model, _path), pk in zip(LEVELS, ancestor_ids):
+            model.objects.filter(pk=pk).update(property_count=F('property_count') + delta)
+
+
+def move_property_count(old_state, new_state):
+    """
+    Applique le changement d'un bien entre deux états (secteur_id, is_available).
+    Un état None signifie que le bien n'existe pas (création ou suppression).
+    """
+    old_secteur = old_state[0] if old_state and old_state[1] else None
+    new_secteur = new_state[0] if new_state and new_state[1] else None
+    if old_secteur == new_secteur:
+        return
+    with transaction.atomic():
+        adjust_property_count(old_secteur, -1)
+        adjust_property_count(new_secteur, 1)
+
+
+def recount_locations():
+    """
+    Recalcule tous les compteurs depuis la table des biens.
+    Une agrégation par niveau puis un bulk_update ; retourne le nombre de nœuds modifiés.
+    """
+    from properties.models import Property
+
+    updated = 0
+    with transaction.atomic():
+        for model, path in LEVELS:
+            counts = dict(
+                Property.objects.filter(is_available=True)
+                .values(path)
+                .annotate(total=Count('id'))
+                .values_list(path, 'total')
+            )
+            changed = []
+            for node in model.objects.only('id', 'property_count').select_for_update():
+                total = counts.get(node.pk, 0)
+                if node.property_count != total:
+                    node.property_count = total
+                    changed.append(node)
+            model.objects.bulk_update(changed, ['property_count'], batch_size=500)
+            updated += len(changed)
+    return updated
+
+
+def get_chain(model, pk):
+    """
+    Retourne {modèle: id} du nœud `pk` (de niveau `model`) et de tous ses ancêtres,
+    en une requête.
+    """
+    models = [level_model for level_model, _path in LEVELS]
+    index = models.index(model)
+    ancestors = LEVELS[index + 1:]
+    if not ancestors:
+        return {model: pk} if model.objects.filter(pk=pk).exists() else {}
+    # Chemins des ancêtres relatifs au nœud : 'secteur__quartier__ville_id' -> 'ville_id'
+    prefix = LEVELS[index][1][:-len('_id')] + '__'
+    values = model.objects.filter(pk=pk).values_list(
+        *(path[len(prefix):] for _model, path in ancestors)
+    ).first()
+    if values is None:
+        return {}
+    return {model: pk, **{level_model: value for (level_model, _path), value in zip(ancestors, values)}}
+
+
+def recount_nodes(nodes):
+    """
+    Recalcule les compteurs des nœuds donnés ({modèle: ids}), une agrégation par niveau.
+    Retourne le nombre de nœuds modifiés.
+    """
+    from properties.models import Property
+
+    updated = 0
+    with transaction.atomic():
+        for model, path in LEVELS:
+            ids = nodes.get(model)
+            if not ids:
+                continue
+            counts = dict(
+                Property.objects.filter(is_available=True, **{f'{path}__in': ids})
+                .values(path)
+                .annotate(total=Count('id'))
+                .values_list(path, 'total')
+            )
+            changed = []
+            for node in model.objects.filter(pk__in=ids).only('id', 'property_count').select_for_update():
+                total = counts.get(node.pk, 0)
+                if node.property_count != total:
+                    node.property_count = total
+                    changed.append(node)
+            model.objects.bulk_update(changed, ['property_count'])
+            updated += len(changed)
+    return updated
+
+
+def recount_moved_location(model, old_parent_id, new_parent_id):
+    """
+    Un nœud de niveau `model` est passé de old_parent_id à new_parent_id : recalcule
+    les compteurs de l'ancien et du nouveau parent et de leurs ancêtres.
+    """
+    models = [level_model for level_model, _path in LEVELS]
+    parent_model = models[models.index(model) + 1]
+    nodes = {}
+    for parent_id in (old_parent_id, new_parent_id):
+        if parent_id is None:
+            continue
+        for level_model, pk in get_chain(parent_model, parent_id).items():
+            nodes.setdefault(level_model, set()).add(pk)
+    return recount_nodes(nodes)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from locations.counters import recount_locations
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs property_count de toute la hiérarchie de localisation'
+
+    def handle(self, *args, **options):
+        updated = recount_locations()
+        self.stdout.write(self.style.SUCCESS(f'{updated} compteur(s) corrigé(s)'))
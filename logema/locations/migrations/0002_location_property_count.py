@@ -0,0 +1,63 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:26
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_property_count(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    levels = [
+        ('Secteur', 'secteur_id'),
+        ('Quartier', 'secteur__quartier_id'),
+        ('Ville', 'secteur__quartier__ville_id'),
+        ('SousPrefecture', 'secteur__quartier__ville__sous_prefecture_id'),
+        ('Prefecture', 'secteur__quartier__ville__sous_prefecture__prefecture_id'),
+        ('Region', 'secteur__quartier__ville__sous_prefecture__prefecture__region_id'),
+    ]
+    for model_name, path in levels:
+        model = apps.get_model('locations', model_name)
+        counts = Property.objects.filter(is_available=True).values(path).annotate(total=Count('id')).values_list(path, 'total')
+        for pk, total in counts:
+            model.objects.filter(pk=pk).update(property_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0001_initial'),
+        ('properties', '0009_propertysearch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prefecture',
+            name='property_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quartier',
+            name='property_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='property_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='secteur',
+            name='property_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='sousprefecture',
+            name='property_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='ville',
+            name='property_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_property_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+
+from .models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+from .tree import invalidate_location_tree
+
+
+def location_changed(sender, raw=False, **kwargs):
+    invalidate_location_tree()
+
+
+for location_model in (Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur):
+    post_save.connect(location_changed, sender=location_model, dispatch_uid=f'location_tree_save_{location_model.__name__}')
+    post_delete.connect(location_changed, sender=location_model, dispatch_uid=f'location_tree_delete_{location_model.__name__}')
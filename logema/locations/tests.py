@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase
 from django.db.utils import IntegrityError
 from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
 
@@ -228,3 +228,279 @@ class LocationHierarchyTests(TestCase):
         )
         
         self.assertEqual(secteur.properties.count(), 2)
+
+
+class LocationPropertyCountTests(TransactionTestCase):
+    """Tests des compteurs property_count maintenus sur la hiérarchie
+
+    TransactionTestCase : les deltas ne sont appliqués qu'au commit.
+    """
+
+    def setUp(self):
+        from accounts.models import User
+
+        self.region = Region.objects.create(name="Conakry")
+        self.prefecture = Prefecture.objects.create(name="Kaloum", region=self.region)
+        self.sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=self.prefecture)
+        self.ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=self.sous_prefecture)
+        self.quartier = Quartier.objects.create(name="Almamya", ville=self.ville)
+        self.secteur = Secteur.objects.create(name="Secteur 1", quartier=self.quartier)
+
+        other_quartier = Quartier.objects.create(name="Boulbinet", ville=self.ville)
+        self.other_secteur = Secteur.objects.create(name="Secteur 2", quartier=other_quartier)
+
+        self.owner = User.objects.create_user(username='owner', password='pass123', is_proprietaire=True)
+
+    def create_property(self, **kwargs):
+        from properties.models import Property
+
+        data = {
+            'owner': self.owner,
+            'title': "Appartement",
+            'description': "Test",
+            'property_type': "APPARTEMENT",
+            'price': 5000000,
+            'secteur': self.secteur,
+        }
+        data.update(kwargs)
+        return Property.objects.create(**data)
+
+    def assertCounts(self, secteur, quartier, region):
+        self.assertEqual(Secteur.objects.get(pk=self.secteur.pk).property_count, secteur)
+        self.assertEqual(Quartier.objects.get(pk=self.quartier.pk).property_count, quartier)
+        self.assertEqual(Ville.objects.get(pk=self.ville.pk).property_count, region)
+        self.assertEqual(Region.objects.get(pk=self.region.pk).property_count, region)
+
+    def test_create_and_delete_update_counts(self):
+        """La création et la suppression d'un bien ajustent toute la branche."""
+        prop = self.create_property()
+        self.create_property(is_available=False)
+        self.assertCounts(1, 1, 1)
+
+        prop.delete()
+        self.assertCounts(0, 0, 0)
+
+    def test_rolled_back_changes_leave_counts(self):
+        """Une création ou suppression annulée ne modifie pas les compteurs."""
+        from django.db import transaction
+
+        prop = self.create_property()
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.create_property()
+            raise RuntimeError
+        self.assertCounts(1, 1, 1)
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            prop.delete()
+            raise RuntimeError
+        self.assertCounts(1, 1, 1)
+
+    def test_toggle_availability(self):
+        """Le passage à indisponible puis disponible met à jour les compteurs."""
+        prop = self.create_property()
+        prop.is_available = False
+        prop.save()
+        self.assertCounts(0, 0, 0)
+
+        prop.is_available = True
+        prop.save(update_fields=['is_available'])
+        self.assertCounts(1, 1, 1)
+
+    def test_move_between_secteurs(self):
+        """Un déménagement de secteur déplace le compte sans toucher les ancêtres communs."""
+        prop = self.create_property()
+        prop.secteur = self.other_secteur
+        prop.save()
+
+        self.assertCounts(0, 0, 1)
+        self.assertEqual(Secteur.objects.get(pk=self.other_secteur.pk).property_count, 1)
+        self.assertEqual(Quartier.objects.get(name="Boulbinet").property_count, 1)
+
+    def test_move_location_recounts_both_chains(self):
+        """Un secteur déplacé met à jour l'ancien et le nouveau quartier, sans recompter le reste."""
+        self.create_property()
+        other_region = Region.objects.create(name="Kindia", property_count=7)
+
+        boulbinet = Quartier.objects.get(name="Boulbinet")
+        self.secteur.quartier = boulbinet
+        self.secteur.save()
+
+        self.assertEqual(Quartier.objects.get(pk=self.quartier.pk).property_count, 0)
+        self.assertEqual(Quartier.objects.get(pk=boulbinet.pk).property_count, 1)
+        self.assertEqual(Ville.objects.get(pk=self.ville.pk).property_count, 1)
+        self.assertEqual(Secteur.objects.get(pk=self.secteur.pk).property_count, 1)
+        # Hors des deux chaînes : compteur laissé tel quel
+        self.assertEqual(Region.objects.get(pk=other_region.pk).property_count, 7)
+
+    def test_rename_does_not_recount(self):
+        """Un renommage ne déclenche aucun recalcul des compteurs."""
+        self.create_property()
+        Region.objects.filter(pk=self.region.pk).update(property_count=42)
+
+        self.quartier.name = "Almamya Centre"
+        self.quartier.save()
+        self.assertEqual(Region.objects.get(pk=self.region.pk).property_count, 42)
+
+    def test_recount_repairs_drift(self):
+        """recount_locations corrige des compteurs désynchronisés."""
+        from django.core.management import call_command
+        from io import StringIO
+
+        self.create_property()
+        self.create_property()
+        Region.objects.update(property_count=42)
+        Secteur.objects.update(property_count=0)
+
+        call_command('recount_locations', stdout=StringIO())
+        self.assertCounts(2, 2, 2)
+        self.assertEqual(Secteur.objects.get(pk=self.other_secteur.pk).property_count, 0)
+
+    def test_endpoint_reads_stored_count(self):
+        """L'API renvoie le compteur stocké en une seule requête."""
+        from rest_framework.test import APIClient
+
+        self.create_property()
+        client = APIClient()
+        with self.assertNumQueries(1):
+            response = client.get('/api/secteurs/')
+        self.assertEqual(response.status_code, 200)
+        counts = {row['id']: row['property_count'] for row in response.data}
+        self.assertEqual(counts, {self.secteur.pk: 1, self.other_secteur.pk: 0})
+
+
+class LocationTreeTests(TestCase):
+    """Tests de l'arbre de localisation à plat /api/locations/tree/"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from rest_framework.test import APIClient
+
+        cache.clear()
+        self.client = APIClient()
+        self.region = Region.objects.create(name="Conakry")
+        self.prefecture = Prefecture.objects.create(name="Kaloum", region=self.region)
+        self.sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=self.prefecture)
+        self.ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=self.sous_prefecture)
+        self.quartier = Quartier.objects.create(name="Almamya", ville=self.ville)
+        self.secteur = Secteur.objects.create(name="Secteur 1", quartier=self.quartier)
+        Secteur.objects.create(name="Secteur 2", quartier=self.quartier)
+
+    def test_flat_tree_in_six_queries(self):
+        """L'arbre complet est construit en six requêtes, une par niveau."""
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/locations/tree/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['regions'], {'id': [self.region.pk], 'name': ["Conakry"]})
+        self.assertEqual(response.data['secteurs']['parent'], [self.quartier.pk, self.quartier.pk])
+        self.assertEqual(response.data['secteurs']['name'], ["Secteur 1", "Secteur 2"])
+        # Les clients revalident à chaque usage (If-None-Match -> 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotIn('max-age', response['Cache-Control'])
+
+    def test_etag_not_modified(self):
+        """Un If-None-Match correspondant renvoie 304 sans requête SQL."""
+        etag = self.client.get('/api/locations/tree/')['ETag']
+        self.assertFalse(etag.startswith('W/'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/locations/tree/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_changes_only_with_locations(self):
+        """L'ETag ne change pas avec les biens, seulement avec les localisations."""
+        from accounts.models import User
+        from properties.models import Property
+
+        etag = self.client.get('/api/locations/tree/')['ETag']
+
+        owner = User.objects.create_user(username='owner', password='pass123', is_proprietaire=True)
+        Property.objects.create(
+            owner=owner, title="Villa", description="Test",
+            property_type="VILLA", price=10000000, secteur=self.secteur
+        )
+        self.assertEqual(self.client.get('/api/locations/tree/')['ETag'], etag)
+
+        self.secteur.name = "Secteur Central"
+        self.secteur.save()
+        response = self.client.get('/api/locations/tree/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['secteurs']['name'][0], "Secteur Central")
+
+    def test_cached_tree_expires(self):
+        """Le cache a une durée de vie finie : un autre processus finit par voir les changements."""
+        from unittest.mock import patch
+        from django.test import override_settings
+
+        with override_settings(LOCATION_TREE_CACHE_TIMEOUT=120), \
+                patch('locations.tree.cache.set') as cache_set:
+            self.client.get('/api/locations/tree/')
+        self.assertEqual(cache_set.call_args.args[2], 120)
+
+
+class NestedLocationQueryCountTests(TestCase):
+    """Nombre de requêtes fixe pour les endpoints imbriqués, quelle que soit la taille de l'arbre"""
+
+    def setUp(self):
+        from accounts.models import User
+        from rest_framework.test import APIClient
+
+        self.client = APIClient()
+        owner = User.objects.create_user(username='owner', password='pass123', is_proprietaire=True)
+
+        # Deux branches complètes pour que des chargements paresseux soient visibles
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_tree(owner)
+
+    def create_tree(self, owner):
+        from properties.models import Property
+
+        for r in range(2):
+            region = Region.objects.create(name=f"Région {r}")
+            for p in range(2):
+                prefecture = Prefecture.objects.create(name=f"Préfecture {r}{p}", region=region)
+                sous_prefecture = SousPrefecture.objects.create(name=f"SP {r}{p}", prefecture=prefecture)
+                ville = Ville.objects.create(name=f"Ville {r}{p}", sous_prefecture=sous_prefecture)
+                quartier = Quartier.objects.create(name=f"Quartier {r}{p}", ville=ville)
+                for s in range(2):
+                    secteur = Secteur.objects.create(name=f"Secteur {r}{p}{s}", quartier=quartier)
+                    Property.objects.create(
+                        owner=owner, title="Studio", description="Test",
+                        property_type="STUDIO", price=1000000, secteur=secteur
+                    )
+
+    def test_list_query_counts(self):
+        """Une requête par niveau présent dans la réponse."""
+        expected = {
+            '/api/regions/': 6,
+            '/api/prefectures/': 5,
+            '/api/sous-prefectures/': 4,
+            '/api/villes/': 3,
+            '/api/quartiers/': 2,
+            '/api/secteurs/': 1,
+        }
+        for url, queries in expected.items():
+            with self.subTest(url=url), self.assertNumQueries(queries):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_retrieve_query_count(self):
+        """Le détail d'une région charge aussi ses enfants en six requêtes."""
+        region = Region.objects.first()
+        with self.assertNumQueries(6):
+            response = self.client.get(f'/api/regions/{region.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_nested_children_carry_property_count(self):
+        """Chaque enfant imbriqué expose son propre property_count."""
+        response = self.client.get('/api/regions/')
+        region = response.data[0]
+        prefecture = region['prefectures'][0]
+        quartier = prefecture['sous_prefectures'][0]['villes'][0]['quartiers'][0]
+
+        self.assertEqual(region['property_count'], 4)
+        self.assertEqual(prefecture['property_count'], 2)
+        self.assertEqual(quartier['property_count'], 2)
+        self.assertEqual([s['property_count'] for s in quartier['secteurs']], [1, 1])
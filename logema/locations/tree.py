@@ -0,0 +1,62 @@
+"""
+Arbre de localisation à plat (tableaux parallèles id / parent / name)
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+
+LOCATION_TREE_CACHE_KEY = 'location_tree'
+
+# Clé de la réponse, modèle et champ parent de chaque niveau
+TREE_LEVELS = [
+    ('regions', Region, None),
+    ('prefectures', Prefecture, 'region_id'),
+    ('sous_prefectures', SousPrefecture, 'prefecture_id'),
+    ('villes', Ville, 'sous_prefecture_id'),
+    ('quartiers', Quartier, 'ville_id'),
+    ('secteurs', Secteur, 'quartier_id'),
+]
+
+
+def build_location_tree():
+    """
+    Construit toute la hiérarchie en six requêtes, une par niveau.
+    Les property_count ne sont pas inclus : l'arbre ne change qu'avec les localisations.
+    """
+    tree = {}
+    for key, model, parent_field in TREE_LEVELS:
+        fields = ['id', 'name'] if parent_field is None else ['id', parent_field, 'name']
+        rows = list(model.objects.order_by('id').values_list(*fields))
+        level = {'id': [row[0] for row in rows], 'name': [row[-1] for row in rows]}
+        if parent_field is not None:
+            level['parent'] = [row[1] for row in rows]
+        tree[key] = level
+    return tree
+
+
+def compute_etag(tree):
+    payload = json.dumps(tree, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return '"%s"' % hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def get_location_tree():
+    """
+    Retourne (tree, etag) depuis le cache, en reconstruisant l'arbre si besoin.
+    L'ETag est dérivé du contenu : il est identique d'un processus à l'autre.
+    L'invalidation (signaux) ne touche que le cache du processus qui écrit : l'entrée
+    expire après LOCATION_TREE_CACHE_TIMEOUT pour que les autres processus suivent.
+    """
+    cached = cache.get(LOCATION_TREE_CACHE_KEY)
+    if cached is None:
+        tree = build_location_tree()
+        cached = (tree, compute_etag(tree))
+        cache.set(LOCATION_TREE_CACHE_KEY, cached, getattr(settings, 'LOCATION_TREE_CACHE_TIMEOUT', 300))
+    return cached
+
+
+def invalidate_location_tree():
+    cache.delete(LOCATION_TREE_CACHE_KEY)
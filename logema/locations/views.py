@@ -1,72 +1,70 @@
-from django.db.models import Count, Q
-from rest_framework import viewsets
+from django.db.models import Prefetch
+from django.utils.cache import patch_cache_control
+from rest_framework import status, viewsets
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from .models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
 from .serializers import (
     RegionSerializer, PrefectureSerializer, SousPrefectureSerializer, 
     VilleSerializer, QuartierSerializer, SecteurSerializer
 )
+from .tree import get_location_tree
+
+# property_count est une colonne maintenue par locations.counters : lecture simple.
+# Les enfants imbriqués sont chargés par niveau (une requête par niveau, quelle que soit la taille de l'arbre).
+SECTEURS_PREFETCH = Prefetch('secteurs', queryset=Secteur.objects.order_by('id'))
+QUARTIERS_PREFETCH = Prefetch('quartiers', queryset=Quartier.objects.order_by('id').prefetch_related(SECTEURS_PREFETCH))
+VILLES_PREFETCH = Prefetch('villes', queryset=Ville.objects.order_by('id').prefetch_related(QUARTIERS_PREFETCH))
+SOUS_PREFECTURES_PREFETCH = Prefetch(
+    'sous_prefectures', queryset=SousPrefecture.objects.order_by('id').prefetch_related(VILLES_PREFETCH)
+)
+PREFECTURES_PREFETCH = Prefetch(
+    'prefectures', queryset=Prefecture.objects.order_by('id').prefetch_related(SOUS_PREFECTURES_PREFETCH)
+)
 
 class RegionViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Region.objects.annotate(
-        property_count=Count(
-            'prefectures__sous_prefectures__villes__quartiers__secteurs__properties',
-            filter=Q(prefectures__sous_prefectures__villes__quartiers__secteurs__properties__is_available=True),
-            distinct=True
-        )
-    )
+    queryset = Region.objects.prefetch_related(PREFECTURES_PREFETCH)
     serializer_class = RegionSerializer
 
 class PrefectureViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Prefecture.objects.annotate(
-        property_count=Count(
-            'sous_prefectures__villes__quartiers__secteurs__properties',
-            filter=Q(sous_prefectures__villes__quartiers__secteurs__properties__is_available=True),
-            distinct=True
-        )
-    )
+    queryset = Prefecture.objects.prefetch_related(SOUS_PREFECTURES_PREFETCH)
     serializer_class = PrefectureSerializer
     filterset_fields = ['region']
 
 class SousPrefectureViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = SousPrefecture.objects.annotate(
-        property_count=Count(
-            'villes__quartiers__secteurs__properties',
-            filter=Q(villes__quartiers__secteurs__properties__is_available=True),
-            distinct=True
-        )
-    )
+    queryset = SousPrefecture.objects.prefetch_related(VILLES_PREFETCH)
     serializer_class = SousPrefectureSerializer
     filterset_fields = ['prefecture']
 
 class VilleViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Ville.objects.annotate(
-        property_count=Count(
-            'quartiers__secteurs__properties',
-            filter=Q(quartiers__secteurs__properties__is_available=True),
-            distinct=True
-        )
-    )
+    queryset = Ville.objects.prefetch_related(QUARTIERS_PREFETCH)
     serializer_class = VilleSerializer
     filterset_fields = ['sous_prefecture']
 
 class QuartierViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Quartier.objects.annotate(
-        property_count=Count(
-            'secteurs__properties',
-            filter=Q(secteurs__properties__is_available=True),
-            distinct=True
-        )
-    )
+    queryset = Quartier.objects.prefetch_related(SECTEURS_PREFETCH)
     serializer_class = QuartierSerializer
     filterset_fields = ['ville']
 
 class SecteurViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Secteur.objects.annotate(
-        property_count=Count(
-            'properties',
-            filter=Q(properties__is_available=True),
-            distinct=True
-        )
-    )
+    queryset = Secteur.objects.all()
     serializer_class = SecteurSerializer
     filterset_fields = ['quartier']
+
+class LocationTreeView(APIView):
+    """
+    Toute la hiérarchie de Guinée en tableaux parallèles id / parent / name.
+    Servie avec un ETag fort : If-None-Match renvoie 304 tant qu'aucune localisation ne change.
+    Cache-Control: no-cache impose cette revalidation à chaque usage, pour qu'un
+    déplacement ou un renommage soit vu sans attendre l'expiration d'un max-age.
+    """
+    def get(self, request):
+        tree, etag = get_location_tree()
+        client_etags = request.headers.get('If-None-Match', '').replace(' ', '').split(',')
+        if etag in client_etags or '*' in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(tree)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        return response
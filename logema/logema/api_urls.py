@@ -7,16 +7,16 @@ from rest_framework_simplejwt.views import (
 
 from locations.views import (
     RegionViewSet, PrefectureViewSet, SousPrefectureViewSet,
-    VilleViewSet, QuartierViewSet, SecteurViewSet
+    VilleViewSet, QuartierViewSet, SecteurViewSet, LocationTreeView
 )
 from properties.views import PropertyViewSet, ManagementMandateViewSet
 from transactions.views import OccupationRequestViewSet, VisitVoucherViewSet
 from accounts.views import RegisterView, UserProfileView, PasswordResetRequestView, PasswordResetVerifyView
 
 from accounts.admin_views import (
-    AdminStatsView, AdminUserViewSet, 
+    AdminStatsView, AdminStatsHistoryView, AdminUserViewSet, 
     AdminPropertyViewSet, AdminMandateViewSet, 
-    AdminAnalyticsView, AdminOccupationViewSet
+    AdminAnalyticsView, AdminTimeseriesView, AdminOccupationViewSet
 )
 
 router = DefaultRouter()
@@ -40,6 +40,7 @@ router.register(r'admin/occupations', AdminOccupationViewSet, basename='admin-oc
 urlpatterns = [
     path('', include(router.urls)),
     path('', include('payments.urls')),  # Payment endpoints
+    path('locations/tree/', LocationTreeView.as_view(), name='location-tree'),
     path('auth/register/', RegisterView.as_view(), name='register'),
     path('auth/profile/', UserProfileView.as_view(), name='profile'),
     path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -47,6 +48,8 @@ urlpatterns = [
     path('auth/password/reset/request/', PasswordResetRequestView.as_view(), name='password_reset_request'),
     path('auth/password/reset/verify/', PasswordResetVerifyView.as_view(), name='password_reset_verify'),
     path('admin/stats/', AdminStatsView.as_view(), name='admin-stats'),
+    path('admin/stats/history/', AdminStatsHistoryView.as_view(), name='admin-stats-history'),
     path('admin/analytics/', AdminAnalyticsView.as_view(), name='admin-analytics'),
+    path('admin/analytics/timeseries/<str:metric>/', AdminTimeseriesView.as_view(), name='admin-analytics-timeseries'),
 ]
 
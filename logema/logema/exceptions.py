@@ -0,0 +1,19 @@
+from django.db.models import ProtectedError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import exception_handler as drf_exception_handler, set_rollback
+
+
+def exception_handler(exc, context):
+    """
+    Gestionnaire d'exceptions de DRF, plus ProtectedError : supprimer un utilisateur,
+    un bien ou un paiement référencé par le grand livre (immuable) est refusé avec
+    un 409 au lieu d'une erreur 500.
+    """
+    if isinstance(exc, ProtectedError):
+        set_rollback()
+        return Response(
+            {"error": "Suppression impossible : des écritures comptables font référence à cet objet"},
+            status=status.HTTP_409_CONFLICT
+        )
+    return drf_exception_handler(exc, context)
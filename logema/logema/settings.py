@@ -150,6 +150,7 @@ REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
     ],
+    'EXCEPTION_HANDLER': 'logema.exceptions.exception_handler',
 }
 
 from datetime import timedelta
@@ -194,6 +195,45 @@ MTN_MONEY_API_SECRET = ''
 WAVE_API_KEY = ''
 WAVE_API_SECRET = ''
 PAYMENT_WEBHOOK_SECRET = 'your-webhook-secret-here'
+# Webhook reçu avant l'enregistrement du transaction_id : réessayé avec un backoff
+PAYMENT_WEBHOOK_RETRY_DELAY = 30  # secondes, doublé à chaque essai
+PAYMENT_WEBHOOK_MAX_ATTEMPTS = 8  # essais avant échec (rejouable)
+
+# Transport HTTP des fournisseurs (Session partagée par fournisseur)
+PAYMENT_PROVIDER_CONNECT_TIMEOUT = 3.05  # secondes
+PAYMENT_PROVIDER_READ_TIMEOUT = 10  # secondes
+PAYMENT_PROVIDER_POOL_SIZE = 10  # connexions keep-alive par fournisseur
+
+# Outbox des appels fournisseurs (commande process_payment_outbox)
+PAYMENT_OUTBOX_RETRY_DELAY = 30  # secondes, doublé à chaque essai
+PAYMENT_OUTBOX_LOCK_TIMEOUT = 300  # secondes avant de reprendre une opération abandonnée
+PAYMENT_USE_FAKE_PROVIDER = False  # fournisseur local pour les tests de charge hors ligne
+PAYMENT_FAKE_PROVIDER_LATENCY = 0.05  # secondes par appel
+PAYMENT_FAKE_PROVIDER_FAILURE_RATE = 0.0  # proportion d'erreurs réseau simulées
+
+# SMS Orange (accounts.sms_service) : identifiants à configurer en production
+ORANGE_SMS_API_URL = 'https://api.orange.com'
+ORANGE_SMS_TOKEN_REFRESH_MARGIN = 60  # secondes avant l'expiration du token OAuth pour le renouveler
+ORANGE_SMS_POOL_SIZE = 10  # connexions keep-alive
+
+# Codes OTP de réinitialisation du mot de passe (accounts.otp)
+OTP_TTL = 600  # secondes de validité d'un code
+OTP_MAX_ATTEMPTS = 5  # codes erronés avant blocage
+
+# File des notifications (commande process_notifications)
+NOTIFICATION_RETRY_DELAY = 30  # secondes, doublé à chaque essai
+NOTIFICATION_LOCK_TIMEOUT = 300  # secondes avant de reprendre une notification abandonnée
+NOTIFICATION_RATE_LIMIT = 5  # messages au plus par destinataire...
+NOTIFICATION_RATE_WINDOW = 3600  # ...sur cette fenêtre (secondes)
+
+# Arbre de localisation (/api/locations/tree/) : le cache local à chaque processus
+# n'est invalidé que dans le processus qui modifie une localisation, les autres
+# servent l'ancien arbre au plus ce délai
+LOCATION_TREE_CACHE_TIMEOUT = 300  # secondes
+
+# Carte : clustering des biens par tuile (/api/properties/tiles/{z}/{x}/{y}/)
+PROPERTY_TILE_GRID_SIZE = 8  # grille de 8x8 clusters maximum par tuile
+PROPERTY_TILE_CACHE_TIMEOUT = 600  # secondes
 
 # Jazzmin Configuration
 JAZZMIN_SETTINGS = {
@@ -1,6 +1,13 @@
 import math
+import numpy as np
 from openlocationcode import openlocationcode as olc
 
+EARTH_RADIUS_KM = 6371.0
+
+GEOHASH_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+
 def generate_plus_code(latitude, longitude):
     """
     Generate a Plus Code from latitude and longitude.
@@ -9,6 +16,132 @@ def generate_plus_code(latitude, longitude):
         return None
     return olc.encode(latitude, longitude)
 
+
+def generate_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """
+    Encode latitude/longitude into a geohash cell.
+    Neighbouring points share a common prefix, which lets us index them
+    with a plain B-tree and query them with string ranges.
+    """
+    if latitude is None or longitude is None:
+        return None
+
+    lat_interval = [-90.0, 90.0]
+    lng_interval = [-180.0, 180.0]
+    geohash = []
+    bit = 0
+    ch = 0
+    even = True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_interval[0] + lng_interval[1]) / 2
+            if longitude >= mid:
+                ch = (ch << 1) | 1
+                lng_interval[0] = mid
+            else:
+                ch = ch << 1
+                lng_interval[1] = mid
+        else:
+            mid = (lat_interval[0] + lat_interval[1]) / 2
+            if latitude >= mid:
+                ch = (ch << 1) | 1
+                lat_interval[0] = mid
+            else:
+                ch = ch << 1
+                lat_interval[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            geohash.append(GEOHASH_BASE32[ch])
+            bit = 0
+            ch = 0
+
+    return ''.join(geohash)
+
+
+def geohash_cell_size(precision):
+    """
+    Returns the (lat_height, lng_width) in degrees of a geohash cell.
+    """
+    bits = precision * 5
+    lng_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Returns (min_lat, max_lat, min_lng, max_lng) enclosing a circle of radius_km.
+    """
+    lat_range = radius_km / 111.0
+    cos_lat = abs(math.cos(math.radians(latitude)))
+    lng_range = radius_km / (111.0 * max(cos_lat, 1e-6))
+    return (
+        max(latitude - lat_range, -90.0),
+        min(latitude + lat_range, 90.0),
+        max(longitude - lng_range, -180.0),
+        min(longitude + lng_range, 180.0),
+    )
+
+
+def geohash_cells(latitude, longitude, radius_km, max_cells=16):
+    """
+    Returns the geohash cells covering a circle of radius_km around a point.
+    The finest precision whose covering stays under max_cells is used, so a
+    lookup never expands into more than a handful of index ranges.
+    """
+    min_lat, max_lat, min_lng, max_lng = bounding_box(latitude, longitude, radius_km)
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lng = geohash_cell_size(precision)
+        rows = math.floor((max_lat + 90.0) / cell_lat) - math.floor((min_lat + 90.0) / cell_lat) + 1
+        cols = math.floor((max_lng + 180.0) / cell_lng) - math.floor((min_lng + 180.0) / cell_lng) + 1
+        if rows * cols > max_cells and precision > 1:
+            continue
+
+        cells = set()
+        start_lat = (math.floor((min_lat + 90.0) / cell_lat) + 0.5) * cell_lat - 90.0
+        start_lng = (math.floor((min_lng + 180.0) / cell_lng) + 0.5) * cell_lng - 180.0
+        for row in range(rows):
+            for col in range(cols):
+                lat = min(start_lat + row * cell_lat, 90.0)
+                lng = min(start_lng + col * cell_lng, 180.0)
+                cells.add(generate_geohash(lat, lng, precision))
+        return sorted(cells)
+
+    return []
+
+
+def geohash_successor(cell):
+    """
+    Returns the smallest cell sorting after every geohash starting with
+    `cell`, by incrementing its last base32 character (with
+    carry). Only base32 characters are compared, so the bound holds under
+    any collation. Returns None when no such cell exists (e.g. 'zz').
+    """
+    chars = list(cell)
+    while chars:
+        index = GEOHASH_BASE32.index(chars[-1])
+        if index + 1 < len(GEOHASH_BASE32):
+            chars[-1] = GEOHASH_BASE32[index + 1]
+            return ''.join(chars)
+        chars.pop()
+    return None
+
+
+def geohash_ranges(latitude, longitude, radius_km, max_cells=16):
+    """
+    Returns [low, high) string ranges over the geohash column matching every
+    point inside the cells that cover the search circle.
+    high is None when the range is open-ended.
+    """
+    return [
+        (cell, geohash_successor(cell))
+        for cell in geohash_cells(latitude, longitude, radius_km, max_cells=max_cells)
+    ]
+
+
 def calculate_distance(lat1, lon1, lat2, lon2):
     """
     Calculate the great circle distance between two points 
@@ -28,3 +161,48 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     c = 2 * math.asin(math.sqrt(a)) 
     r = 6371 # Radius of earth in kilometers. Use 3956 for miles
     return c * r
+
+
+def batch_distances(origin_lat, origin_lng, latitudes, longitudes):
+    """
+    Vectorized Haversine distance from one origin to many points.
+    Missing coordinates (None/NaN) yield an infinite distance.
+    Returns a float64 NumPy array of distances in kilometers.
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lng = np.radians(np.asarray(longitudes, dtype=np.float64))
+    origin_lat = math.radians(origin_lat)
+    origin_lng = math.radians(origin_lng)
+
+    a = np.sin((lat - origin_lat) / 2) ** 2 + math.cos(origin_lat) * np.cos(lat) * np.sin((lng - origin_lng) / 2) ** 2
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    distances[np.isnan(distances)] = np.inf
+    return distances
+
+
+def rank_by_distance(origin_lat, origin_lng, latitudes, longitudes, radius_km=None, k=None):
+    """
+    Ranks candidate points by distance from an origin.
+
+    Returns a (distances, mask, order) tuple:
+        distances: distance in km for every candidate
+        mask: True for candidates within radius_km (all finite ones if None)
+        order: indices of the masked candidates sorted by distance,
+               truncated to the k nearest if k is given
+    """
+    distances = batch_distances(origin_lat, origin_lng, latitudes, longitudes)
+    if radius_km is None:
+        mask = np.isfinite(distances)
+    else:
+        mask = distances <= radius_km
+
+    candidates = np.flatnonzero(mask)
+    candidate_distances = distances[candidates]
+    if k is not None and k < candidates.size:
+        # Partial selection first so we only fully sort the k winners
+        nearest = np.argpartition(candidate_distances, k - 1)[:k]
+        candidates = candidates[nearest]
+        candidate_distances = candidate_distances[nearest]
+
+    order = candidates[np.argsort(candidate_distances, kind='stable')]
+    return distances, mask, order
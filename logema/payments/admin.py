@@ -5,7 +5,12 @@ from .models import (
     PaymentDistribution,
     Transaction,
     PaymentMethod,
-    PaymentDispute
+    PaymentDispute,
+    ProviderOperation,
+    WebhookEvent,
+    LedgerAccount,
+    LedgerEntry,
+    LedgerLine
 )
 
 
@@ -209,3 +214,77 @@ class PaymentDisputeAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at')
         }),
     )
+
+
+@admin.register(ProviderOperation)
+class ProviderOperationAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'payment',
+        'operation',
+        'provider',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'updated_at'
+    ]
+    list_filter = ['operation', 'status', 'provider']
+    search_fields = ['payment__id', 'idempotency_key']
+    readonly_fields = ['idempotency_key', 'result', 'last_error', 'created_at', 'updated_at']
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = [
+        'id',
+        'provider',
+        'event_id',
+        'event_status',
+        'processing_status',
+        'attempts',
+        'next_attempt_at',
+        'received_at',
+        'processed_at'
+    ]
+    list_filter = ['provider', 'processing_status', 'event_status']
+    search_fields = ['event_id', 'transaction_id']
+    readonly_fields = ['payload', 'error_message', 'received_at', 'processed_at']
+    
+    actions = ['replay_events']
+    
+    def replay_events(self, request, queryset):
+        """Action pour rejouer les webhooks sélectionnés"""
+        from .webhooks import replay
+        count = replay(queryset)
+        self.message_user(request, f"{count} webhook(s) remis en file")
+    replay_events.short_description = "Rejouer les webhooks sélectionnés"
+
+
+@admin.register(LedgerAccount)
+class LedgerAccountAdmin(admin.ModelAdmin):
+    list_display = ['id', 'user', 'account_type', 'balance', 'currency', 'updated_at']
+    list_filter = ['account_type']
+    search_fields = ['user__username']
+    readonly_fields = ['user', 'account_type', 'balance', 'currency', 'created_at', 'updated_at']
+
+
+class LedgerLineInline(admin.TabularInline):
+    model = LedgerLine
+    readonly_fields = ['account', 'amount']
+    can_delete = False
+    extra = 0
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'payment', 'entry_type', 'description', 'created_at']
+    list_filter = ['entry_type', 'created_at']
+    search_fields = ['payment__id']
+    readonly_fields = ['payment', 'entry_type', 'description', 'created_at']
+    inlines = [LedgerLineInline]
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
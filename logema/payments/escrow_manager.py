@@ -1,10 +1,17 @@
 """
 Gestionnaire de logique Escrow pour retenir et libérer les paiements
 """
+import logging
+
 from django.utils import timezone
-from django.db import transaction
+from django.db import connection, transaction
 from decimal import Decimal
 from .models import EscrowAccount, PaymentDistribution, Transaction, Payment
+from .payment_providers import can_transfer_funds, has_payment_provider
+from . import ledger, outbox
+from accounts.notifications import notify_user
+
+logger = logging.getLogger(__name__)
 
 
 class EscrowManager:
@@ -34,6 +41,9 @@ class EscrowManager:
             payment.status = 'HELD_IN_ESCROW'
             payment.save()
             
+            # Grand livre : parts retenues pour chaque bénéficiaire
+            ledger.post_hold(payment)
+            
             # Créer une transaction d'enregistrement
             Transaction.objects.create(
                 payment=payment,
@@ -43,6 +53,12 @@ class EscrowManager:
                 description=f"Fonds placés en escrow - {escrow.held_amount}"
             )
             
+            notify_user(
+                payment.payer,
+                f"Votre paiement de {payment.amount} {payment.currency} a été reçu et placé en séquestre.",
+                kind='PAYMENT_HELD'
+            )
+            
             return escrow
     
     @staticmethod
@@ -60,50 +76,110 @@ class EscrowManager:
             raise ValueError("Ce compte escrow ne peut pas être libéré")
         
         with transaction.atomic():
-            payment = escrow_account.payment
-            
-            # Calculer les distributions
-            distributions = EscrowManager.calculate_distributions(payment)
+            distributions = EscrowManager.release_escrows([escrow_account])
+        # Instance périmée : l'escrow avait déjà été libéré ou remboursé entre-temps
+        if escrow_account.status != 'RELEASED':
+            raise ValueError("Ce compte escrow ne peut pas être libéré")
+        return distributions
+    
+    @staticmethod
+    def release_escrows(escrows):
+        """
+        Libère un lot de comptes escrow avec un nombre fixe de requêtes
+        (bulk_create des distributions et des transactions, update des statuts).
+        À appeler dans une transaction, sur des escrows dont la chaîne
+        payment -> occupation_request -> property -> owner/agent est déjà chargée.
+        Les escrows sont verrouillés et ceux qui ne sont plus HOLDING en base
+        (libération concurrente, instance périmée) sont ignorés.
+        
+        Args:
+            escrows: Liste d'EscrowAccount
             
-            # Créer les distributions
-            distribution_objects = []
-            for dist_data in distributions:
-                dist = PaymentDistribution.objects.create(
+        Returns:
+            Liste des PaymentDistribution créées
+        """
+        from properties.signals import refresh_properties
+        from transactions.models import OccupationRequest
+        
+        # Verrou puis relecture du statut : une seconde libération ne crée ni
+        # distributions ni écritures RELEASE en double
+        holding = set(
+            EscrowAccount.objects.select_for_update()
+            .filter(pk__in=[escrow.pk for escrow in escrows], status='HOLDING')
+            .values_list('pk', flat=True)
+        )
+        escrows = [escrow for escrow in escrows if escrow.pk in holding]
+        if not escrows:
+            return []
+        
+        now = timezone.now()
+        
+        # Calculer les distributions ; avec un fournisseur mobile money,
+        # les transferts sont exécutés par l'outbox
+        distribution_objects = []
+        for escrow in escrows:
+            payment = escrow.payment
+            use_provider = has_payment_provider(payment.payment_method)
+            for dist_data in EscrowManager.calculate_distributions(payment):
+                distribution_objects.append(PaymentDistribution(
                     payment=payment,
                     recipient=dist_data['recipient'],
                     amount=dist_data['amount'],
                     distribution_type=dist_data['type'],
-                    status='COMPLETED',
-                    completed_at=timezone.now()
-                )
-                distribution_objects.append(dist)
-                
-                # Créer une transaction pour chaque distribution
-                Transaction.objects.create(
-                    payment=payment,
-                    transaction_type='TRANSFER',
-                    amount=dist_data['amount'],
-                    status='COMPLETED',
-                    description=f"Distribution: {dist.get_distribution_type_display()} à {dist.recipient.username}"
-                )
-            
-            # Mettre à jour l'escrow
-            escrow_account.status = 'RELEASED'
-            escrow_account.released_at = timezone.now()
-            escrow_account.save()
-            
-            # Mettre à jour le paiement
-            payment.status = 'RELEASED'
-            payment.completed_at = timezone.now()
-            payment.save()
-            
-            # Mettre à jour l'OccupationRequest
-            occupation = payment.occupation_request
-            occupation.payment_status = 'PAID'
-            occupation.status = 'VALIDATED'
-            occupation.save()
-            
-            return distribution_objects
+                    status='PENDING' if use_provider else 'COMPLETED',
+                    completed_at=None if use_provider else now
+                ))
+        distribution_objects = PaymentDistribution.objects.bulk_create(distribution_objects)
+        
+        # Sans API de versement, les distributions restent PENDING (versement manuel)
+        transferable = {}
+        for dist in distribution_objects:
+            method = dist.payment.payment_method
+            if dist.status == 'PENDING' and method not in transferable:
+                transferable[method] = can_transfer_funds(method)
+        outbox.enqueue_transfers([
+            dist for dist in distribution_objects
+            if dist.status == 'PENDING' and transferable[dist.payment.payment_method]
+        ])
+        
+        # Créer une transaction pour chaque distribution déjà effectuée
+        Transaction.objects.bulk_create([
+            Transaction(
+                payment=dist.payment,
+                transaction_type='TRANSFER',
+                amount=dist.amount,
+                status='COMPLETED',
+                description=f"Distribution: {dist.get_distribution_type_display()} à {dist.recipient.username}"
+            )
+            for dist in distribution_objects if dist.status == 'COMPLETED'
+        ])
+        
+        # Mettre à jour les escrows, les paiements et les OccupationRequest
+        EscrowAccount.objects.filter(pk__in=[escrow.pk for escrow in escrows], status='HOLDING').update(
+            status='RELEASED', released_at=now
+        )
+        Payment.objects.filter(pk__in=[escrow.payment_id for escrow in escrows]).update(
+            status='RELEASED', completed_at=now, updated_at=now
+        )
+        OccupationRequest.objects.filter(
+            pk__in=[escrow.payment.occupation_request_id for escrow in escrows]
+        ).update(payment_status='PAID', status='VALIDATED', updated_at=now)
+        
+        for escrow in escrows:
+            escrow.status = 'RELEASED'
+            escrow.released_at = now
+            escrow.payment.status = 'RELEASED'
+            escrow.payment.completed_at = now
+            escrow.payment.occupation_request.payment_status = 'PAID'
+            escrow.payment.occupation_request.status = 'VALIDATED'
+        
+        # Grand livre : les parts retenues deviennent disponibles
+        ledger.post_releases([escrow.payment for escrow in escrows])
+        
+        # update() n'envoie pas post_save : rafraîchir l'index de recherche des biens
+        refresh_properties({escrow.payment.occupation_request.property_id for escrow in escrows})
+        
+        return distribution_objects
     
     @staticmethod
     def calculate_distributions(payment):
@@ -172,24 +248,36 @@ class EscrowManager:
             raise ValueError("Ce paiement ne peut pas être remboursé")
         
         with transaction.atomic():
-            # Mettre à jour l'escrow
+            # Transition conditionnelle sur le statut en base : une libération ou un
+            # remboursement concurrent ne doit pas écrire une seconde écriture au grand livre
+            now = timezone.now()
+            if not EscrowAccount.objects.filter(pk=escrow.pk, status='HOLDING').update(
+                status='REFUNDED', refund_reason=reason, released_at=now
+            ):
+                raise ValueError("Ce paiement ne peut pas être remboursé")
             escrow.status = 'REFUNDED'
             escrow.refund_reason = reason
-            escrow.released_at = timezone.now()
-            escrow.save()
+            escrow.released_at = now
             
             # Mettre à jour le paiement
             payment.status = 'REFUNDED'
             payment.save()
             
-            # Créer une transaction de remboursement
+            # Créer une transaction de remboursement ; avec un fournisseur mobile money,
+            # elle est complétée par l'outbox
+            use_provider = has_payment_provider(payment.payment_method)
             Transaction.objects.create(
                 payment=payment,
                 transaction_type='REFUND',
                 amount=payment.amount,
-                status='COMPLETED',
+                status='PENDING' if use_provider else 'COMPLETED',
                 description=f"Remboursement: {reason}"
             )
+            if use_provider:
+                outbox.enqueue(payment, 'REFUND')
+            
+            # Grand livre : les parts retenues retournent au payeur
+            ledger.post_refund(payment)
             
             # Mettre à jour l'OccupationRequest
             occupation = payment.occupation_request
@@ -200,27 +288,82 @@ class EscrowManager:
             return escrow
     
     @staticmethod
-    def auto_release_expired_escrows():
+    def claim_expired_escrows(batch_size, exclude_ids=()):
         """
-        Libère automatiquement les escrows dont la date de libération est passée
-        Cette fonction devrait être appelée par une tâche cron/celery
-        
-        Returns:
-            Nombre d'escrows libérés
+        Réserve un lot d'escrows arrivés à échéance. À appeler dans une transaction :
+        avec SKIP LOCKED, plusieurs processus se partagent le backlog sans attente
+        ni double libération.
         """
-        now = timezone.now()
-        expired_escrows = EscrowAccount.objects.filter(
+        queryset = EscrowAccount.objects.filter(
             status='HOLDING',
-            release_scheduled_date__lte=now
-        )
+            release_scheduled_date__lte=timezone.now()
+        ).exclude(pk__in=exclude_ids).select_related(
+            'payment__occupation_request__property__owner',
+            'payment__occupation_request__property__agent'
+        ).order_by('release_scheduled_date', 'pk')
+        
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True, of=('self',))
+        return list(queryset[:batch_size])
+    
+    @staticmethod
+    def release_expired_batch(batch_size=100, exclude_ids=()):
+        """
+        Libère un lot d'escrows arrivés à échéance en une transaction.
+        Si le lot échoue, ses escrows sont libérés un par un pour isoler le fautif.
         
-        count = 0
-        for escrow in expired_escrows:
+        Returns:
+            Tuple (nombre d'escrows réservés, ids en échec)
+        """
+        with transaction.atomic():
+            escrows = EscrowManager.claim_expired_escrows(batch_size, exclude_ids)
+            if not escrows:
+                return 0, []
             try:
-                EscrowManager.release_payment(escrow)
-                count += 1
-            except Exception as e:
-                # Logger l'erreur mais continuer
-                print(f"Erreur lors de la libération de l'escrow {escrow.id}: {e}")
+                with transaction.atomic():
+                    EscrowManager.release_escrows(escrows)
+                return len(escrows), []
+            except Exception:
+                logger.exception(
+                    "Échec de la libération du lot de %d escrow(s), reprise un par un", len(escrows)
+                )
+            
+            failed = []
+            for escrow in escrows:
+                try:
+                    with transaction.atomic():
+                        EscrowManager.release_escrows([escrow])
+                except Exception:
+                    # Logger l'erreur mais continuer
+                    logger.exception("Erreur lors de la libération de l'escrow %s", escrow.id)
+                    failed.append(escrow.id)
+            return len(escrows), failed
+    
+    @staticmethod
+    def drain_expired_escrows(batch_size=100):
+        """
+        Libère lot par lot tous les escrows arrivés à échéance.
+        
+        Returns:
+            Tuple (nombre d'escrows libérés, ids en échec)
+        """
+        released = 0
+        failed = []
+        while True:
+            claimed, batch_failed = EscrowManager.release_expired_batch(batch_size, exclude_ids=failed)
+            if not claimed:
+                return released, failed
+            released += claimed - len(batch_failed)
+            failed += batch_failed
+    
+    @staticmethod
+    def auto_release_expired_escrows(batch_size=100):
+        """
+        Libère automatiquement les escrows dont la date de libération est passée
+        Cette fonction devrait être appelée par une tâche cron (commande release_escrows)
         
-        return count
+        Returns:
+            Nombre d'escrows libérés
+        """
+        released, _ = EscrowManager.drain_expired_escrows(batch_size)
+        return released
@@ -0,0 +1,261 @@
+"""
+Grand livre en partie double
+
+Comptes :
+- CLEARING (plateforme) : fonds entrés ou sortis via les fournisseurs ;
+- HELD (utilisateur ou plateforme) : part retenue en escrow ;
+- AVAILABLE (utilisateur ou plateforme) : part libérée (gains, frais de plateforme).
+
+Écritures, une par type et par paiement, dont la somme des lignes est nulle :
+- HOLD : CLEARING -montant, HELD +part de chaque bénéficiaire ;
+- RELEASE : HELD -part, AVAILABLE +part ;
+- REFUND : HELD -part, CLEARING +montant.
+RELEASE et REFUND reprennent les lignes du HOLD : on libère exactement ce qui a été retenu.
+
+Les soldes de LedgerAccount sont mis à jour dans la même transaction que les
+écritures : lire un solde coûte une requête sur une ligne.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Q, Sum, When
+from django.utils import timezone
+
+from .models import LedgerAccount, LedgerEntry, LedgerLine
+
+CENT = Decimal('0.01')
+
+CLEARING = (None, 'CLEARING')
+
+
+def quantize(amount):
+    return Decimal(amount).quantize(CENT)
+
+
+def get_accounts(keys):
+    """
+    Comptes pour des clés (user_id, account_type), créés si besoin.
+    """
+    keys = set(keys)
+    condition = Q(pk__in=[])
+    for user_id, account_type in keys:
+        condition |= Q(user_id=user_id, account_type=account_type) if user_id else Q(
+            user__isnull=True, account_type=account_type
+        )
+    accounts = {(a.user_id, a.account_type): a for a in LedgerAccount.objects.filter(condition)}
+
+    missing = keys - set(accounts)
+    if missing:
+        LedgerAccount.objects.bulk_create(
+            [LedgerAccount(user_id=user_id, account_type=account_type) for user_id, account_type in missing],
+            ignore_conflicts=True
+        )
+        accounts = {(a.user_id, a.account_type): a for a in LedgerAccount.objects.filter(condition)}
+    return accounts
+
+
+def post(entries):
+    """
+    Enregistre des écritures et met à jour les soldes, en un nombre fixe de requêtes.
+    À appeler dans une transaction.
+
+    Args:
+        entries: liste de (LedgerEntry non sauvegardée, [((user_id, account_type), montant), ...])
+    """
+    if not entries:
+        return []
+
+    for entry, postings in entries:
+        if sum(amount for _, amount in postings) != 0:
+            raise ValueError(f"Écriture déséquilibrée: {entry.get_entry_type_display()} - paiement {entry.payment_id}")
+
+    accounts = get_accounts(key for _, postings in entries for key, _ in postings)
+    created = LedgerEntry.objects.bulk_create([entry for entry, _ in entries])
+
+    lines = []
+    deltas = defaultdict(Decimal)
+    for entry, (_, postings) in zip(created, entries):
+        for key, amount in postings:
+            if amount:
+                account = accounts[key]
+                lines.append(LedgerLine(entry=entry, account=account, amount=amount))
+                deltas[account.pk] += amount
+    LedgerLine.objects.bulk_create(lines)
+
+    # Une seule requête pour tous les comptes touchés
+    LedgerAccount.objects.filter(pk__in=list(deltas)).update(
+        balance=F('balance') + Case(
+            *[When(pk=pk, then=delta) for pk, delta in deltas.items()],
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+        updated_at=timezone.now()
+    )
+    return created
+
+
+def merge(postings):
+    """Regroupe les montants par compte (propriétaire et agent peuvent être la même personne)."""
+    totals = defaultdict(Decimal)
+    for key, amount in postings:
+        totals[key] += amount
+    return [(key, amount) for key, amount in totals.items() if amount]
+
+
+def hold_postings(payment):
+    """
+    Lignes du HOLD : répartition de EscrowManager.calculate_distributions,
+    le reste (frais de plateforme) sur le compte HELD de la plateforme.
+    """
+    from .escrow_manager import EscrowManager
+
+    amount = quantize(payment.amount)
+    postings = [(CLEARING, -amount)]
+    shares = Decimal('0')
+    for distribution in EscrowManager.calculate_distributions(payment):
+        share = quantize(distribution['amount'])
+        postings.append(((distribution['recipient'].pk, 'HELD'), share))
+        shares += share
+    postings.append(((None, 'HELD'), amount - shares))
+    return merge(postings)
+
+
+def hold_entry(payment):
+    return (
+        LedgerEntry(payment=payment, entry_type='HOLD', description=f"Mise en escrow - {payment.amount}"),
+        hold_postings(payment)
+    )
+
+
+def post_hold(payment):
+    return post([hold_entry(payment)])
+
+
+def held_postings(payments):
+    """
+    Parts retenues par paiement, lues dans les écritures HOLD.
+    Un paiement mis en escrow avant le grand livre reçoit son HOLD maintenant.
+
+    Returns:
+        (dict payment_id -> [((user_id, 'HELD'), part)], écritures HOLD à enregistrer)
+    """
+    held = defaultdict(list)
+    lines = LedgerLine.objects.filter(
+        entry__payment__in=payments, entry__entry_type='HOLD', account__account_type='HELD'
+    ).values_list('entry__payment_id', 'account__user_id', 'amount')
+    for payment_id, user_id, amount in lines:
+        held[payment_id].append(((user_id, 'HELD'), amount))
+
+    missing = []
+    for payment in payments:
+        if payment.pk not in held:
+            entry = hold_entry(payment)
+            missing.append(entry)
+            held[payment.pk] = [(key, amount) for key, amount in entry[1] if key != CLEARING]
+    return held, missing
+
+
+def post_releases(payments):
+    """
+    RELEASE des paiements donnés : chaque part retenue passe sur le compte AVAILABLE.
+    """
+    held, entries = held_postings(payments)
+    for payment in payments:
+        postings = []
+        for (user_id, _), amount in held[payment.pk]:
+            postings += [((user_id, 'HELD'), -amount), ((user_id, 'AVAILABLE'), amount)]
+        entries.append((
+            LedgerEntry(payment=payment, entry_type='RELEASE', description=f"Libération - {payment.amount}"),
+            postings
+        ))
+    return post(entries)
+
+
+def post_refund(payment):
+    """
+    REFUND : les parts retenues retournent au fournisseur (CLEARING).
+    """
+    held, entries = held_postings([payment])
+    postings = [(key, -amount) for key, amount in held[payment.pk]]
+    postings.append((CLEARING, sum(amount for _, amount in held[payment.pk])))
+    entries.append((
+        LedgerEntry(payment=payment, entry_type='REFUND', description=f"Remboursement - {payment.amount}"),
+        postings
+    ))
+    return post(entries)
+
+
+def backfill_holds(batch_size=500):
+    """
+    Enregistre le HOLD des escrows HOLDING mis en escrow avant le grand livre
+    (sinon créé seulement à la libération ou au remboursement).
+    Retourne le nombre d'écritures enregistrées.
+    """
+    from .models import Payment
+
+    pending = (
+        Payment.objects.filter(escrow__status='HOLDING')
+        .exclude(ledger_entries__entry_type='HOLD')
+        .select_related('occupation_request__property__owner', 'occupation_request__property__agent')
+        .order_by('pk')
+    )
+    total = 0
+    while True:
+        with transaction.atomic():
+            payments = list(pending[:batch_size])
+            if not payments:
+                return total
+            total += len(post([hold_entry(payment) for payment in payments]))
+
+
+def get_balances(user):
+    """
+    Soldes d'un utilisateur par type de compte (une requête).
+    """
+    balances = {account_type: Decimal('0') for account_type in ('HELD', 'AVAILABLE')}
+    balances.update(LedgerAccount.objects.filter(user=user).values_list('account_type', 'balance'))
+    return balances
+
+
+def reconcile(fix=False):
+    """
+    Vérifie le grand livre :
+    - chaque écriture est équilibrée ;
+    - chaque solde est égal à la somme des lignes du compte ;
+    - le total retenu (comptes HELD) est égal aux escrows HOLDING (après
+      backfill_holds pour les escrows antérieurs au grand livre).
+
+    Returns:
+        Liste de messages d'anomalie (vide si tout concorde)
+    """
+    from .models import EscrowAccount
+
+    problems = []
+
+    unbalanced = (
+        LedgerLine.objects.values('entry_id')
+        .annotate(total=Sum('amount'))
+        .exclude(total=0)
+        .values_list('entry_id', 'total')
+    )
+    for entry_id, total in unbalanced:
+        problems.append(f"Écriture {entry_id} déséquilibrée ({total:+})")
+
+    totals = dict(LedgerLine.objects.values('account_id').annotate(total=Sum('amount')).values_list('account_id', 'total'))
+    for account in LedgerAccount.objects.select_related('user'):
+        expected = totals.get(account.pk) or Decimal('0')
+        if account.balance != expected:
+            problems.append(f"Compte {account.pk} ({account}) : solde {account.balance}, écritures {expected}")
+            if fix:
+                LedgerAccount.objects.filter(pk=account.pk).update(balance=expected, updated_at=timezone.now())
+
+    missing = EscrowAccount.objects.filter(status='HOLDING').exclude(payment__ledger_entries__entry_type='HOLD').count()
+    if missing:
+        problems.append(f"{missing} escrow(s) HOLDING sans écriture HOLD (reconcile_ledger --backfill)")
+
+    held = LedgerAccount.objects.filter(account_type='HELD').aggregate(total=Sum('balance'))['total'] or Decimal('0')
+    holding = EscrowAccount.objects.filter(status='HOLDING').aggregate(total=Sum('held_amount'))['total'] or Decimal('0')
+    if held != holding:
+        problems.append(f"Total retenu {held}, escrows HOLDING {holding}")
+
+    return problems
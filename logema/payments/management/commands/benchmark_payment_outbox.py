@@ -0,0 +1,91 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from accounts.models import User
+from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+from payments import outbox
+from payments.models import Payment, ProviderOperation
+from properties.models import Property
+from transactions.models import OccupationRequest
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-tests the payment outbox offline against the fake provider: enqueues N '
+        'initiations and measures drain throughput per worker count. Data is deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=500)
+        parser.add_argument('--workers', nargs='+', type=int, default=[1, 4, 16])
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--latency', type=float, default=0.05, help='Fake provider latency (s)')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fake provider network error rate')
+
+    def handle(self, *args, **options):
+        fake = override_settings(
+            PAYMENT_USE_FAKE_PROVIDER=True,
+            PAYMENT_FAKE_PROVIDER_LATENCY=options['latency'],
+            PAYMENT_FAKE_PROVIDER_FAILURE_RATE=options['failure_rate'],
+            PAYMENT_OUTBOX_RETRY_DELAY=0,
+        )
+        self.stdout.write(f"{'payments':>9} {'workers':>8} {'seconds':>9} {'ops/s':>9} {'done':>7} {'failed':>7}")
+        region = self._seed_location()
+        try:
+            with fake:
+                for workers in options['workers']:
+                    occupation = self._seed_occupation(region, workers)
+                    payments = self._enqueue(occupation, options['payments'])
+                    started = time.perf_counter()
+                    while outbox.drain(batch_size=options['batch_size'], workers=workers):
+                        pass
+                    elapsed = time.perf_counter() - started
+                    ops = ProviderOperation.objects.filter(payment__in=payments)
+                    self.stdout.write(
+                        f"{len(payments):>9} {workers:>8} {elapsed:>9.2f} {len(payments) / elapsed:>9.1f} "
+                        f"{ops.filter(status='DONE').count():>7} {ops.filter(status='FAILED').count():>7}"
+                    )
+        finally:
+            User.objects.filter(username__startswith='benchmark_outbox_').delete()
+            region.delete()
+
+    def _seed_location(self):
+        region = Region.objects.create(name="Benchmark Outbox")
+        prefecture = Prefecture.objects.create(name="Benchmark", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Benchmark", prefecture=prefecture)
+        ville = Ville.objects.create(name="Benchmark", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Benchmark", ville=ville)
+        Secteur.objects.create(name="Benchmark", quartier=quartier)
+        return region
+
+    def _seed_occupation(self, region, run):
+        secteur = Secteur.objects.get(quartier__ville__sous_prefecture__prefecture__region=region)
+        owner = User.objects.create_user(username=f'benchmark_outbox_owner_{run}', password='benchmark')
+        tenant = User.objects.create_user(username=f'benchmark_outbox_tenant_{run}', password='benchmark')
+        prop = Property.objects.create(
+            owner=owner, title="Benchmark", description="Benchmark",
+            property_type="APPARTEMENT", price=1000000, secteur=secteur
+        )
+        return OccupationRequest.objects.create(property=prop, user=tenant)
+
+    def _enqueue(self, occupation, count):
+        payments = [
+            Payment(
+                occupation_request=occupation,
+                payer=occupation.user,
+                amount=1000000,
+                payment_method='ORANGE_MONEY',
+                payment_phone='622000000',
+                status='PENDING',
+                description="Benchmark"
+            )
+            for _ in range(count)
+        ]
+        for payment in payments:
+            payment.set_participants()
+        payments = Payment.objects.bulk_create(payments)
+        for payment in payments:
+            outbox.enqueue(payment, 'INITIATE')
+        return payments
@@ -0,0 +1,117 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from accounts.models import User
+from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+from payments.models import Payment
+from properties.models import Property
+from transactions.models import OccupationRequest
+
+
+def legacy_visibility(user):
+    """Filtre d'origine : OR de trois querysets joignant occupation_request -> property"""
+    return Payment.objects.filter(payer=user) | Payment.objects.filter(
+        occupation_request__property__owner=user
+    ) | Payment.objects.filter(
+        occupation_request__property__agent=user
+    )
+
+
+def denormalized_visibility(user):
+    return Payment.objects.filter(Q(payer=user) | Q(owner=user) | Q(agent=user))
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the PaymentViewSet visibility filter (first page + count) before/after '
+        'denormalizing owner/agent on Payment. All data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--payments', type=int, default=1_000_000)
+        parser.add_argument('--users', type=int, default=5_000, help='Owners, agents and tenants')
+        parser.add_argument('--properties', type=int, default=50_000)
+        parser.add_argument('--requests', type=int, default=30, help='Requests per scenario')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            started = time.perf_counter()
+            users = self._seed(options)
+            self.stdout.write(f"seeded {options['payments']:,} payments in {time.perf_counter() - started:.0f}s")
+            if connection.vendor in ('sqlite', 'postgresql'):
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+            self.stdout.write(f"{'role':<8} {'filter':<14} {'rows':>7} {'p50 ms':>9} {'p95 ms':>9}")
+            for role, user in users.items():
+                for label, visibility in (('or-of-joins', legacy_visibility), ('denormalized', denormalized_visibility)):
+                    rows, p50, p95 = self._measure(visibility, user, options['requests'])
+                    self.stdout.write(f"{role:<8} {label:<14} {rows:>7} {p50:>9.1f} {p95:>9.1f}")
+            transaction.set_rollback(True)
+
+    def _measure(self, visibility, user, count):
+        timings = []
+        for _ in range(count):
+            t0 = time.perf_counter()
+            queryset = visibility(user).order_by('-created_at')
+            rows = queryset.count()
+            list(queryset[:20])
+            timings.append((time.perf_counter() - t0) * 1000)
+        timings.sort()
+        return rows, statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+    def _seed(self, options):
+        rng = random.Random(42)
+        region = Region.objects.create(name="Benchmark Region")
+        prefecture = Prefecture.objects.create(name="Benchmark", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Benchmark", prefecture=prefecture)
+        ville = Ville.objects.create(name="Benchmark", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Benchmark", ville=ville)
+        secteur = Secteur.objects.create(name="Benchmark", quartier=quartier)
+
+        users = User.objects.bulk_create(
+            [User(username=f'benchmark_visibility_{i}', password='!') for i in range(options['users'])],
+            batch_size=1000
+        )
+        owners = users[:len(users) // 3]
+        agents = users[len(users) // 3:2 * len(users) // 3]
+        tenants = users[2 * len(users) // 3:]
+
+        properties = Property.objects.bulk_create([
+            Property(
+                owner=rng.choice(owners),
+                agent=rng.choice(agents) if rng.random() < 0.7 else None,
+                title="Benchmark", description="Benchmark",
+                property_type="APPARTEMENT", price=1000000, secteur=secteur
+            )
+            for _ in range(options['properties'])
+        ], batch_size=1000)
+        occupations = OccupationRequest.objects.bulk_create(
+            [OccupationRequest(property=prop, user=rng.choice(tenants)) for prop in properties],
+            batch_size=1000
+        )
+
+        batch = []
+        for _ in range(options['payments']):
+            occupation = rng.choice(occupations)
+            batch.append(Payment(
+                occupation_request=occupation,
+                payer_id=occupation.user_id,
+                owner_id=occupation.property.owner_id,
+                agent_id=occupation.property.agent_id,
+                amount=Decimal('1000000'),
+                payment_method='CASH',
+                status='RELEASED',
+            ))
+            if len(batch) == 10_000:
+                Payment.objects.bulk_create(batch)
+                batch = []
+        Payment.objects.bulk_create(batch)
+
+        return {'owner': owners[0], 'agent': agents[0], 'tenant': tenants[0]}
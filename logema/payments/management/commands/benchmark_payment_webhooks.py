@@ -0,0 +1,104 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from accounts.models import User
+from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+from payments import webhooks
+from payments.models import EscrowAccount, Payment, WebhookEvent
+from payments.views import PaymentWebhookView
+from properties.models import Property
+from transactions.models import OccupationRequest
+
+
+class Command(BaseCommand):
+    help = (
+        'Sends a burst of webhooks to /api/payments/webhook/orange/ (every event delivered '
+        'twice, like provider retries), reports ack latency, then drains the inbox. '
+        'All data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--webhooks', type=int, default=10_000, help='Requests in the burst')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        factory = RequestFactory()
+        view = PaymentWebhookView.as_view()
+        with transaction.atomic():
+            region = self._seed_location()
+            payments = self._seed_payments(region, options['webhooks'] // 2)
+            bodies = [
+                json.dumps({'transaction_id': payment.transaction_id, 'status': 'COMPLETED'})
+                for payment in payments
+            ]
+            # Chaque événement est livré deux fois, le renvoi arrivant plus tard dans la rafale
+            burst = bodies + bodies
+
+            timings = []
+            started = time.perf_counter()
+            for body in burst:
+                request = factory.post('/api/payments/webhook/orange/', body, content_type='application/json')
+                t0 = time.perf_counter()
+                response = view(request, provider='orange')
+                timings.append((time.perf_counter() - t0) * 1000)
+                assert response.status_code == 200, response.data
+            ack_elapsed = time.perf_counter() - started
+
+            timings.sort()
+            self.stdout.write(
+                f"ack      {len(burst):>6} requests  {len(burst) / ack_elapsed:>8.0f} req/s  "
+                f"p50 {statistics.median(timings):.2f} ms  p95 {timings[int(len(timings) * 0.95)]:.2f} ms  "
+                f"p99 {timings[int(len(timings) * 0.99)]:.2f} ms"
+            )
+
+            events = WebhookEvent.objects.filter(transaction_id__startswith='BENCH-')
+            started = time.perf_counter()
+            while webhooks.process_pending(batch_size=options['batch_size']):
+                pass
+            consume_elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"consume  {events.count():>6} events    {events.count() / consume_elapsed:>8.0f} ev/s   "
+                f"escrows {EscrowAccount.objects.filter(payment__in=payments).count()} "
+                f"(expected {len(payments)})"
+            )
+            transaction.set_rollback(True)
+
+    def _seed_location(self):
+        region = Region.objects.create(name="Benchmark Webhooks")
+        prefecture = Prefecture.objects.create(name="Benchmark", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Benchmark", prefecture=prefecture)
+        ville = Ville.objects.create(name="Benchmark", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Benchmark", ville=ville)
+        Secteur.objects.create(name="Benchmark", quartier=quartier)
+        return region
+
+    def _seed_payments(self, region, count):
+        secteur = Secteur.objects.get(quartier__ville__sous_prefecture__prefecture__region=region)
+        owner = User.objects.create_user(username='benchmark_webhook_owner', password='benchmark')
+        tenant = User.objects.create_user(username='benchmark_webhook_tenant', password='benchmark')
+        prop = Property.objects.create(
+            owner=owner, title="Benchmark", description="Benchmark",
+            property_type="APPARTEMENT", price=1000000, secteur=secteur
+        )
+        occupation = OccupationRequest.objects.create(property=prop, user=tenant)
+        payments = [
+            Payment(
+                occupation_request=occupation,
+                payer=tenant,
+                amount=1000000,
+                payment_method='ORANGE_MONEY',
+                payment_phone='622000000',
+                status='PROCESSING',
+                description="Benchmark"
+            )
+            for _ in range(count)
+        ]
+        for payment in payments:
+            payment.transaction_id = f'BENCH-{payment.id}'
+            payment.set_participants()
+        return Payment.objects.bulk_create(payments, batch_size=1000)
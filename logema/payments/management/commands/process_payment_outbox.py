@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments import outbox
+from payments.payment_providers import close_transports
+
+
+class Command(BaseCommand):
+    help = 'Exécute les opérations en attente auprès des fournisseurs de paiement (outbox)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Appels fournisseur simultanés')
+        parser.add_argument('--batch-size', type=int, default=50, help='Opérations réservées par lot')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Pause (s) quand la file est vide')
+        parser.add_argument('--once', action='store_true', help='Vider la file puis s\'arrêter')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = outbox.drain(batch_size=options['batch_size'], workers=options['workers'])
+                total += processed
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            close_transports()
+        self.stdout.write(self.style.SUCCESS(f'{total} opération(s) traitée(s)'))
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from payments import webhooks
+
+
+class Command(BaseCommand):
+    help = 'Applique les webhooks fournisseurs en attente dans l\'inbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Événements par transaction')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Pause (s) quand l\'inbox est vide')
+        parser.add_argument('--once', action='store_true', help='Vider l\'inbox puis s\'arrêter')
+
+    def handle(self, *args, **options):
+        total = 0
+        try:
+            while True:
+                processed = webhooks.process_pending(batch_size=options['batch_size'])
+                total += processed
+                if processed:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'{total} webhook(s) traité(s)'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from payments.ledger import backfill_holds, reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        'Vérifie le grand livre : écritures équilibrées, soldes égaux à la somme des lignes '
+        'et total retenu égal aux escrows HOLDING.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Recalculer les soldes divergents depuis les écritures')
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='Enregistrer le HOLD des escrows HOLDING antérieurs au grand livre avant la vérification'
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            posted = backfill_holds()
+            self.stdout.write(self.style.SUCCESS(f'{posted} écriture(s) HOLD enregistrée(s)'))
+
+        with transaction.atomic():
+            problems = reconcile(fix=options['fix'])
+
+        for problem in problems:
+            self.stdout.write(self.style.ERROR(problem))
+        if problems and not options['fix']:
+            raise CommandError(f'{len(problems)} anomalie(s) dans le grand livre')
+        if problems:
+            self.stdout.write(self.style.WARNING(f'{len(problems)} anomalie(s), soldes recalculés'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Grand livre cohérent'))
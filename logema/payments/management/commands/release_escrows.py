@@ -0,0 +1,49 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from payments.escrow_manager import EscrowManager
+
+
+class Command(BaseCommand):
+    help = (
+        'Libère par lots les escrows arrivés à échéance. Les lots sont réservés avec '
+        'SKIP LOCKED : plusieurs workers (ou processus) peuvent vider le backlog en parallèle.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Escrows libérés par transaction')
+        parser.add_argument('--workers', type=int, default=1, help='Workers parallèles')
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers > 1 and not connection.features.has_select_for_update_skip_locked:
+            self.stdout.write(self.style.WARNING(
+                f"{connection.vendor} ne supporte pas SKIP LOCKED : un seul worker"
+            ))
+            workers = 1
+
+        started = time.perf_counter()
+        if workers == 1:
+            results = [self.drain(options['batch_size'])]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(self.drain_in_thread, [options['batch_size']] * workers))
+        elapsed = time.perf_counter() - started
+
+        released = sum(count for count, _ in results)
+        failed = [escrow_id for _, failed_ids in results for escrow_id in failed_ids]
+        self.stdout.write(self.style.SUCCESS(f'{released} escrow(s) libéré(s) en {elapsed:.1f}s'))
+        if failed:
+            self.stdout.write(self.style.ERROR(f"{len(failed)} escrow(s) en échec: {', '.join(map(str, failed))}"))
+
+    def drain(self, batch_size):
+        return EscrowManager.drain_expired_escrows(batch_size)
+
+    def drain_in_thread(self, batch_size):
+        try:
+            return self.drain(batch_size)
+        finally:
+            connection.close()
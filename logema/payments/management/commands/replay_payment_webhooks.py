@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from payments import webhooks
+from payments.models import WebhookEvent
+
+
+class Command(BaseCommand):
+    help = (
+        'Remet des webhooks dans la file de traitement (par défaut les échecs). '
+        'Le traitement est idempotent : rejouer un événement déjà appliqué est sans effet.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id', type=int, action='append', dest='ids', default=[], help='ID d\'événement (répétable)')
+        parser.add_argument('--transaction-id', help='Tous les événements d\'une transaction')
+        parser.add_argument('--provider', choices=sorted(webhooks.PROVIDER_SLUGS.values()))
+        parser.add_argument('--since', help='Reçus depuis (ISO 8601)')
+        parser.add_argument(
+            '--status', action='append', dest='statuses', default=[],
+            choices=[choice for choice, _ in WebhookEvent.PROCESSING_STATUS_CHOICES],
+            help='Statut de traitement à rejouer (répétable, FAILED par défaut)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = WebhookEvent.objects.all()
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+        if options['transaction_id']:
+            queryset = queryset.filter(transaction_id=options['transaction_id'])
+        if options['provider']:
+            queryset = queryset.filter(provider=options['provider'])
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Date invalide: {options['since']}")
+            queryset = queryset.filter(received_at__gte=since)
+        if not options['ids'] and not options['transaction_id']:
+            queryset = queryset.filter(processing_status__in=options['statuses'] or ['FAILED'])
+        elif options['statuses']:
+            queryset = queryset.filter(processing_status__in=options['statuses'])
+
+        count = webhooks.replay(queryset)
+        self.stdout.write(self.style.SUCCESS(f'{count} webhook(s) remis en file'))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderOperation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation', models.CharField(choices=[('INITIATE', 'Initiation'), ('VERIFY', 'Vérification'), ('REFUND', 'Remboursement'), ('TRANSFER', 'Transfert')], max_length=20)),
+                ('provider', models.CharField(choices=[('ORANGE_MONEY', 'Orange Money'), ('MTN_MONEY', 'MTN Mobile Money'), ('WAVE', 'Wave'), ('BANK_TRANSFER', 'Virement bancaire'), ('CASH', 'Espèces')], max_length=20)),
+                ('idempotency_key', models.CharField(help_text='Dérivée de Payment.id, transmise au fournisseur', max_length=100, unique=True)),
+                ('status', models.CharField(choices=[('PENDING', 'En attente'), ('PROCESSING', 'En cours'), ('DONE', 'Terminé'), ('FAILED', 'Échoué')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('result', models.JSONField(blank=True, help_text='Dernière réponse du fournisseur', null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('distribution', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='provider_operations', to='payments.paymentdistribution')),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='provider_operations', to='payments.payment')),
+            ],
+            options={
+                'ordering': ['next_attempt_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='provider_operation_due')],
+            },
+        ),
+    ]
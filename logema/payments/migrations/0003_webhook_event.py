@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0002_provider_operation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(choices=[('ORANGE_MONEY', 'Orange Money'), ('MTN_MONEY', 'MTN Mobile Money'), ('WAVE', 'Wave'), ('BANK_TRANSFER', 'Virement bancaire'), ('CASH', 'Espèces')], max_length=20)),
+                ('event_id', models.CharField(help_text="ID d'événement du fournisseur, à défaut l'ID de transaction", max_length=255)),
+                ('transaction_id', models.CharField(blank=True, max_length=255)),
+                ('event_status', models.CharField(blank=True, help_text='Statut annoncé par le fournisseur', max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('processing_status', models.CharField(choices=[('PENDING', 'En attente'), ('DONE', 'Traité'), ('IGNORED', 'Ignoré'), ('FAILED', 'Échoué')], default='PENDING', max_length=20)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('error_message', models.TextField(blank=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['received_at'],
+                'indexes': [models.Index(fields=['processing_status', 'received_at'], name='webhook_event_pending')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'event_id', 'event_status'), name='webhook_event_unique')],
+            },
+        ),
+    ]
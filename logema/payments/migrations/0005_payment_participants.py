@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_participants(apps, schema_editor):
+    Payment = apps.get_model('payments', 'Payment')
+    Property = apps.get_model('properties', 'Property')
+    property_of_payment = Property.objects.filter(occupation_requests=OuterRef('occupation_request_id'))
+    Payment.objects.update(
+        owner_id=Subquery(property_of_payment.values('owner_id')[:1]),
+        agent_id=Subquery(property_of_payment.values('agent_id')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_ledger'),
+        ('transactions', '0007_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='agent',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments_as_agent', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payments_received', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['owner', '-created_at'], name='payment_owner_created'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['agent', '-created_at'], name='payment_agent_created'),
+        ),
+        migrations.RunPython(populate_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_payment_participants'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='webhookevent',
+            name='webhook_event_pending',
+        ),
+        migrations.AddField(
+            model_name='webhookevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text="Prochain essai d'un événement en attente"),
+        ),
+        migrations.AddIndex(
+            model_name='webhookevent',
+            index=models.Index(fields=['processing_status', 'next_attempt_at'], name='webhook_event_pending'),
+        ),
+    ]
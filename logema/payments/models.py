@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 import uuid
 
@@ -37,6 +38,23 @@ class Payment(models.Model):
         on_delete=models.CASCADE,
         related_name='payments_made'
     )
+    # Propriétaire et agent du bien, copiés à la création (filtres de visibilité sans jointure)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='payments_received'
+    )
+    agent = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name='payments_as_agent'
+    )
     
     amount = models.DecimalField(
         max_digits=12,
@@ -65,10 +83,23 @@ class Payment(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['payer', '-created_at']),
+            models.Index(fields=['owner', '-created_at'], name='payment_owner_created'),
+            models.Index(fields=['agent', '-created_at'], name='payment_agent_created'),
             models.Index(fields=['status', '-created_at']),
             models.Index(fields=['transaction_id']),
         ]
     
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.owner_id is None:
+            self.set_participants()
+        super().save(*args, **kwargs)
+    
+    def set_participants(self):
+        """Copie le propriétaire et l'agent du bien (à appeler avant un bulk_create)"""
+        property_obj = self.occupation_request.property
+        self.owner_id = property_obj.owner_id
+        self.agent_id = property_obj.agent_id
+    
     def __str__(self):
         return f"Paiement {self.id} - {self.amount} {self.currency} ({self.get_status_display()})"
 
@@ -289,3 +320,206 @@ class PaymentDispute(models.Model):
     
     def __str__(self):
         return f"Litige #{self.id} - Paiement {self.payment.id} ({self.get_status_display()})"
+
+
+class ProviderOperation(models.Model):
+    """
+    Outbox des appels aux fournisseurs de paiement.
+    Chaque ligne est écrite dans la même transaction que le changement métier,
+    puis exécutée par la commande `process_payment_outbox`.
+    """
+    
+    OPERATION_CHOICES = (
+        ('INITIATE', 'Initiation'),
+        ('VERIFY', 'Vérification'),
+        ('REFUND', 'Remboursement'),
+        ('TRANSFER', 'Transfert'),
+    )
+    
+    STATUS_CHOICES = (
+        ('PENDING', 'En attente'),
+        ('PROCESSING', 'En cours'),
+        ('DONE', 'Terminé'),
+        ('FAILED', 'Échoué'),
+    )
+    
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='provider_operations')
+    distribution = models.ForeignKey(
+        PaymentDistribution,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='provider_operations'
+    )
+    
+    operation = models.CharField(max_length=20, choices=OPERATION_CHOICES)
+    provider = models.CharField(max_length=20, choices=Payment.PAYMENT_METHOD_CHOICES)
+    idempotency_key = models.CharField(max_length=100, unique=True, help_text="Dérivée de Payment.id, transmise au fournisseur")
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    
+    result = models.JSONField(null=True, blank=True, help_text="Dernière réponse du fournisseur")
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='provider_operation_due'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_operation_display()} {self.payment_id} ({self.get_status_display()})"
+
+
+class WebhookEvent(models.Model):
+    """
+    Inbox des webhooks fournisseurs.
+    Le webhook est enregistré puis acquitté immédiatement ; la commande
+    `process_payment_webhooks` l'applique ensuite. La contrainte unique
+    absorbe les renvois du fournisseur.
+    """
+    
+    PROCESSING_STATUS_CHOICES = (
+        ('PENDING', 'En attente'),
+        ('DONE', 'Traité'),
+        ('IGNORED', 'Ignoré'),
+        ('FAILED', 'Échoué'),
+    )
+    
+    provider = models.CharField(max_length=20, choices=Payment.PAYMENT_METHOD_CHOICES)
+    event_id = models.CharField(max_length=255, help_text="ID d'événement du fournisseur, à défaut l'ID de transaction")
+    transaction_id = models.CharField(max_length=255, blank=True)
+    event_status = models.CharField(max_length=50, blank=True, help_text="Statut annoncé par le fournisseur")
+    payload = models.JSONField(default=dict)
+    
+    processing_status = models.CharField(max_length=20, choices=PROCESSING_STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    error_message = models.TextField(blank=True)
+    
+    next_attempt_at = models.DateTimeField(default=timezone.now, help_text="Prochain essai d'un événement en attente")
+    
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['received_at']
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'event_id', 'event_status'], name='webhook_event_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['processing_status', 'next_attempt_at'], name='webhook_event_pending'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_provider_display()} {self.event_id} {self.event_status} ({self.get_processing_status_display()})"
+
+
+class LedgerAccount(models.Model):
+    """
+    Compte du grand livre avec son solde courant.
+    Un compte par utilisateur et par type ; user vide = compte de la plateforme.
+    Le solde est mis à jour dans la même transaction que les écritures.
+    """
+    
+    ACCOUNT_TYPE_CHOICES = (
+        ('CLEARING', 'Compensation fournisseurs'),
+        ('HELD', 'Retenu en escrow'),
+        ('AVAILABLE', 'Libéré'),
+    )
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='ledger_accounts'
+    )
+    account_type = models.CharField(max_length=20, choices=ACCOUNT_TYPE_CHOICES)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    currency = models.CharField(max_length=3, default='GNF')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'account_type'], name='ledger_account_user_type'),
+            models.UniqueConstraint(
+                fields=['account_type'],
+                condition=models.Q(user__isnull=True),
+                name='ledger_account_platform_type'
+            ),
+        ]
+    
+    def __str__(self):
+        owner = self.user.username if self.user_id else 'Plateforme'
+        return f"{owner} - {self.get_account_type_display()}: {self.balance} {self.currency}"
+
+
+class LedgerEntry(models.Model):
+    """
+    Écriture du grand livre (immuable). La somme de ses lignes est nulle.
+    Une seule écriture de chaque type par paiement.
+    """
+    
+    ENTRY_TYPE_CHOICES = (
+        ('HOLD', 'Mise en escrow'),
+        ('RELEASE', 'Libération'),
+        ('REFUND', 'Remboursement'),
+    )
+    
+    payment = models.ForeignKey(Payment, on_delete=models.PROTECT, related_name='ledger_entries')
+    entry_type = models.CharField(max_length=20, choices=ENTRY_TYPE_CHOICES)
+    description = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['created_at', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['payment', 'entry_type'], name='ledger_entry_payment_type'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Les écritures du grand livre sont immuables")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Les écritures du grand livre sont immuables")
+    
+    def __str__(self):
+        return f"{self.get_entry_type_display()} - paiement {self.payment_id}"
+
+
+class LedgerLine(models.Model):
+    """
+    Ligne d'écriture : montant positif = crédit (le solde du compte augmente),
+    négatif = débit.
+    """
+    
+    entry = models.ForeignKey(LedgerEntry, on_delete=models.PROTECT, related_name='lines')
+    account = models.ForeignKey(LedgerAccount, on_delete=models.PROTECT, related_name='lines')
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['account', 'entry'], name='ledger_line_account'),
+        ]
+    
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Les écritures du grand livre sont immuables")
+        super().save(*args, **kwargs)
+    
+    def delete(self, *args, **kwargs):
+        raise ValueError("Les écritures du grand livre sont immuables")
+    
+    def __str__(self):
+        return f"{self.account} {self.amount:+}"
@@ -0,0 +1,336 @@
+"""
+Outbox des appels aux fournisseurs de paiement
+
+Les vues et l'EscrowManager n'appellent plus le fournisseur : ils écrivent une
+ProviderOperation dans la même transaction que le changement métier. La commande
+`process_payment_outbox` réclame les opérations dues (SELECT ... FOR UPDATE SKIP LOCKED
+là où le moteur le permet), appelle le fournisseur hors transaction avec une clé
+d'idempotence dérivée de Payment.id, puis applique le résultat. Les erreurs réseau
+et 5xx sont réessayées avec un backoff exponentiel.
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Payment, PaymentDistribution, ProviderOperation, Transaction
+from .payment_providers import get_payment_provider, is_retryable_error
+
+
+def idempotency_key(payment, operation, distribution=None):
+    key = f"{payment.pk}:{operation}"
+    if distribution is not None:
+        key = f"{key}:{distribution.pk}"
+    return key
+
+
+def enqueue(payment, operation, distribution=None):
+    """
+    Enregistre une opération à exécuter auprès du fournisseur du paiement.
+    À appeler dans la transaction qui modifie le paiement. Une opération déjà
+    enregistrée n'est pas dupliquée ; une vérification terminée est réarmée.
+    """
+    op, created = ProviderOperation.objects.get_or_create(
+        idempotency_key=idempotency_key(payment, operation, distribution),
+        defaults={
+            'payment': payment,
+            'distribution': distribution,
+            'operation': operation,
+            'provider': payment.payment_method,
+        }
+    )
+    if not created and operation == 'VERIFY' and op.status in ('DONE', 'FAILED'):
+        op.status = 'PENDING'
+        op.attempts = 0
+        op.next_attempt_at = timezone.now()
+        op.locked_at = None
+        op.save(update_fields=['status', 'attempts', 'next_attempt_at', 'locked_at', 'updated_at'])
+    return op
+
+
+def enqueue_transfers(distributions):
+    """
+    Enregistre en un INSERT les transferts de distributions déjà créées
+    (libération d'escrows par lot).
+    """
+    return ProviderOperation.objects.bulk_create([
+        ProviderOperation(
+            payment=distribution.payment,
+            distribution=distribution,
+            operation='TRANSFER',
+            provider=distribution.payment.payment_method,
+            idempotency_key=idempotency_key(distribution.payment, 'TRANSFER', distribution),
+        )
+        for distribution in distributions
+    ], ignore_conflicts=True)
+
+
+def claim(op, now):
+    """
+    Passe une opération lue en PROCESSING par un UPDATE conditionnel sur l'état lu.
+    Sans SKIP LOCKED (SQLite), deux workers peuvent lire les mêmes lignes : seul
+    celui dont l'UPDATE aboutit garde l'opération. Retourne True si elle est réservée.
+    """
+    if op.status == 'PENDING':
+        guard = {'status': 'PENDING', 'next_attempt_at__lte': now}
+    else:
+        guard = {'status': 'PROCESSING', 'locked_at': op.locked_at}
+    return ProviderOperation.objects.filter(pk=op.pk, **guard).update(
+        status='PROCESSING', attempts=F('attempts') + 1, locked_at=now
+    ) == 1
+
+
+def claim_due(limit=50):
+    """
+    Réserve jusqu'à `limit` opérations dues et les passe en PROCESSING.
+    Les opérations PROCESSING dont le verrou a expiré (worker arrêté) sont reprises.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=getattr(settings, 'PAYMENT_OUTBOX_LOCK_TIMEOUT', 300))
+
+    with transaction.atomic():
+        queryset = ProviderOperation.objects.filter(status='PENDING', next_attempt_at__lte=now)
+        stale = ProviderOperation.objects.filter(status='PROCESSING', locked_at__lt=stale_before)
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+            stale = stale.select_for_update(skip_locked=True)
+        ops = list(queryset.order_by('next_attempt_at')[:limit])
+        if len(ops) < limit:
+            ops += list(stale.order_by('locked_at')[:limit - len(ops)])
+        if not ops:
+            return []
+
+        claimed = [op.pk for op in ops if claim(op, now)]
+
+    return list(
+        ProviderOperation.objects.filter(pk__in=claimed)
+        .select_related('payment', 'distribution__recipient')
+    )
+
+
+def call_provider(op):
+    """
+    Appelle le fournisseur pour une opération. Jamais dans une transaction.
+    """
+    provider = get_payment_provider(op.provider)
+    payment = op.payment
+
+    if op.operation == 'INITIATE':
+        return provider.initiate_payment(
+            amount=float(payment.amount),
+            phone_number=payment.payment_phone,
+            reference=str(payment.id),
+            description=payment.description,
+            idempotency_key=op.idempotency_key
+        )
+    if op.operation == 'VERIFY':
+        return provider.verify_payment(payment.transaction_id)
+    if op.operation == 'REFUND':
+        return provider.process_refund(
+            payment.transaction_id, float(payment.amount), idempotency_key=op.idempotency_key
+        )
+    if op.operation == 'TRANSFER':
+        distribution = op.distribution
+        return provider.transfer_funds(
+            amount=float(distribution.amount),
+            phone_number=distribution.recipient.phone,
+            reference=str(distribution.pk),
+            description=f"{distribution.get_distribution_type_display()} - paiement {payment.id}",
+            idempotency_key=op.idempotency_key
+        )
+    raise ValueError(f"Opération inconnue: {op.operation}")
+
+
+def execute(op):
+    """
+    Appelle le fournisseur ; une exception devient un résultat d'échec.
+    N'accède pas à la base : peut tourner dans un thread du pool.
+    """
+    try:
+        return call_provider(op)
+    except Exception as e:
+        return {
+            'success': False,
+            'error': str(e),
+            'retryable': is_retryable_error(e),
+            'message': 'Erreur lors de l\'appel au fournisseur'
+        }
+
+
+def retry_delay(attempts):
+    """Backoff exponentiel avec gigue : base, 2x base, 4x base..."""
+    base = getattr(settings, 'PAYMENT_OUTBOX_RETRY_DELAY', 30)
+    return base * (2 ** (attempts - 1)) * random.uniform(1, 1.25)
+
+
+def complete(op, result):
+    """
+    Applique le résultat d'un appel : succès, nouvel essai planifié ou échec définitif.
+    """
+    with transaction.atomic():
+        op.result = result
+        op.locked_at = None
+
+        if result.get('success'):
+            APPLY_SUCCESS[op.operation](op, result)
+            op.status = 'DONE'
+            op.last_error = ''
+        else:
+            op.last_error = result.get('error') or result.get('message') or 'Erreur inconnue'
+            if result.get('retryable') and op.attempts < op.max_attempts:
+                op.status = 'PENDING'
+                op.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(op.attempts))
+            else:
+                APPLY_FAILURE[op.operation](op, result)
+                op.status = 'FAILED'
+
+        op.save(update_fields=['status', 'result', 'last_error', 'locked_at', 'next_attempt_at', 'updated_at'])
+
+
+def lock_payment(op):
+    # La chaîne jusqu'au propriétaire et à l'agent sert à la répartition du grand livre
+    return Payment.objects.select_for_update(of=('self',)).select_related(
+        'occupation_request__property__owner', 'occupation_request__property__agent'
+    ).get(pk=op.payment_id)
+
+
+def initiate_succeeded(op, result):
+    payment = lock_payment(op)
+    if payment.status != 'PENDING':
+        # Paiement annulé entre-temps
+        return
+    payment.status = 'PROCESSING'
+    payment.transaction_id = result.get('transaction_id')
+    payment.provider_reference = result.get('transaction_id')
+    payment.provider_response = result
+    payment.save()
+
+    Transaction.objects.create(
+        payment=payment,
+        transaction_type='PAYMENT',
+        amount=payment.amount,
+        status='PROCESSING',
+        description="Paiement initié",
+        provider_response=result
+    )
+
+
+def initiate_failed(op, result):
+    payment = lock_payment(op)
+    if payment.status != 'PENDING':
+        return
+    payment.status = 'FAILED'
+    payment.provider_response = result
+    payment.save()
+
+    Transaction.objects.create(
+        payment=payment,
+        transaction_type='PAYMENT',
+        amount=payment.amount,
+        status='FAILED',
+        description="Échec de l'initiation",
+        error_message=result.get('message', 'Erreur inconnue'),
+        provider_response=result
+    )
+
+
+def verify_succeeded(op, result):
+    from .escrow_manager import EscrowManager
+
+    payment = lock_payment(op)
+    provider_status = result.get('status')
+    if provider_status == 'COMPLETED' and payment.status == 'PROCESSING':
+        EscrowManager.hold_payment(payment)
+    elif provider_status == 'FAILED' and payment.status == 'PROCESSING':
+        payment.status = 'FAILED'
+        payment.provider_response = result
+        payment.save()
+
+
+def refund_succeeded(op, result):
+    Transaction.objects.filter(
+        payment_id=op.payment_id, transaction_type='REFUND', status='PENDING'
+    ).update(status='COMPLETED', provider_response=result, updated_at=timezone.now())
+
+
+def refund_failed(op, result):
+    Transaction.objects.filter(
+        payment_id=op.payment_id, transaction_type='REFUND', status='PENDING'
+    ).update(
+        status='FAILED',
+        provider_response=result,
+        error_message=result.get('message', 'Erreur inconnue'),
+        updated_at=timezone.now()
+    )
+
+
+def transfer_succeeded(op, result):
+    distribution = PaymentDistribution.objects.select_for_update().get(pk=op.distribution_id)
+    if distribution.status == 'COMPLETED':
+        return
+    distribution.status = 'COMPLETED'
+    distribution.transfer_reference = result.get('transfer_id', '')
+    distribution.completed_at = timezone.now()
+    distribution.save()
+
+    Transaction.objects.create(
+        payment_id=op.payment_id,
+        transaction_type='TRANSFER',
+        amount=distribution.amount,
+        status='COMPLETED',
+        description=f"Distribution: {distribution.get_distribution_type_display()} à {op.distribution.recipient.username}",
+        provider_response=result
+    )
+
+
+def transfer_failed(op, result):
+    if result.get('manual_payout'):
+        # Le fournisseur ne sait pas verser : la distribution attend un versement manuel
+        return
+    PaymentDistribution.objects.filter(pk=op.distribution_id, status='PENDING').update(status='FAILED')
+
+
+def noop(op, result):
+    pass
+
+
+APPLY_SUCCESS = {
+    'INITIATE': initiate_succeeded,
+    'VERIFY': verify_succeeded,
+    'REFUND': refund_succeeded,
+    'TRANSFER': transfer_succeeded,
+}
+
+APPLY_FAILURE = {
+    'INITIATE': initiate_failed,
+    'VERIFY': noop,
+    'REFUND': refund_failed,
+    'TRANSFER': transfer_failed,
+}
+
+
+def drain(batch_size=50, workers=1):
+    """
+    Exécute un lot d'opérations dues. Retourne le nombre d'opérations traitées.
+    Les appels au fournisseur sont faits en parallèle (au plus `workers`) ;
+    les résultats sont appliqués un par un sur la connexion courante.
+    """
+    ops = claim_due(batch_size)
+    if not ops:
+        return 0
+    if workers <= 1:
+        results = map(execute, ops)
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        results = executor.map(execute, ops)
+    try:
+        for op, result in zip(ops, results):
+            complete(op, result)
+    finally:
+        if workers > 1:
+            executor.shutdown()
+    return len(ops)
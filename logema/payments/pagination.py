@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TransactionCursorPagination(CursorPagination):
+    """
+    Pagination par curseur de l'historique des transactions (/api/transactions/),
+    sur l'index (payment, -created_at) : coût constant quelle que soit la page.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -4,22 +4,102 @@ Intégration avec les fournisseurs de paiement mobile
 import hashlib
 import hmac
 import json
+import random
+import threading
+import time
 import requests
 from abc import ABC, abstractmethod
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+class ProviderTransport:
+    """
+    Transport HTTP d'un fournisseur : une Session requests partagée (keep-alive,
+    pool de connexions) et des timeouts connexion/lecture configurables.
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, pool_size=None):
+        self.connect_timeout = connect_timeout or getattr(settings, 'PAYMENT_PROVIDER_CONNECT_TIMEOUT', 3.05)
+        self.read_timeout = read_timeout or getattr(settings, 'PAYMENT_PROVIDER_READ_TIMEOUT', 10)
+        pool_size = pool_size or getattr(settings, 'PAYMENT_PROVIDER_POOL_SIZE', 10)
+
+        self.session = requests.Session()
+        # Pas de retry automatique : un POST de paiement n'est pas idempotent
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def post(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.post(url, **kwargs)
+
+    def get(self, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(provider_type):
+    """
+    Retourne le transport partagé d'un fournisseur (créé au premier appel).
+    La Session est réutilisée par tous les threads du processus.
+    """
+    transport = _transports.get(provider_type)
+    if transport is None:
+        with _transports_lock:
+            transport = _transports.get(provider_type)
+            if transport is None:
+                transport = _transports[provider_type] = ProviderTransport()
+    return transport
+
+
+def close_transports():
+    """Ferme toutes les Sessions (tests, arrêt du worker)"""
+    with _transports_lock:
+        for transport in _transports.values():
+            transport.close()
+        _transports.clear()
+
+
+def is_retryable_error(error):
+    """
+    Erreurs de transport (connexion, timeout) et réponses 5xx : l'opération peut être réessayée.
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500
+    return False
 
 
 class BasePaymentProvider(ABC):
     """Classe de base pour tous les fournisseurs de paiement"""
+
+    provider_type = None
     
     def __init__(self):
         self.api_key = None
         self.api_secret = None
         self.base_url = None
         self.sandbox_mode = getattr(settings, 'PAYMENT_SANDBOX_MODE', True)
+
+    @property
+    def transport(self):
+        return get_transport(self.provider_type)
     
     @abstractmethod
-    def initiate_payment(self, amount, phone_number, reference, description=""):
+    def initiate_payment(self, amount, phone_number, reference, description="", idempotency_key=None):
         """
         Initie un paiement
         
@@ -28,6 +108,7 @@ class BasePaymentProvider(ABC):
             phone_number: Numéro de téléphone du payeur
             reference: Référence unique du paiement
             description: Description du paiement
+            idempotency_key: Clé transmise au fournisseur pour dédoublonner les réessais
             
         Returns:
             dict: Réponse du fournisseur avec transaction_id, status, etc.
@@ -48,18 +129,49 @@ class BasePaymentProvider(ABC):
         pass
     
     @abstractmethod
-    def process_refund(self, transaction_id, amount):
+    def process_refund(self, transaction_id, amount, idempotency_key=None):
         """
         Traite un remboursement
         
         Args:
             transaction_id: ID de la transaction originale
             amount: Montant à rembourser
+            idempotency_key: Clé transmise au fournisseur pour dédoublonner les réessais
             
         Returns:
             dict: Résultat du remboursement
         """
         pass
+
+    def transfer_funds(self, amount, phone_number, reference, description="", idempotency_key=None):
+        """
+        Transfère des fonds vers un bénéficiaire (distribution d'un escrow)
+        
+        Args:
+            amount: Montant à transférer
+            phone_number: Numéro du bénéficiaire
+            reference: Référence unique du transfert
+            description: Description du transfert
+            idempotency_key: Clé transmise au fournisseur pour dédoublonner les réessais
+            
+        Returns:
+            dict: Résultat du transfert (success, transfer_id)
+        """
+        if self.supports_transfers():
+            return {
+                'success': True,
+                'transfer_id': f'TRANSFER-{reference}',
+                'message': 'Transfert effectué (mode simulation)'
+            }
+        return {'success': False, 'manual_payout': True, 'message': 'Transfert non implémenté : versement manuel'}
+
+    def supports_transfers(self):
+        """
+        Indique si les distributions peuvent être versées par l'API du fournisseur.
+        Les API de versement ne sont pas encore intégrées : seul le mode simulation
+        les accepte, les autres distributions restent PENDING pour un versement manuel.
+        """
+        return self.sandbox_mode or not self.api_key
     
     @abstractmethod
     def verify_webhook_signature(self, payload, signature):
@@ -78,6 +190,8 @@ class BasePaymentProvider(ABC):
 
 class OrangeMoneyProvider(BasePaymentProvider):
     """Intégration Orange Money"""
+
+    provider_type = 'ORANGE_MONEY'
     
     def __init__(self):
         super().__init__()
@@ -89,7 +203,7 @@ class OrangeMoneyProvider(BasePaymentProvider):
         else:
             self.base_url = 'https://api.orange.com/orange-money-webpay/gn/v1'
     
-    def initiate_payment(self, amount, phone_number, reference, description=""):
+    def initiate_payment(self, amount, phone_number, reference, description="", idempotency_key=None):
         """Initie un paiement Orange Money"""
         
         # En mode sandbox/développement, on simule une réponse
@@ -118,8 +232,10 @@ class OrangeMoneyProvider(BasePaymentProvider):
             'reference': description
         }
         
+        headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+        
         try:
-            response = requests.post(endpoint, json=payload, timeout=30)
+            response = self.transport.post(endpoint, json=payload, headers=headers)
             response.raise_for_status()
             data = response.json()
             
@@ -134,6 +250,7 @@ class OrangeMoneyProvider(BasePaymentProvider):
             return {
                 'success': False,
                 'error': str(e),
+                'retryable': is_retryable_error(e),
                 'message': 'Erreur lors de l\'initiation du paiement'
             }
     
@@ -157,7 +274,7 @@ class OrangeMoneyProvider(BasePaymentProvider):
         }
         
         try:
-            response = requests.post(endpoint, json=payload, timeout=30)
+            response = self.transport.post(endpoint, json=payload)
             response.raise_for_status()
             data = response.json()
             
@@ -170,10 +287,11 @@ class OrangeMoneyProvider(BasePaymentProvider):
         except Exception as e:
             return {
                 'success': False,
-                'error': str(e)
+                'error': str(e),
+                'retryable': is_retryable_error(e)
             }
     
-    def process_refund(self, transaction_id, amount):
+    def process_refund(self, transaction_id, amount, idempotency_key=None):
         """Traite un remboursement Orange Money"""
         
         if self.sandbox_mode or not self.api_key:
@@ -209,6 +327,8 @@ class OrangeMoneyProvider(BasePaymentProvider):
 
 class MTNMoneyProvider(BasePaymentProvider):
     """Intégration MTN Mobile Money"""
+
+    provider_type = 'MTN_MONEY'
     
     def __init__(self):
         super().__init__()
@@ -220,7 +340,7 @@ class MTNMoneyProvider(BasePaymentProvider):
         else:
             self.base_url = 'https://momodeveloper.mtn.com'
     
-    def initiate_payment(self, amount, phone_number, reference, description=""):
+    def initiate_payment(self, amount, phone_number, reference, description="", idempotency_key=None):
         """Initie un paiement MTN Mobile Money"""
         
         if self.sandbox_mode or not self.api_key:
@@ -251,7 +371,7 @@ class MTNMoneyProvider(BasePaymentProvider):
         
         return {'success': False, 'message': 'Non implémenté'}
     
-    def process_refund(self, transaction_id, amount):
+    def process_refund(self, transaction_id, amount, idempotency_key=None):
         """Traite un remboursement MTN"""
         
         if self.sandbox_mode:
@@ -269,6 +389,8 @@ class MTNMoneyProvider(BasePaymentProvider):
 
 class WaveProvider(BasePaymentProvider):
     """Intégration Wave"""
+
+    provider_type = 'WAVE'
     
     def __init__(self):
         super().__init__()
@@ -280,7 +402,7 @@ class WaveProvider(BasePaymentProvider):
         else:
             self.base_url = 'https://api.wave.com'
     
-    def initiate_payment(self, amount, phone_number, reference, description=""):
+    def initiate_payment(self, amount, phone_number, reference, description="", idempotency_key=None):
         """Initie un paiement Wave"""
         
         if self.sandbox_mode or not self.api_key:
@@ -309,7 +431,7 @@ class WaveProvider(BasePaymentProvider):
         
         return {'success': False, 'message': 'Non implémenté'}
     
-    def process_refund(self, transaction_id, amount):
+    def process_refund(self, transaction_id, amount, idempotency_key=None):
         """Traite un remboursement Wave"""
         
         if self.sandbox_mode:
@@ -325,6 +447,88 @@ class WaveProvider(BasePaymentProvider):
         return True if self.sandbox_mode else False
 
 
+class FakeProvider(BasePaymentProvider):
+    """
+    Fournisseur local pour les tests de charge hors ligne.
+    Latence et taux d'erreurs réseau configurables (PAYMENT_FAKE_PROVIDER_LATENCY,
+    PAYMENT_FAKE_PROVIDER_FAILURE_RATE) ; les réessais avec la même clé
+    d'idempotence renvoient le même résultat.
+    """
+
+    _results = {}
+    _results_lock = threading.Lock()
+
+    def __init__(self, provider_type='FAKE'):
+        super().__init__()
+        self.provider_type = provider_type
+        self.latency = getattr(settings, 'PAYMENT_FAKE_PROVIDER_LATENCY', 0.05)
+        self.failure_rate = getattr(settings, 'PAYMENT_FAKE_PROVIDER_FAILURE_RATE', 0.0)
+
+    def _call(self, idempotency_key, build_result):
+        time.sleep(self.latency)
+        if idempotency_key:
+            with self._results_lock:
+                if idempotency_key in self._results:
+                    return self._results[idempotency_key]
+        if random.random() < self.failure_rate:
+            raise requests.ConnectionError('Fake provider: connexion interrompue')
+        result = build_result()
+        if idempotency_key:
+            with self._results_lock:
+                self._results[idempotency_key] = result
+        return result
+
+    def initiate_payment(self, amount, phone_number, reference, description="", idempotency_key=None):
+        return self._call(idempotency_key, lambda: {
+            'success': True,
+            'transaction_id': f'FAKE-{reference}',
+            'status': 'PENDING',
+            'message': 'Paiement initié (fournisseur factice)'
+        })
+
+    def verify_payment(self, transaction_id):
+        return self._call(None, lambda: {
+            'success': True,
+            'status': 'COMPLETED',
+            'transaction_id': transaction_id
+        })
+
+    def process_refund(self, transaction_id, amount, idempotency_key=None):
+        return self._call(idempotency_key, lambda: {
+            'success': True,
+            'refund_id': f'REFUND-{transaction_id}'
+        })
+
+    def supports_transfers(self):
+        return True
+
+    def transfer_funds(self, amount, phone_number, reference, description="", idempotency_key=None):
+        return self._call(idempotency_key, lambda: {
+            'success': True,
+            'transfer_id': f'TRANSFER-{reference}'
+        })
+
+    def verify_webhook_signature(self, payload, signature):
+        return True
+
+
+PAYMENT_PROVIDERS = {
+    'ORANGE_MONEY': OrangeMoneyProvider,
+    'MTN_MONEY': MTNMoneyProvider,
+    'WAVE': WaveProvider,
+}
+
+
+def has_payment_provider(provider_type):
+    """Indique si la méthode de paiement passe par un fournisseur (mobile money)"""
+    return provider_type in PAYMENT_PROVIDERS
+
+
+def can_transfer_funds(provider_type):
+    """Indique si les distributions de cette méthode de paiement sont versées par l'outbox"""
+    return has_payment_provider(provider_type) and get_payment_provider(provider_type).supports_transfers()
+
+
 # Factory pour obtenir le bon fournisseur
 def get_payment_provider(provider_type):
     """
@@ -334,16 +538,13 @@ def get_payment_provider(provider_type):
         provider_type: Type de fournisseur ('ORANGE_MONEY', 'MTN_MONEY', 'WAVE')
         
     Returns:
-        Instance du fournisseur
+        Instance du fournisseur (FakeProvider si PAYMENT_USE_FAKE_PROVIDER est actif)
     """
-    providers = {
-        'ORANGE_MONEY': OrangeMoneyProvider,
-        'MTN_MONEY': MTNMoneyProvider,
-        'WAVE': WaveProvider,
-    }
-    
-    provider_class = providers.get(provider_type)
+    provider_class = PAYMENT_PROVIDERS.get(provider_type)
     if not provider_class:
         raise ValueError(f"Fournisseur de paiement inconnu: {provider_type}")
     
+    if getattr(settings, 'PAYMENT_USE_FAKE_PROVIDER', False):
+        return FakeProvider(provider_type)
+    
     return provider_class()
@@ -84,7 +84,7 @@ class EscrowAccountSerializer(serializers.ModelSerializer):
     """Serializer pour les comptes escrow"""
     
     status_display = serializers.CharField(source='get_status_display', read_only=True)
-    payment_id = serializers.UUIDField(source='payment.id', read_only=True)
+    payment_id = serializers.UUIDField(read_only=True)
     
     class Meta:
         model = EscrowAccount
@@ -113,7 +113,10 @@ class PaymentSerializer(serializers.ModelSerializer):
     # Relations imbriquées
     escrow = EscrowAccountSerializer(read_only=True)
     distributions = PaymentDistributionSerializer(many=True, read_only=True)
-    transactions = TransactionSerializer(many=True, read_only=True)
+    # Historique limité aux transactions les plus récentes (historique complet :
+    # /api/transactions/?payment=<id>) ; omis sauf si le contexte le demande
+    transactions = serializers.SerializerMethodField()
+    transactions_count = serializers.SerializerMethodField()
     
     # Informations de la demande d'occupation
     property_title = serializers.CharField(source='occupation_request.property.title', read_only=True)
@@ -142,6 +145,7 @@ class PaymentSerializer(serializers.ModelSerializer):
             'escrow',
             'distributions',
             'transactions',
+            'transactions_count',
             'property_title',
             'property_id'
         ]
@@ -154,6 +158,26 @@ class PaymentSerializer(serializers.ModelSerializer):
             'updated_at',
             'completed_at'
         ]
+    
+    # Nombre de transactions imbriquées par paiement
+    transactions_limit = 20
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.context.get('include_transactions', True):
+            self.fields.pop('transactions')
+            self.fields.pop('transactions_count')
+    
+    def get_transactions(self, obj):
+        # recent_transactions est préchargé par PaymentViewSet
+        transactions = getattr(obj, 'recent_transactions', None)
+        if transactions is None:
+            transactions = obj.transactions.order_by('-created_at')[:self.transactions_limit]
+        return TransactionSerializer(transactions, many=True).data
+    
+    def get_transactions_count(self, obj):
+        count = getattr(obj, 'transactions_count', None)
+        return obj.transactions.count() if count is None else count
 
 
 class PaymentInitiationSerializer(serializers.Serializer):
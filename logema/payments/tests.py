@@ -496,3 +496,880 @@ class PaymentDisputeTests(TestCase):
         dispute.status = 'CLOSED'
         dispute.save()
         self.assertEqual(dispute.status, 'CLOSED')
+
+
+class ProviderTransportTests(TestCase):
+    """Tests du transport HTTP partagé des fournisseurs"""
+
+    def setUp(self):
+        from payments.payment_providers import close_transports
+        close_transports()
+        self.addCleanup(close_transports)
+
+    def test_one_session_per_provider(self):
+        """Chaque fournisseur réutilise sa propre Session."""
+        from payments.payment_providers import OrangeMoneyProvider, WaveProvider
+
+        first = OrangeMoneyProvider().transport
+        self.assertIs(OrangeMoneyProvider().transport, first)
+        self.assertIsNot(WaveProvider().transport, first)
+
+    def test_timeouts_from_settings(self):
+        """Les timeouts connexion/lecture viennent des settings."""
+        from django.test import override_settings
+        from payments.payment_providers import get_transport
+
+        with override_settings(PAYMENT_PROVIDER_CONNECT_TIMEOUT=1.5, PAYMENT_PROVIDER_READ_TIMEOUT=4):
+            self.assertEqual(get_transport('ORANGE_MONEY').timeout, (1.5, 4))
+
+    def test_keep_alive_connection_reused(self):
+        """Deux appels successifs passent par la même connexion TCP."""
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from payments.payment_providers import get_transport
+
+        client_ports = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                client_ports.append(self.client_address[1])
+                body = b'{"status": "SUCCESS"}'
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        transport = get_transport('ORANGE_MONEY')
+        url = f'http://127.0.0.1:{server.server_address[1]}/transactionstatus'
+        for _ in range(3):
+            response = transport.post(url, json={'pay_token': 'abc'})
+            self.assertEqual(response.json(), {'status': 'SUCCESS'})
+
+        self.assertEqual(len(client_ports), 3)
+        self.assertEqual(len(set(client_ports)), 1)
+
+
+class PaymentOutboxTests(TestCase):
+    """Les appels aux fournisseurs passent par l'outbox, hors de la requête HTTP"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Kaloum", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Almamya", ville=ville)
+        secteur = Secteur.objects.create(name="Secteur 1", quartier=quartier)
+
+        self.tenant = User.objects.create_user(username='tenant', password='pass123')
+        self.owner = User.objects.create_user(
+            username='owner', password='pass123', is_proprietaire=True, phone='622111111'
+        )
+        prop = Property.objects.create(
+            owner=self.owner, title="Test Property", description="Test",
+            property_type="APPARTEMENT", price=5000000, secteur=secteur
+        )
+        self.occupation_request = OccupationRequest.objects.create(property=prop, user=self.tenant)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.tenant)
+
+    def initiate(self):
+        return self.client.post('/api/payments/initiate/', {
+            'occupation_request_id': self.occupation_request.id,
+            'payment_method': 'ORANGE_MONEY',
+            'payment_phone': '622000000',
+        }, format='json')
+
+    def drain_with(self, provider):
+        from unittest import mock
+        from payments import outbox
+
+        with mock.patch('payments.outbox.get_payment_provider', return_value=provider):
+            return outbox.drain()
+
+    def test_initiate_responds_pending_and_enqueues(self):
+        """L'API répond immédiatement : paiement PENDING et opération en attente."""
+        from payments.models import ProviderOperation
+
+        response = self.initiate()
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], 'PENDING')
+        payment = Payment.objects.get(id=response.data['payment_id'])
+        self.assertEqual(payment.status, 'PENDING')
+        op = ProviderOperation.objects.get(payment=payment)
+        self.assertEqual((op.operation, op.status), ('INITIATE', 'PENDING'))
+        self.assertEqual(op.idempotency_key, f'{payment.id}:INITIATE')
+
+    def test_worker_calls_provider_outside_atomic_block(self):
+        """Le worker appelle le fournisseur hors transaction, avec la clé d'idempotence."""
+        from django.db import connection
+
+        payment_id = self.initiate().data['payment_id']
+        baseline_depth = len(connection.atomic_blocks)
+        calls = []
+
+        class RecordingProvider:
+            def initiate_payment(self, amount, phone_number, reference, description="", idempotency_key=None):
+                calls.append((len(connection.atomic_blocks), idempotency_key))
+                return {'success': True, 'transaction_id': f'OM-{reference}', 'status': 'PENDING'}
+
+        self.assertEqual(self.drain_with(RecordingProvider()), 1)
+
+        self.assertEqual(calls, [(baseline_depth, f'{payment_id}:INITIATE')])
+        payment = Payment.objects.get(id=payment_id)
+        self.assertEqual(payment.status, 'PROCESSING')
+        self.assertEqual(payment.transaction_id, f'OM-{payment.id}')
+
+    def test_network_error_retried_then_failed(self):
+        """Une erreur réseau est réessayée avec backoff, puis l'échec est persisté."""
+        import requests
+        from django.test import override_settings
+        from payments.models import ProviderOperation
+
+        class FailingProvider:
+            def initiate_payment(self, **kwargs):
+                raise requests.ConnectTimeout('connect timeout')
+
+        payment_id = self.initiate().data['payment_id']
+
+        self.drain_with(FailingProvider())
+        op = ProviderOperation.objects.get(payment_id=payment_id)
+        self.assertEqual((op.status, op.attempts), ('PENDING', 1))
+        self.assertGreater(op.next_attempt_at, timezone.now())
+        self.assertEqual(self.drain_with(FailingProvider()), 0)
+
+        ProviderOperation.objects.update(next_attempt_at=timezone.now())
+        with override_settings(PAYMENT_OUTBOX_RETRY_DELAY=0):
+            while self.drain_with(FailingProvider()):
+                pass
+
+        op.refresh_from_db()
+        self.assertEqual((op.status, op.attempts), ('FAILED', op.max_attempts))
+        payment = Payment.objects.get(id=payment_id)
+        self.assertEqual(payment.status, 'FAILED')
+        self.assertEqual(payment.provider_response['error'], 'connect timeout')
+        self.assertTrue(Transaction.objects.filter(payment=payment, status='FAILED').exists())
+
+    def test_stale_processing_operation_is_reclaimed(self):
+        """Une opération réservée par un worker arrêté est reprise après expiration du verrou."""
+        from payments import outbox
+        from payments.models import ProviderOperation
+
+        self.initiate()
+        self.assertEqual(len(outbox.claim_due()), 1)
+        self.assertEqual(outbox.claim_due(), [])
+
+        ProviderOperation.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        reclaimed = outbox.claim_due()
+        self.assertEqual(len(reclaimed), 1)
+        self.assertEqual(reclaimed[0].attempts, 2)
+
+    def test_concurrent_claim_is_exclusive(self):
+        """Deux workers ayant lu la même opération : un seul la réserve."""
+        from payments import outbox
+        from payments.models import ProviderOperation
+
+        self.initiate()
+        now = timezone.now()
+        seen_by_first = ProviderOperation.objects.get()
+        seen_by_second = ProviderOperation.objects.get()
+        self.assertTrue(outbox.claim(seen_by_first, now))
+        self.assertFalse(outbox.claim(seen_by_second, now))
+        self.assertEqual(ProviderOperation.objects.get().attempts, 1)
+
+    def test_fake_provider_full_flow(self):
+        """Initiation, vérification, escrow puis transferts avec le fournisseur factice."""
+        from django.test import override_settings
+        from payments import outbox
+        from payments.escrow_manager import EscrowManager
+
+        with override_settings(PAYMENT_USE_FAKE_PROVIDER=True, PAYMENT_FAKE_PROVIDER_LATENCY=0):
+            payment_id = self.initiate().data['payment_id']
+            outbox.drain(workers=4)
+
+            response = self.client.post(f'/api/payments/{payment_id}/verify/')
+            self.assertEqual(response.data['status'], 'PROCESSING')
+            self.assertEqual(response.data['transaction_id'], f'FAKE-{payment_id}')
+            outbox.drain(workers=4)
+
+            response = self.client.post(f'/api/payments/{payment_id}/verify/')
+            self.assertEqual(response.data['status'], 'HELD_IN_ESCROW')
+            self.assertIn('escrow_id', response.data)
+
+            payment = Payment.objects.get(id=payment_id)
+            distributions = EscrowManager.release_payment(payment.escrow)
+            self.assertEqual({d.status for d in distributions}, {'PENDING'})
+            outbox.drain(workers=4)
+
+        owner_distribution = PaymentDistribution.objects.get(payment=payment, recipient=self.owner)
+        self.assertEqual(owner_distribution.status, 'COMPLETED')
+        self.assertEqual(owner_distribution.transfer_reference, f'TRANSFER-{owner_distribution.pk}')
+        self.assertEqual(Transaction.objects.filter(payment=payment, transaction_type='TRANSFER').count(), 1)
+
+
+class PaymentWebhookInboxTests(TestCase):
+    """Les webhooks sont enregistrés et acquittés, puis appliqués par le consommateur"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Kaloum", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Almamya", ville=ville)
+        secteur = Secteur.objects.create(name="Secteur 1", quartier=quartier)
+
+        tenant = User.objects.create_user(username='tenant', password='pass123')
+        owner = User.objects.create_user(username='owner', password='pass123', is_proprietaire=True)
+        prop = Property.objects.create(
+            owner=owner, title="Test Property", description="Test",
+            property_type="APPARTEMENT", price=5000000, secteur=secteur
+        )
+        occupation = OccupationRequest.objects.create(property=prop, user=tenant)
+        self.payment = Payment.objects.create(
+            occupation_request=occupation,
+            payer=tenant,
+            amount=Decimal('5000000'),
+            payment_method='ORANGE_MONEY',
+            status='PROCESSING',
+            transaction_id='OM-123'
+        )
+        self.client = APIClient()
+
+    def post_webhook(self, status='COMPLETED', transaction_id='OM-123'):
+        return self.client.post('/api/payments/webhook/orange/', {
+            'transaction_id': transaction_id,
+            'status': status,
+        }, format='json')
+
+    def test_webhook_acknowledged_without_processing(self):
+        """Le webhook est acquitté sans toucher au paiement ; les renvois sont dédoublonnés."""
+        from payments.models import WebhookEvent
+
+        for _ in range(3):
+            response = self.post_webhook()
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'PROCESSING')
+
+        # Un autre statut pour la même transaction est un autre événement
+        self.post_webhook(status='FAILED')
+        self.assertEqual(WebhookEvent.objects.count(), 2)
+
+    def test_consumer_is_idempotent(self):
+        """Appliquer puis rejouer un événement ne crée qu'un seul escrow."""
+        from payments import webhooks
+        from payments.models import WebhookEvent
+
+        self.post_webhook()
+        self.assertEqual(webhooks.process_pending(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'HELD_IN_ESCROW')
+
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.processing_status, 'DONE')
+        self.assertEqual(webhooks.replay(WebhookEvent.objects.all()), 1)
+        webhooks.process_pending()
+
+        event.refresh_from_db()
+        self.assertEqual((event.processing_status, event.attempts), ('IGNORED', 2))
+        self.assertEqual(EscrowAccount.objects.filter(payment=self.payment).count(), 1)
+
+    def test_webhook_before_initiate_result(self):
+        """Un webhook arrivé avant l'enregistrement du transaction_id est réessayé, pas ignoré."""
+        from payments import webhooks
+        from payments.models import WebhookEvent
+
+        Payment.objects.filter(pk=self.payment.pk).update(status='PENDING', transaction_id='')
+        self.post_webhook()
+        self.assertEqual(webhooks.process_pending(), 1)
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.processing_status, 'PENDING')
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        # Pas encore dû
+        self.assertEqual(webhooks.process_pending(), 0)
+
+        # L'outbox enregistre le résultat de l'initiation, puis l'essai suivant arrive
+        Payment.objects.filter(pk=self.payment.pk).update(status='PROCESSING', transaction_id='OM-123')
+        WebhookEvent.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(webhooks.process_pending(), 1)
+        self.assertEqual(WebhookEvent.objects.get().processing_status, 'DONE')
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'HELD_IN_ESCROW')
+
+    def test_unknown_transaction_fails_after_retries(self):
+        """Une transaction toujours inconnue passe en échec, rejouable, après les essais."""
+        from django.test import override_settings
+        from payments import webhooks
+        from payments.models import WebhookEvent
+
+        self.post_webhook(transaction_id='OM-UNKNOWN')
+        with override_settings(PAYMENT_WEBHOOK_MAX_ATTEMPTS=2):
+            webhooks.process_pending()
+            WebhookEvent.objects.update(next_attempt_at=timezone.now())
+            webhooks.process_pending()
+        event = WebhookEvent.objects.get()
+        self.assertEqual((event.processing_status, event.attempts), ('FAILED', 2))
+
+    def test_replay_command_requeues_failures(self):
+        """La commande de rejeu remet les échecs en file."""
+        from io import StringIO
+        from django.core.management import call_command
+        from payments.models import WebhookEvent
+
+        self.post_webhook()
+        WebhookEvent.objects.update(processing_status='FAILED', error_message='database is locked')
+        self.post_webhook(status='FAILED')
+        WebhookEvent.objects.filter(event_status='FAILED').update(processing_status='DONE')
+
+        call_command('replay_payment_webhooks', stdout=StringIO())
+        self.assertEqual(
+            list(WebhookEvent.objects.order_by('id').values_list('processing_status', flat=True)),
+            ['PENDING', 'DONE']
+        )
+
+        call_command('process_payment_webhooks', '--once', stdout=StringIO())
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'HELD_IN_ESCROW')
+
+
+class EscrowBatchReleaseTests(TestCase):
+    """Libération par lots des escrows arrivés à échéance"""
+
+    def setUp(self):
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Kaloum", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Almamya", ville=ville)
+        self.secteur = Secteur.objects.create(name="Secteur 1", quartier=quartier)
+
+        self.tenant = User.objects.create_user(username='tenant', password='pass123')
+        self.owner = User.objects.create_user(username='owner', password='pass123', is_proprietaire=True)
+        self.agent = User.objects.create_user(username='agent', password='pass123', is_demarcheur=True)
+
+    def create_escrow(self, payment_method='CASH', days_overdue=1):
+        prop = Property.objects.create(
+            owner=self.owner, agent=self.agent, title="Test Property", description="Test",
+            property_type="APPARTEMENT", price=1000000, secteur=self.secteur
+        )
+        occupation = OccupationRequest.objects.create(property=prop, user=self.tenant)
+        payment = Payment.objects.create(
+            occupation_request=occupation,
+            payer=self.tenant,
+            amount=Decimal('1000000'),
+            payment_method=payment_method,
+            status='HELD_IN_ESCROW'
+        )
+        return EscrowAccount.objects.create(
+            payment=payment,
+            held_amount=payment.amount,
+            status='HOLDING',
+            release_scheduled_date=timezone.now() - timedelta(days=days_overdue)
+        )
+
+    def test_batch_queries_do_not_grow_with_batch(self):
+        """Le nombre de requêtes d'un lot ne dépend pas du nombre d'escrows."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from payments.escrow_manager import EscrowManager
+
+        # Premier lot : création des comptes du grand livre
+        self.create_escrow()
+        EscrowManager.release_expired_batch(batch_size=10)
+
+        counts = []
+        for size in (2, 6):
+            for _ in range(size):
+                self.create_escrow()
+            with CaptureQueriesContext(connection) as queries:
+                claimed, failed = EscrowManager.release_expired_batch(batch_size=10)
+            self.assertEqual((claimed, failed), (size, []))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_failed_escrow_is_logged_and_isolated(self):
+        """L'échec du lot et celui de l'escrow fautif sont journalisés ; les autres sont libérés."""
+        from unittest.mock import patch
+        from payments.escrow_manager import EscrowManager
+
+        good = self.create_escrow()
+        bad = self.create_escrow()
+        calculate = EscrowManager.calculate_distributions
+
+        def failing(payment):
+            if payment.pk == bad.payment_id:
+                raise ValueError("répartition impossible")
+            return calculate(payment)
+
+        with patch.object(EscrowManager, 'calculate_distributions', side_effect=failing), \
+                self.assertLogs('payments.escrow_manager', level='ERROR') as logs:
+            claimed, failed = EscrowManager.release_expired_batch(batch_size=10)
+
+        self.assertEqual((claimed, failed), (2, [bad.id]))
+        self.assertEqual(len(logs.records), 2)
+        self.assertTrue(all(record.exc_info for record in logs.records))
+        good.refresh_from_db()
+        self.assertEqual(good.status, 'RELEASED')
+
+    def test_auto_release_expired_escrows(self):
+        """Les escrows échus sont libérés et distribués ; les autres restent retenus."""
+        from payments.escrow_manager import EscrowManager
+
+        expired = [self.create_escrow() for _ in range(5)]
+        pending = self.create_escrow(days_overdue=-3)
+
+        self.assertEqual(EscrowManager.auto_release_expired_escrows(batch_size=2), 5)
+
+        for escrow in expired:
+            escrow.refresh_from_db()
+            self.assertEqual(escrow.status, 'RELEASED')
+            self.assertEqual(escrow.payment.status, 'RELEASED')
+            self.assertEqual(escrow.payment.occupation_request.status, 'VALIDATED')
+            self.assertEqual(escrow.payment.occupation_request.payment_status, 'PAID')
+            self.assertEqual(
+                sorted(escrow.payment.distributions.values_list('distribution_type', 'status')),
+                [('AGENT_COMMISSION', 'COMPLETED'), ('OWNER_PAYMENT', 'COMPLETED')]
+            )
+            self.assertEqual(escrow.payment.transactions.filter(transaction_type='TRANSFER').count(), 2)
+
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'HOLDING')
+
+    def test_mobile_money_transfers_enqueued(self):
+        """Avec un fournisseur mobile money, les transferts passent par l'outbox."""
+        from payments.escrow_manager import EscrowManager
+        from payments.models import ProviderOperation
+
+        escrow = self.create_escrow(payment_method='ORANGE_MONEY')
+        EscrowManager.auto_release_expired_escrows()
+
+        self.assertEqual(
+            set(escrow.payment.distributions.values_list('status', flat=True)), {'PENDING'}
+        )
+        self.assertEqual(
+            ProviderOperation.objects.filter(payment=escrow.payment, operation='TRANSFER').count(), 2
+        )
+
+    def test_transfers_not_enqueued_without_payout_api(self):
+        """Hors simulation, sans API de versement, les distributions attendent un versement manuel."""
+        from django.test import override_settings
+        from payments import outbox
+        from payments.escrow_manager import EscrowManager
+        from payments.models import ProviderOperation
+
+        escrow = self.create_escrow(payment_method='ORANGE_MONEY')
+        with override_settings(PAYMENT_SANDBOX_MODE=False, ORANGE_MONEY_API_KEY='key'):
+            EscrowManager.auto_release_expired_escrows()
+
+            self.assertEqual(
+                set(escrow.payment.distributions.values_list('status', flat=True)), {'PENDING'}
+            )
+            self.assertFalse(ProviderOperation.objects.filter(operation='TRANSFER').exists())
+
+            # Un transfert déjà en file ne passe pas la distribution en FAILED
+            distribution = escrow.payment.distributions.first()
+            outbox.enqueue_transfers([distribution])
+            outbox.drain()
+            self.assertEqual(ProviderOperation.objects.get(operation='TRANSFER').status, 'FAILED')
+            distribution.refresh_from_db()
+            self.assertEqual(distribution.status, 'PENDING')
+
+    def test_release_escrows_command(self):
+        """La commande libère tout le backlog (un seul worker sans SKIP LOCKED)."""
+        from io import StringIO
+        from django.core.management import call_command
+
+        for _ in range(3):
+            self.create_escrow()
+        out = StringIO()
+        call_command('release_escrows', '--batch-size', '2', '--workers', '1', stdout=out)
+
+        self.assertIn('3 escrow(s) libéré(s)', out.getvalue())
+        self.assertFalse(EscrowAccount.objects.filter(status='HOLDING').exists())
+
+
+class LedgerTests(TestCase):
+    """Grand livre en partie double et soldes par utilisateur"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Kaloum", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Almamya", ville=ville)
+        self.secteur = Secteur.objects.create(name="Secteur 1", quartier=quartier)
+
+        self.tenant = User.objects.create_user(username='tenant', password='pass123')
+        self.owner = User.objects.create_user(username='owner', password='pass123', is_proprietaire=True)
+        self.agent = User.objects.create_user(username='agent', password='pass123', is_demarcheur=True)
+        self.client = APIClient()
+
+    def create_payment(self, amount='1000000'):
+        prop = Property.objects.create(
+            owner=self.owner, agent=self.agent, title="Test Property", description="Test",
+            property_type="APPARTEMENT", price=1000000, secteur=self.secteur
+        )
+        occupation = OccupationRequest.objects.create(property=prop, user=self.tenant)
+        return Payment.objects.create(
+            occupation_request=occupation,
+            payer=self.tenant,
+            amount=Decimal(amount),
+            payment_method='CASH',
+            status='PROCESSING'
+        )
+
+    def balances(self, user):
+        from payments.ledger import get_balances
+        return get_balances(user)
+
+    def test_hold_release_balances(self):
+        """Mise en escrow puis libération : les parts passent de HELD à AVAILABLE."""
+        from payments.escrow_manager import EscrowManager
+
+        escrow = EscrowManager.hold_payment(self.create_payment())
+        self.assertEqual(self.balances(self.owner), {'HELD': Decimal('880000.00'), 'AVAILABLE': Decimal('0')})
+        self.assertEqual(self.balances(self.agent)['HELD'], Decimal('100000.00'))
+
+        EscrowManager.release_payment(escrow)
+        self.assertEqual(self.balances(self.owner), {'HELD': Decimal('0.00'), 'AVAILABLE': Decimal('880000.00')})
+        self.assertEqual(self.balances(self.agent)['AVAILABLE'], Decimal('100000.00'))
+
+    def test_stale_release_is_not_repeated(self):
+        """Une seconde libération (instance périmée) ne duplique ni distributions ni écritures RELEASE."""
+        from django.db import transaction
+        from payments.escrow_manager import EscrowManager
+        from payments.models import LedgerEntry, PaymentDistribution
+
+        escrow = EscrowManager.hold_payment(self.create_payment())
+        stale = EscrowAccount.objects.get(pk=escrow.pk)
+        EscrowManager.release_payment(escrow)
+
+        with self.assertRaises(ValueError):
+            EscrowManager.release_payment(stale)
+        stale = EscrowAccount.objects.select_related('payment__occupation_request__property').get(pk=escrow.pk)
+        stale.status = 'HOLDING'
+        with transaction.atomic():
+            self.assertEqual(EscrowManager.release_escrows([stale]), [])
+
+        self.assertEqual(PaymentDistribution.objects.filter(payment=escrow.payment).count(), 2)
+        self.assertEqual(LedgerEntry.objects.filter(payment=escrow.payment, entry_type='RELEASE').count(), 1)
+        self.assertEqual(self.balances(self.owner)['AVAILABLE'], Decimal('880000.00'))
+
+    def test_refund_returns_held_funds(self):
+        """Un remboursement vide les comptes HELD vers la compensation."""
+        from payments.escrow_manager import EscrowManager
+        from payments.models import LedgerAccount
+
+        payment = self.create_payment()
+        EscrowManager.hold_payment(payment)
+        EscrowManager.process_refund(payment, reason="Annulation")
+
+        self.assertEqual(self.balances(self.owner), {'HELD': Decimal('0.00'), 'AVAILABLE': Decimal('0')})
+        clearing = LedgerAccount.objects.get(user__isnull=True, account_type='CLEARING')
+        self.assertEqual(clearing.balance, Decimal('0.00'))
+
+    def test_refund_after_release_is_refused(self):
+        """Un remboursement sur une instance périmée d'un escrow libéré n'écrit rien au grand livre."""
+        from payments.escrow_manager import EscrowManager
+        from payments.models import LedgerEntry
+
+        payment = self.create_payment()
+        escrow = EscrowManager.hold_payment(payment)
+        # Paiement lu avant la libération : son escrow chargé est encore HOLDING
+        stale_payment = Payment.objects.select_related('escrow').get(pk=payment.pk)
+        EscrowManager.release_payment(escrow)
+
+        with self.assertRaises(ValueError):
+            EscrowManager.process_refund(stale_payment, reason="Annulation")
+        with self.assertRaises(ValueError):
+            EscrowManager.process_refund(Payment.objects.get(pk=payment.pk), reason="Annulation")
+
+        self.assertEqual(
+            list(LedgerEntry.objects.filter(payment=payment).values_list('entry_type', flat=True)),
+            ['HOLD', 'RELEASE']
+        )
+        self.assertEqual(EscrowAccount.objects.get(pk=escrow.pk).status, 'RELEASED')
+        self.assertEqual(self.balances(self.owner)['AVAILABLE'], Decimal('880000.00'))
+
+    def test_release_without_hold_entry(self):
+        """Un escrow antérieur au grand livre reçoit son HOLD lors de la libération."""
+        from payments.escrow_manager import EscrowManager
+        from payments.models import LedgerEntry
+
+        payment = self.create_payment()
+        escrow = EscrowAccount.objects.create(payment=payment, held_amount=payment.amount, status='HOLDING')
+        EscrowManager.release_payment(escrow)
+
+        self.assertEqual(
+            list(LedgerEntry.objects.filter(payment=payment).values_list('entry_type', flat=True)),
+            ['HOLD', 'RELEASE']
+        )
+        self.assertEqual(self.balances(self.owner)['AVAILABLE'], Decimal('880000.00'))
+
+    def test_entries_are_immutable(self):
+        """Les écritures ne peuvent être ni modifiées ni supprimées."""
+        from payments.escrow_manager import EscrowManager
+        from payments.models import LedgerEntry
+
+        EscrowManager.hold_payment(self.create_payment())
+        entry = LedgerEntry.objects.get()
+        with self.assertRaises(ValueError):
+            entry.save()
+        with self.assertRaises(ValueError):
+            entry.lines.first().delete()
+
+    def test_reconcile_ledger_command(self):
+        """La réconciliation détecte un solde divergent et le corrige avec --fix."""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from payments.escrow_manager import EscrowManager
+        from payments.models import LedgerAccount
+
+        for _ in range(3):
+            EscrowManager.hold_payment(self.create_payment())
+        call_command('reconcile_ledger', stdout=StringIO())
+
+        LedgerAccount.objects.filter(user=self.owner).update(balance=Decimal('1'))
+        with self.assertRaises(CommandError):
+            call_command('reconcile_ledger', stdout=StringIO())
+        call_command('reconcile_ledger', '--fix', stdout=StringIO())
+        self.assertEqual(self.balances(self.owner)['HELD'], Decimal('2640000.00'))
+
+    def test_backfill_holds_for_existing_escrows(self):
+        """Les escrows HOLDING antérieurs au grand livre reçoivent leur HOLD avec --backfill."""
+        from io import StringIO
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+        from payments.escrow_manager import EscrowManager
+        from payments.models import LedgerEntry
+
+        EscrowManager.hold_payment(self.create_payment())
+        legacy = self.create_payment()
+        EscrowAccount.objects.create(payment=legacy, held_amount=legacy.amount, status='HOLDING')
+
+        with self.assertRaises(CommandError):
+            call_command('reconcile_ledger', stdout=StringIO())
+        call_command('reconcile_ledger', '--backfill', stdout=StringIO())
+        call_command('reconcile_ledger', '--backfill', stdout=StringIO())
+
+        self.assertEqual(LedgerEntry.objects.filter(payment=legacy, entry_type='HOLD').count(), 1)
+        self.assertEqual(self.balances(self.owner)['HELD'], Decimal('1760000.00'))
+
+    def test_delete_user_with_ledger_history(self):
+        """Supprimer un utilisateur ou un bien référencé par le grand livre est refusé (409)."""
+        from payments.escrow_manager import EscrowManager
+        from payments.models import LedgerEntry
+
+        payment = self.create_payment()
+        EscrowManager.hold_payment(payment)
+        admin = User.objects.create_user(username='admin', password='pass123', is_staff=True)
+        self.client.force_authenticate(user=admin)
+
+        response = self.client.delete(f'/api/admin/users/{self.owner.pk}/')
+        self.assertEqual(response.status_code, 409)
+        response = self.client.delete(f'/api/admin/properties/{payment.occupation_request.property_id}/')
+        self.assertEqual(response.status_code, 409)
+
+        self.assertTrue(User.objects.filter(pk=self.owner.pk).exists())
+        self.assertTrue(LedgerEntry.objects.filter(payment=payment, entry_type='HOLD').exists())
+        self.assertEqual(self.balances(self.owner)['HELD'], Decimal('880000.00'))
+
+    def test_wallet_endpoint(self):
+        """GET /api/payments/wallet/ lit les soldes en une requête."""
+        from payments.escrow_manager import EscrowManager
+
+        EscrowManager.hold_payment(self.create_payment())
+        self.client.force_authenticate(user=self.owner)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/payments/wallet/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Decimal(response.data['held']), Decimal('880000.00'))
+        self.assertEqual(Decimal(response.data['available']), Decimal('0'))
+
+
+class PaymentVisibilityTests(TestCase):
+    """Filtres de visibilité sur les colonnes dénormalisées owner / agent"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Kaloum", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Almamya", ville=ville)
+        secteur = Secteur.objects.create(name="Secteur 1", quartier=quartier)
+
+        self.tenant = User.objects.create_user(username='tenant', password='pass123')
+        self.owner = User.objects.create_user(username='owner', password='pass123', is_proprietaire=True)
+        self.agent = User.objects.create_user(username='agent', password='pass123', is_demarcheur=True)
+        self.stranger = User.objects.create_user(username='stranger', password='pass123')
+        prop = Property.objects.create(
+            owner=self.owner, agent=self.agent, title="Test Property", description="Test",
+            property_type="APPARTEMENT", price=1000000, secteur=secteur
+        )
+        occupation = OccupationRequest.objects.create(property=prop, user=self.tenant)
+        self.payment = Payment.objects.create(
+            occupation_request=occupation,
+            payer=self.tenant,
+            amount=Decimal('1000000'),
+            payment_method='CASH',
+            status='PROCESSING'
+        )
+        self.client = APIClient()
+
+    def test_participants_copied_at_creation(self):
+        """Le propriétaire et l'agent du bien sont copiés sur le paiement."""
+        self.assertEqual(self.payment.owner, self.owner)
+        self.assertEqual(self.payment.agent, self.agent)
+
+    def test_participants_see_payment_escrow_and_transactions(self):
+        """Payeur, propriétaire et agent voient le paiement, son escrow et ses transactions."""
+        from payments.escrow_manager import EscrowManager
+
+        EscrowManager.hold_payment(self.payment)
+        for user in (self.tenant, self.owner, self.agent):
+            self.client.force_authenticate(user=user)
+            for url in ('/api/payments/', '/api/escrow/', '/api/transactions/'):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                results = response.data['results'] if isinstance(response.data, dict) else response.data
+                self.assertEqual(len(results), 1, f"{user.username} {url}")
+
+    def test_stranger_sees_nothing(self):
+        """Un utilisateur sans lien avec le paiement ne le voit pas."""
+        self.client.force_authenticate(user=self.stranger)
+        response = self.client.get(f'/api/payments/{self.payment.id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_visibility_filter_has_no_join(self):
+        """Le filtre porte sur la seule table des paiements (hors plan de chargement de la liste)."""
+        from types import SimpleNamespace
+        from payments.views import PaymentViewSet
+
+        view = PaymentViewSet(request=SimpleNamespace(user=self.owner), action='destroy')
+        sql = str(view.get_queryset().query)
+        self.assertNotIn('JOIN', sql)
+
+
+class PaymentSerializerQueryTests(TestCase):
+    """Nombre de requêtes des endpoints de paiement indépendant du nombre de paiements"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Kaloum", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Almamya", ville=ville)
+        self.secteur = Secteur.objects.create(name="Secteur 1", quartier=quartier)
+
+        self.tenant = User.objects.create_user(username='tenant', password='pass123')
+        self.owner = User.objects.create_user(username='owner', password='pass123', is_proprietaire=True)
+        self.agent = User.objects.create_user(username='agent', password='pass123', is_demarcheur=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.owner)
+
+    def create_released_payments(self, count, transactions=0):
+        from payments.escrow_manager import EscrowManager
+
+        payments = []
+        for _ in range(count):
+            prop = Property.objects.create(
+                owner=self.owner, agent=self.agent, title="Test Property", description="Test",
+                property_type="APPARTEMENT", price=1000000, secteur=self.secteur
+            )
+            occupation = OccupationRequest.objects.create(property=prop, user=self.tenant)
+            payment = Payment.objects.create(
+                occupation_request=occupation,
+                payer=self.tenant,
+                amount=Decimal('1000000'),
+                payment_method='CASH',
+                status='PROCESSING'
+            )
+            EscrowManager.release_payment(EscrowManager.hold_payment(payment))
+            for _ in range(transactions):
+                Transaction.objects.create(
+                    payment=payment, transaction_type='PAYMENT', amount=payment.amount, status='COMPLETED'
+                )
+            payments.append(payment)
+        return payments
+
+    def count_queries(self, url, params=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_list_queries_constant(self):
+        """La liste coûte le même nombre de requêtes pour 2 ou 8 paiements."""
+        self.create_released_payments(2)
+        small, _ = self.count_queries('/api/payments/')
+        self.create_released_payments(6)
+        large, response = self.count_queries('/api/payments/')
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 3)
+        self.assertEqual(len(response.data), 8)
+        self.assertNotIn('transactions', response.data[0])
+        self.assertEqual(len(response.data[0]['distributions']), 2)
+        self.assertIn(response.data[0]['distributions'][0]['recipient_username'], ('owner', 'agent'))
+
+    def test_list_with_transactions_queries_constant(self):
+        """?include=transactions ajoute une seule requête."""
+        self.create_released_payments(2)
+        small, _ = self.count_queries('/api/payments/', {'include': 'transactions'})
+        self.create_released_payments(6)
+        large, response = self.count_queries('/api/payments/', {'include': 'transactions'})
+
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 4)
+        self.assertIn('transactions', response.data[0])
+
+    def test_retrieve_limits_nested_transactions(self):
+        """Le détail imbrique les transactions les plus récentes et leur nombre total."""
+        from payments.serializers import PaymentSerializer
+
+        payment = self.create_released_payments(1, transactions=PaymentSerializer.transactions_limit + 5)[0]
+        queries, response = self.count_queries(f'/api/payments/{payment.id}/')
+
+        self.assertLessEqual(queries, 4)
+        self.assertEqual(len(response.data['transactions']), PaymentSerializer.transactions_limit)
+        total = Transaction.objects.filter(payment=payment).count()
+        self.assertEqual(response.data['transactions_count'], total)
+        self.assertEqual(response.data['escrow']['payment_id'], str(payment.id))
+
+        # Historique complet via /api/transactions/?payment=<id>
+        response = self.client.get('/api/transactions/', {'payment': payment.id, 'page_size': total})
+        self.assertEqual(len(response.data['results']), total)
+        self.assertIsNone(response.data['next'])
+
+        response = self.client.get('/api/transactions/', {'payment': payment.id, 'page_size': 10})
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertIsNotNone(response.data['next'])
@@ -1,5 +1,7 @@
 from django.utils import timezone
 from django.db import transaction as db_transaction
+from django.db.models import Count, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -14,6 +16,7 @@ from .models import (
     PaymentMethod,
     PaymentDispute
 )
+from .pagination import TransactionCursorPagination
 from .serializers import (
     PaymentSerializer,
     PaymentInitiationSerializer,
@@ -24,35 +27,79 @@ from .serializers import (
     PaymentDisputeSerializer
 )
 from .payment_providers import get_payment_provider
+from . import ledger, outbox, webhooks
 from .escrow_manager import EscrowManager
 from transactions.models import OccupationRequest
 
 
+# Plan de chargement de PaymentSerializer : une requête par relation imbriquée,
+# quel que soit le nombre de paiements
+PAYMENT_SELECT_RELATED = ('payer', 'escrow', 'occupation_request__property')
+DISTRIBUTIONS_PREFETCH = Prefetch(
+    'distributions',
+    queryset=PaymentDistribution.objects.select_related('recipient')
+)
+
+
+def recent_transactions_prefetch(limit):
+    return Prefetch(
+        'transactions',
+        queryset=Transaction.objects.order_by('-created_at')[:limit],
+        to_attr='recent_transactions'
+    )
+
+
 class PaymentViewSet(viewsets.ModelViewSet):
     """ViewSet pour la gestion des paiements"""
     
     serializer_class = PaymentSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    def include_transactions(self):
+        """
+        Transactions imbriquées : toujours sur le détail, sur la liste
+        uniquement avec ?include=transactions
+        """
+        if self.action == 'retrieve':
+            return True
+        include = self.request.query_params.get('include', '')
+        return 'transactions' in include.split(',')
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include_transactions'] = self.include_transactions()
+        return context
+    
     def get_queryset(self):
         """Les utilisateurs ne voient que leurs propres paiements"""
         user = self.request.user
         
         # Admin voit tout
         if user.is_staff:
-            return Payment.objects.all()
+            queryset = Payment.objects.all()
+        else:
+            # Les utilisateurs voient leurs paiements effectués ou reçus
+            queryset = Payment.objects.filter(Q(payer=user) | Q(owner=user) | Q(agent=user))
         
-        # Les utilisateurs voient leurs paiements effectués ou reçus
-        return Payment.objects.filter(payer=user) | Payment.objects.filter(
-            occupation_request__property__owner=user
-        ) | Payment.objects.filter(
-            occupation_request__property__agent=user
-        )
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+        
+        queryset = queryset.select_related(*PAYMENT_SELECT_RELATED).prefetch_related(DISTRIBUTIONS_PREFETCH)
+        if self.include_transactions():
+            queryset = queryset.prefetch_related(
+                recent_transactions_prefetch(PaymentSerializer.transactions_limit)
+            ).annotate(
+                transactions_count=Coalesce(Subquery(
+                    Transaction.objects.filter(payment=OuterRef('pk'))
+                    .order_by().values('payment').annotate(total=Count('id')).values('total')
+                ), 0)
+            )
+        return queryset
     
     @action(detail=False, methods=['post'])
     def initiate(self, request):
         """
-        Initie un nouveau paiement
+        Initie un nouveau paiement (réponse immédiate, paiement en PENDING)
         POST /api/payments/initiate/
         """
         serializer = PaymentInitiationSerializer(data=request.data, context={'request': request})
@@ -64,9 +111,20 @@ class PaymentViewSet(viewsets.ModelViewSet):
         save_method = serializer.validated_data.get('save_payment_method', False)
         
         try:
+            # Fournisseur inconnu : refus immédiat
+            get_payment_provider(payment_method)
+        except ValueError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            # Le paiement et l'opération d'initiation sont validés ensemble ;
+            # l'appel au fournisseur est fait par la commande process_payment_outbox
             with db_transaction.atomic():
                 # Récupérer la demande d'occupation
-                occupation = OccupationRequest.objects.get(id=occupation_id)
+                occupation = OccupationRequest.objects.select_related('property').get(id=occupation_id)
                 
                 # Calculer le montant
                 if not occupation.payment_amount:
@@ -84,71 +142,23 @@ class PaymentViewSet(viewsets.ModelViewSet):
                     status='PENDING',
                     description=f"Paiement pour {occupation.property.title}"
                 )
+                outbox.enqueue(payment, 'INITIATE')
                 
-                # Initier le paiement avec le fournisseur
-                provider = get_payment_provider(payment_method)
-                result = provider.initiate_payment(
-                    amount=float(payment.amount),
-                    phone_number=payment_phone,
-                    reference=str(payment.id),
-                    description=payment.description
-                )
-                
-                # Mettre à jour le paiement avec la réponse du fournisseur
-                if result.get('success'):
-                    payment.status = 'PROCESSING'
-                    payment.transaction_id = result.get('transaction_id')
-                    payment.provider_reference = result.get('transaction_id')
-                    payment.provider_response = result
-                    payment.save()
-                    
-                    # Créer une transaction
-                    Transaction.objects.create(
-                        payment=payment,
-                        transaction_type='PAYMENT',
-                        amount=payment.amount,
-                        status='PROCESSING',
-                        description="Paiement initié",
-                        provider_response=result
+                # Sauvegarder la méthode de paiement si demandé
+                if save_method:
+                    PaymentMethod.objects.get_or_create(
+                        user=request.user,
+                        method_type=payment_method,
+                        phone_number=payment_phone,
+                        defaults={'is_verified': False}
                     )
-                    
-                    # Sauvegarder la méthode de paiement si demandé
-                    if save_method:
-                        PaymentMethod.objects.get_or_create(
-                            user=request.user,
-                            method_type=payment_method,
-                            phone_number=payment_phone,
-                            defaults={'is_verified': False}
-                        )
-                    
-                    return Response({
-                        'success': True,
-                        'payment_id': payment.id,
-                        'transaction_id': payment.transaction_id,
-                        'status': payment.status,
-                        'message': result.get('message'),
-                        'ussd_code': result.get('ussd_code'),
-                        'payment_url': result.get('payment_url')
-                    }, status=status.HTTP_201_CREATED)
-                else:
-                    payment.status = 'FAILED'
-                    payment.provider_response = result
-                    payment.save()
-                    
-                    Transaction.objects.create(
-                        payment=payment,
-                        transaction_type='PAYMENT',
-                        amount=payment.amount,
-                        status='FAILED',
-                        description="Échec de l'initiation",
-                        error_message=result.get('message', 'Erreur inconnue'),
-                        provider_response=result
-                    )
-                    
-                    return Response({
-                        'success': False,
-                        'message': result.get('message', 'Erreur lors de l\'initiation du paiement')
-                    }, status=status.HTTP_400_BAD_REQUEST)
+            
+            return Response({
+                'success': True,
+                'payment_id': payment.id,
+                'status': payment.status,
+                'message': 'Paiement en cours d\'initiation'
+            }, status=status.HTTP_202_ACCEPTED)
                     
         except Exception as e:
             return Response({
@@ -156,60 +166,74 @@ class PaymentViewSet(viewsets.ModelViewSet):
                 'message': f'Erreur: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
+    @action(detail=False, methods=['get'])
+    def wallet(self, request):
+        """
+        Soldes du grand livre de l'utilisateur (retenu en escrow / libéré)
+        GET /api/payments/wallet/
+        """
+        balances = ledger.get_balances(request.user)
+        return Response({
+            'held': balances['HELD'],
+            'available': balances['AVAILABLE'],
+            'currency': 'GNF'
+        })
+    
     @action(detail=True, methods=['post'])
     def verify(self, request, pk=None):
         """
-        Vérifie le statut d'un paiement auprès du fournisseur
+        Retourne le statut d'un paiement et planifie sa vérification auprès du fournisseur
         POST /api/payments/{id}/verify/
         """
         payment = self.get_object()
         
-        if not payment.transaction_id:
+        if payment.status == 'PENDING':
+            # Initiation pas encore traitée par le worker
             return Response({
-                'success': False,
-                'message': 'Aucun ID de transaction disponible'
-            }, status=status.HTTP_400_BAD_REQUEST)
+                'success': True,
+                'status': payment.status,
+                'message': 'Paiement en cours d\'initiation'
+            })
         
-        try:
-            provider = get_payment_provider(payment.payment_method)
-            result = provider.verify_payment(payment.transaction_id)
-            
-            if result.get('success'):
-                # Mettre à jour le statut du paiement
-                provider_status = result.get('status')
-                
-                if provider_status == 'COMPLETED' and payment.status != 'HELD_IN_ESCROW':
-                    # Paiement réussi, placer en escrow
-                    payment.status = 'PROCESSING'
-                    payment.save()
-                    
-                    # Créer le compte escrow
-                    escrow = EscrowManager.hold_payment(payment)
-                    
-                    return Response({
-                        'success': True,
-                        'status': payment.status,
-                        'message': 'Paiement vérifié et placé en escrow',
-                        'escrow_id': escrow.id
-                    })
-                
-                return Response({
-                    'success': True,
-                    'status': payment.status,
-                    'provider_status': provider_status,
-                    'message': result.get('message', 'Paiement vérifié')
-                })
-            else:
+        if payment.status == 'PROCESSING':
+            if not payment.transaction_id:
                 return Response({
                     'success': False,
-                    'message': result.get('message', 'Erreur de vérification')
+                    'message': 'Aucun ID de transaction disponible'
                 }, status=status.HTTP_400_BAD_REQUEST)
-                
-        except Exception as e:
+            
+            # La vérification auprès du fournisseur est faite par le worker ;
+            # le client relance /verify/ jusqu'au passage en escrow
+            with db_transaction.atomic():
+                outbox.enqueue(payment, 'VERIFY')
+            
+            provider_response = payment.provider_response or {}
+            return Response({
+                'success': True,
+                'status': payment.status,
+                'transaction_id': payment.transaction_id,
+                'message': provider_response.get('message') or 'Vérification en cours',
+                'ussd_code': provider_response.get('ussd_code'),
+                'payment_url': provider_response.get('payment_url')
+            })
+        
+        if payment.status == 'FAILED':
             return Response({
                 'success': False,
-                'message': f'Erreur: {str(e)}'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'status': payment.status,
+                'message': 'Le paiement a échoué'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = {
+            'success': True,
+            'status': payment.status,
+            'message': 'Paiement vérifié'
+        }
+        escrow = EscrowAccount.objects.filter(payment=payment).only('id').first()
+        if escrow:
+            data['escrow_id'] = escrow.id
+            data['message'] = 'Paiement vérifié et placé en escrow'
+        return Response(data)
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
@@ -263,10 +287,8 @@ class EscrowViewSet(viewsets.ReadOnlyModelViewSet):
         if user.is_staff:
             return EscrowAccount.objects.all()
         
-        return EscrowAccount.objects.filter(payment__payer=user) | EscrowAccount.objects.filter(
-            payment__occupation_request__property__owner=user
-        ) | EscrowAccount.objects.filter(
-            payment__occupation_request__property__agent=user
+        return EscrowAccount.objects.filter(
+            Q(payment__payer=user) | Q(payment__owner=user) | Q(payment__agent=user)
         )
     
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAdminUser])
@@ -335,10 +357,12 @@ class EscrowViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
-    """ViewSet pour l'historique des transactions"""
+    """ViewSet pour l'historique des transactions (?payment=<id> pour l'historique d'un paiement)"""
     
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TransactionCursorPagination
+    filterset_fields = ['payment', 'transaction_type', 'status']
     
     def get_queryset(self):
         """Les utilisateurs voient leurs transactions"""
@@ -347,10 +371,8 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
         if user.is_staff:
             return Transaction.objects.all()
         
-        return Transaction.objects.filter(payment__payer=user) | Transaction.objects.filter(
-            payment__occupation_request__property__owner=user
-        ) | Transaction.objects.filter(
-            payment__occupation_request__property__agent=user
+        return Transaction.objects.filter(
+            Q(payment__payer=user) | Q(payment__owner=user) | Q(payment__agent=user)
         )
 
 
@@ -448,20 +470,17 @@ class PaymentWebhookView(APIView):
     """
     Endpoint pour recevoir les webhooks des fournisseurs de paiement
     POST /api/payments/webhook/{provider}/
+    
+    Le webhook est enregistré dans l'inbox et acquitté aussitôt ;
+    il est appliqué par la commande process_payment_webhooks.
     """
     permission_classes = []  # Pas d'authentification pour les webhooks
     
     def post(self, request, provider):
-        """Traiter un webhook de paiement"""
+        """Enregistrer un webhook de paiement"""
         
         # Mapper le nom du fournisseur
-        provider_map = {
-            'orange': 'ORANGE_MONEY',
-            'mtn': 'MTN_MONEY',
-            'wave': 'WAVE'
-        }
-        
-        provider_type = provider_map.get(provider.lower())
+        provider_type = webhooks.PROVIDER_SLUGS.get(provider.lower())
         if not provider_type:
             return Response({'error': 'Fournisseur inconnu'}, status=400)
         
@@ -473,25 +492,7 @@ class PaymentWebhookView(APIView):
             if not provider_instance.verify_webhook_signature(request.data, signature):
                 return Response({'error': 'Signature invalide'}, status=403)
             
-            # Traiter le webhook
-            transaction_id = request.data.get('transaction_id')
-            webhook_status = request.data.get('status')
-            
-            if transaction_id:
-                # Trouver le paiement
-                payment = Payment.objects.filter(transaction_id=transaction_id).first()
-                
-                if payment:
-                    # Mettre à jour selon le statut
-                    if webhook_status == 'COMPLETED' and payment.status == 'PROCESSING':
-                        # Placer en escrow
-                        EscrowManager.hold_payment(payment)
-                    elif webhook_status == 'FAILED':
-                        payment.status = 'FAILED'
-                        payment.save()
-                    
-                    return Response({'success': True})
-            
+            webhooks.store_event(provider_type, dict(request.data.items()))
             return Response({'success': True, 'message': 'Webhook reçu'})
             
         except Exception as e:
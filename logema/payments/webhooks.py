@@ -0,0 +1,136 @@
+"""
+Inbox des webhooks fournisseurs
+
+PaymentWebhookView vérifie la signature, insère un WebhookEvent (un seul INSERT,
+les doublons sont ignorés par la contrainte unique) et répond aussitôt.
+La commande `process_payment_webhooks` applique ensuite les événements ; le
+traitement est idempotent (verrou sur le paiement et transitions conditionnelles),
+un même événement rejoué ne change rien.
+
+Un webhook peut arriver avant que l'outbox n'ait enregistré le transaction_id du
+paiement : l'événement reste alors en attente et est réessayé avec un backoff,
+puis passe en échec (rejouable) après PAYMENT_WEBHOOK_MAX_ATTEMPTS essais.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Payment, WebhookEvent
+
+PROVIDER_SLUGS = {
+    'orange': 'ORANGE_MONEY',
+    'mtn': 'MTN_MONEY',
+    'wave': 'WAVE',
+}
+
+
+def store_event(provider_type, payload):
+    """
+    Enregistre un webhook dans l'inbox en un seul INSERT ; un doublon est ignoré.
+    Retourne False pour un webhook sans identifiant (rien à traiter).
+    """
+    transaction_id = str(payload.get('transaction_id') or '')
+    event_id = str(payload.get('event_id') or transaction_id)
+    if not event_id:
+        return False
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(
+            provider=provider_type,
+            event_id=event_id,
+            transaction_id=transaction_id,
+            event_status=str(payload.get('status') or ''),
+            payload=payload,
+        )
+    ], ignore_conflicts=True)
+    return True
+
+
+def apply_event(event):
+    """
+    Applique un événement au paiement correspondant. Retourne le statut de traitement.
+    """
+    from .escrow_manager import EscrowManager
+
+    if not event.transaction_id:
+        return 'IGNORED'
+    payment = Payment.objects.select_for_update(of=('self',)).select_related(
+        'occupation_request__property__owner', 'occupation_request__property__agent'
+    ).filter(transaction_id=event.transaction_id).first()
+    if payment is None:
+        # Résultat de l'initiation pas encore enregistré : réessayer plus tard
+        return 'PENDING'
+
+    if event.event_status == 'COMPLETED' and payment.status == 'PROCESSING':
+        # Placer en escrow
+        EscrowManager.hold_payment(payment)
+        return 'DONE'
+    if event.event_status == 'FAILED' and payment.status in ('PENDING', 'PROCESSING'):
+        payment.status = 'FAILED'
+        payment.provider_response = event.payload
+        payment.save()
+        return 'DONE'
+    # Événement déjà appliqué (renvoi) ou sans effet sur le statut courant
+    return 'IGNORED'
+
+
+def retry_delay(attempts):
+    """Backoff exponentiel avec gigue : base, 2x base, 4x base..."""
+    base = getattr(settings, 'PAYMENT_WEBHOOK_RETRY_DELAY', 30)
+    return base * (2 ** (attempts - 1)) * random.uniform(1, 1.25)
+
+
+def process_event(event):
+    try:
+        with transaction.atomic():
+            event.processing_status = apply_event(event)
+            event.error_message = ''
+    except Exception as e:
+        event.processing_status = 'FAILED'
+        event.error_message = str(e)
+    event.attempts += 1
+    event.processed_at = timezone.now()
+    if event.processing_status == 'PENDING':
+        if event.attempts >= getattr(settings, 'PAYMENT_WEBHOOK_MAX_ATTEMPTS', 8):
+            event.processing_status = 'FAILED'
+            event.error_message = "Aucun paiement pour cette transaction"
+        else:
+            event.next_attempt_at = event.processed_at + timedelta(seconds=retry_delay(event.attempts))
+    event.save(update_fields=['processing_status', 'error_message', 'attempts', 'processed_at', 'next_attempt_at'])
+    return event
+
+
+def claim_pending(limit=100):
+    """
+    Réserve un lot d'événements en attente et dus (SKIP LOCKED là où le moteur le
+    permet) pour que plusieurs consommateurs ne traitent pas le même événement.
+    """
+    queryset = WebhookEvent.objects.filter(
+        processing_status='PENDING', next_attempt_at__lte=timezone.now()
+    ).order_by('next_attempt_at')
+    if connection.features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True)
+    return list(queryset[:limit])
+
+
+def process_pending(batch_size=100):
+    """
+    Traite un lot d'événements. Retourne le nombre d'événements traités.
+    """
+    with transaction.atomic():
+        events = claim_pending(batch_size)
+        for event in events:
+            process_event(event)
+    return len(events)
+
+
+def replay(queryset):
+    """
+    Remet des événements dans la file ; le traitement étant idempotent,
+    rejouer un événement déjà appliqué est sans effet.
+    """
+    return queryset.exclude(processing_status='PENDING').update(
+        processing_status='PENDING', error_message='', processed_at=None, next_attempt_at=timezone.now()
+    )
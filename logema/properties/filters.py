@@ -3,22 +3,23 @@ from .models import Property
 
 class PropertyFilter(filters.FilterSet):
     # Location filters - cascade from region to secteur
-    region = filters.NumberFilter(field_name='secteur__quartier__ville__sous_prefecture__prefecture__region_id')
-    prefecture = filters.NumberFilter(field_name='secteur__quartier__ville__sous_prefecture__prefecture_id')
-    sous_prefecture = filters.NumberFilter(field_name='secteur__quartier__ville__sous_prefecture_id')
-    ville = filters.NumberFilter(field_name='secteur__quartier__ville_id')
-    quartier = filters.NumberFilter(field_name='secteur__quartier_id')
-    secteur = filters.NumberFilter(field_name='secteur_id')
+    # Served by the flattened property_search table (one indexed column per level)
+    region = filters.NumberFilter(field_name='search_entry__region_id')
+    prefecture = filters.NumberFilter(field_name='search_entry__prefecture_id')
+    sous_prefecture = filters.NumberFilter(field_name='search_entry__sous_prefecture_id')
+    ville = filters.NumberFilter(field_name='search_entry__ville_id')
+    quartier = filters.NumberFilter(field_name='search_entry__quartier_id')
+    secteur = filters.NumberFilter(field_name='search_entry__secteur_id')
     
     # Property type filter
-    property_type = filters.CharFilter(field_name='property_type')
+    property_type = filters.CharFilter(field_name='search_entry__property_type')
     
     # Price range filters
-    min_price = filters.NumberFilter(field_name='price', lookup_expr='gte')
-    max_price = filters.NumberFilter(field_name='price', lookup_expr='lte')
+    min_price = filters.NumberFilter(field_name='search_entry__price', lookup_expr='gte')
+    max_price = filters.NumberFilter(field_name='search_entry__price', lookup_expr='lte')
     
     # Availability filter
-    is_available = filters.BooleanFilter(field_name='is_available')
+    is_available = filters.BooleanFilter(field_name='search_entry__is_available')
     
     # Geolocation filters
     plus_code = filters.CharFilter(field_name='plus_code', lookup_expr='icontains')
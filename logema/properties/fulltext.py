@@ -0,0 +1,190 @@
+"""
+Recherche plein texte sur les biens (titre, description, repères, localisation)
+
+SQLite : table virtuelle FTS5 `property_fts` (rowid = id du bien), tokenizer
+unicode61 sans diacritiques, classement bm25.
+PostgreSQL : table `property_fts` (property_id, document tsvector) avec index GIN,
+classement ts_rank.
+Les autres moteurs retombent sur des icontains.
+
+Le texte et la requête sont repliés (minuscules, sans accents) côté Python :
+"Rentrée" et "rentree", "Kagbélen" et "kagbelen" sont équivalents sur les deux moteurs.
+"""
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'property_fts'
+
+# Poids des colonnes : titre, repères, localisation, description
+SQLITE_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+POSTGRES_WEIGHTS = ('A', 'B', 'B', 'C')
+POSTGRES_CONFIG = 'french'
+
+MAX_QUERY_TERMS = 8
+
+
+def fold_text(value):
+    """
+    Minuscules et suppression des accents.
+    """
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def query_terms(query):
+    return re.findall(r'\w+', fold_text(query))[:MAX_QUERY_TERMS]
+
+
+def is_supported(conn=None):
+    return (conn or connection).vendor in ('sqlite', 'postgresql')
+
+
+def build_document(prop):
+    """
+    Colonnes indexées d'un bien (secteur -> quartier -> ville chargés si possible).
+    """
+    secteur = prop.secteur
+    quartier = secteur.quartier
+    ville = quartier.ville
+    landmarks = ' '.join(filter(None, [prop.point_de_repere, prop.description_direction, prop.plus_code]))
+    location = ' '.join([secteur.name, quartier.name, ville.name])
+    return [fold_text(prop.title), fold_text(landmarks), fold_text(location), fold_text(prop.description)]
+
+
+def create_index(conn):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                "title, landmarks, location, description, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {FTS_TABLE} ("
+                "property_id bigint PRIMARY KEY REFERENCES properties_property(id) ON DELETE CASCADE, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {FTS_TABLE}_document ON {FTS_TABLE} USING GIN (document)")
+
+
+def drop_index(conn):
+    if is_supported(conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def write_documents(properties, conn=None):
+    """
+    Insère ou remplace les documents des biens donnés.
+    """
+    conn = conn or connection
+    if not is_supported(conn):
+        return 0
+    rows = [(prop.pk, *build_document(prop)) for prop in properties]
+    if not rows:
+        return 0
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            placeholders = ', '.join(['%s'] * len(rows))
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", [row[0] for row in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, landmarks, location, description) VALUES (%s, %s, %s, %s, %s)",
+                rows
+            )
+        else:
+            document = ' || '.join(
+                f"setweight(to_tsvector('{POSTGRES_CONFIG}', %s), '{weight}')" for weight in POSTGRES_WEIGHTS
+            )
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (property_id, document) VALUES (%s, {document}) "
+                "ON CONFLICT (property_id) DO UPDATE SET document = EXCLUDED.document",
+                rows
+            )
+    return len(rows)
+
+
+def index_properties(property_ids):
+    """
+    Réindexe les biens donnés (les biens supprimés sont retirés de l'index).
+    """
+    from .models import Property
+
+    property_ids = list(property_ids)
+    if not property_ids or not is_supported():
+        return 0
+    properties = list(Property.objects.filter(pk__in=property_ids).select_related('secteur__quartier__ville'))
+    remove_properties(set(property_ids) - {prop.pk for prop in properties})
+    return write_documents(properties)
+
+
+def remove_properties(property_ids):
+    property_ids = list(property_ids)
+    if not property_ids or connection.vendor != 'sqlite':
+        # Sur PostgreSQL la suppression suit la clé étrangère (ON DELETE CASCADE)
+        return
+    placeholders = ', '.join(['%s'] * len(property_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", property_ids)
+
+
+def rebuild_index(batch_size=500):
+    from .models import Property
+
+    if not is_supported():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+    ids = list(Property.objects.values_list('id', flat=True))
+    total = 0
+    for start in range(0, len(ids), batch_size):
+        total += index_properties(ids[start:start + batch_size])
+    return total
+
+
+def search(queryset, query):
+    """
+    Restreint le queryset aux biens correspondant à la requête et annote
+    `search_rank` (plus petit = plus pertinent). Chaque terme est cherché en préfixe.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return queryset.none()
+
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'sqlite':
+        match = ' AND '.join(f'"{term}"*' for term in terms)
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        matches = RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        rank = RawSQL(
+            f"SELECT bm25({FTS_TABLE}, {weights}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            [match], output_field=FloatField()
+        )
+    elif connection.vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        matches = RawSQL(
+            f"SELECT property_id FROM {FTS_TABLE} WHERE document @@ to_tsquery('{POSTGRES_CONFIG}', %s)",
+            [tsquery]
+        )
+        rank = RawSQL(
+            f"SELECT -ts_rank(document, to_tsquery('{POSTGRES_CONFIG}', %s)) FROM {FTS_TABLE} "
+            f"WHERE property_id = {table}.id",
+            [tsquery], output_field=FloatField()
+        )
+    else:
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(title__icontains=term) | Q(description__icontains=term) |
+                Q(point_de_repere__icontains=term) | Q(description_direction__icontains=term)
+            )
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    return queryset.filter(pk__in=matches).annotate(search_rank=rank)
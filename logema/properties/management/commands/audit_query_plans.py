@@ -0,0 +1,98 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Q
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+
+from properties.models import Property
+from properties.views import PropertyViewSet
+from transactions.models import OccupationRequest
+
+# Paramètres des listings canoniques de /api/properties/ (PropertyFilter + PropertyViewSet)
+LISTING_SCENARIOS = [
+    ('listing', {}),
+    ('listing region', {'region': 1}),
+    ('listing ville', {'ville': 1}),
+    ('listing secteur', {'secteur': 1}),
+    ('listing type + price', {'property_type': 'APPARTEMENT', 'min_price': 500000, 'max_price': 5000000}),
+    ('listing price', {'min_price': 500000, 'max_price': 5000000}),
+    ('listing distance', {'lat': 9.5370, 'lng': -13.6773, 'dist': 5}),
+    ('listing full-text', {'q': 'appartement'}),
+]
+
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (?!.*\bUSING\b)(?!.*VIRTUAL TABLE)(\S+)')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on (\S+)')
+
+
+class Command(BaseCommand):
+    help = (
+        'EXPLAINs the canonical property listing queries and fails if any of them '
+        'falls back to a full table scan. Run it against a representative database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--show-plans', action='store_true', help='Print every query plan')
+        parser.add_argument(
+            '--ignore-table', action='append', default=[],
+            help='Table allowed to be scanned (e.g. a tiny lookup table); repeatable'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            pattern = SQLITE_FULL_SCAN
+        elif connection.vendor == 'postgresql':
+            pattern = POSTGRES_FULL_SCAN
+        else:
+            raise CommandError(f"Unsupported database backend: {connection.vendor}")
+
+        failures = []
+        for name, queryset in self.get_queries():
+            plan = queryset.explain()
+            scanned = [
+                table.strip('"') for table in pattern.findall(plan)
+                if table.strip('"') not in options['ignore_table']
+            ]
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"FULL SCAN  {name}: {', '.join(sorted(set(scanned)))}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"OK         {name}"))
+            if options['show_plans'] or scanned:
+                self.stdout.write(plan)
+
+        if failures:
+            raise CommandError(f"{len(failures)} query(ies) fall back to a full scan: {', '.join(failures)}")
+
+    def get_queries(self):
+        factory = RequestFactory()
+        for name, params in LISTING_SCENARIOS:
+            request = Request(factory.get('/api/properties/', params))
+            view = PropertyViewSet(request=request, action='list', format_kwarg=None, kwargs={})
+            queryset = view.filter_queryset(view.get_queryset())
+            paginator = view.pagination_class()
+            ordering = paginator.get_ordering(request, queryset, view)
+            yield name, queryset.order_by(*ordering)[:paginator.page_size + 1]
+
+            if name == 'listing distance':
+                # Candidats de /api/properties/nearby/
+                yield 'nearby candidates', queryset.values_list('id', 'latitude', 'longitude')
+
+        now = timezone.now()
+        yield 'is_under_validation', OccupationRequest.objects.filter(
+            property_id=1, status='PENDING', created_at__gte=now - Property.VALIDATION_WINDOW
+        ).values('id')[:1]
+        yield 'latest pending per property', (
+            OccupationRequest.objects.filter(property_id__in=[1, 2, 3], status='PENDING')
+            .values('property_id')
+            .annotate(latest=Max('created_at'))
+        )
+        managed_properties = Property.objects.filter(Q(owner_id=1) | Q(agent_id=1)).values('pk')
+        yield 'occupation visibility', OccupationRequest.objects.filter(
+            Q(user_id=1) | Q(property__in=managed_properties)
+        ).order_by('-created_at')
+        yield 'admin listing', Property.objects.filter(
+            is_available=True, property_type='APPARTEMENT'
+        ).order_by('-created_at')[:20]
@@ -0,0 +1,60 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from logema.utils.geo import calculate_distance, rank_by_distance
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the vectorized distance engine against the scalar Haversine loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[1_000, 100_000, 1_000_000])
+        parser.add_argument('--radius', type=float, default=10.0)
+        parser.add_argument('--k', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument(
+            '--scalar-limit', type=int, default=100_000,
+            help='Skip the pure Python loop above this many points'
+        )
+
+    def handle(self, *args, **options):
+        # Candidate points scattered around Conakry
+        origin_lat, origin_lng = 9.5370, -13.6773
+        rng = np.random.default_rng(42)
+
+        self.stdout.write(f"{'points':>10} {'numpy pts/s':>16} {'scalar pts/s':>16} {'speedup':>9}")
+        for size in options['sizes']:
+            latitudes = origin_lat + rng.uniform(-0.5, 0.5, size)
+            longitudes = origin_lng + rng.uniform(-0.5, 0.5, size)
+
+            vectorized = self._best_of(options['repeat'], lambda: rank_by_distance(
+                origin_lat, origin_lng, latitudes, longitudes,
+                radius_km=options['radius'], k=options['k']
+            ))
+            vectorized_rate = size / vectorized
+
+            if size <= options['scalar_limit']:
+                lat_list = latitudes.tolist()
+                lng_list = longitudes.tolist()
+                scalar = self._best_of(1, lambda: sorted(
+                    d for d in (
+                        calculate_distance(origin_lat, origin_lng, lat, lng)
+                        for lat, lng in zip(lat_list, lng_list)
+                    ) if d <= options['radius']
+                )[:options['k']])
+                scalar_rate = size / scalar
+                self.stdout.write(
+                    f"{size:>10} {vectorized_rate:>16,.0f} {scalar_rate:>16,.0f} {vectorized_rate / scalar_rate:>8.1f}x"
+                )
+            else:
+                self.stdout.write(f"{size:>10} {vectorized_rate:>16,.0f} {'-':>16} {'-':>9}")
+
+    def _best_of(self, repeat, func):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
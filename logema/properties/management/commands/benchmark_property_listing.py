@@ -0,0 +1,94 @@
+import gc
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from accounts.models import User
+from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+from logema.utils.geo import generate_geohash
+from properties.models import Property
+from properties.search import rebuild_property_search
+from properties.views import PropertyViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks payload size and p95 latency of /api/properties/ '
+        '(unpaginated vs cursor page vs sparse fieldset). All data is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000])
+        parser.add_argument('--requests', type=int, default=50, help='Requests per paginated scenario')
+        parser.add_argument('--full-requests', type=int, default=3, help='Requests for the unpaginated scenario')
+
+    def handle(self, *args, **options):
+        self.factory = RequestFactory()
+        self.stdout.write(f"{'listings':>9} {'scenario':<28} {'bytes':>14} {'p95 ms':>10}")
+        for size in options['sizes']:
+            with transaction.atomic():
+                self._seed(size)
+                scenarios = [
+                    ('unpaginated (before)', {}, None, options['full_requests']),
+                    ('cursor page (20)', {}, PropertyViewSet.pagination_class, options['requests']),
+                    ('cursor + fields (100)', {
+                        'fields': 'id,latitude,longitude,price,thumbnail',
+                        'page_size': 100,
+                    }, PropertyViewSet.pagination_class, options['requests']),
+                ]
+                for label, params, pagination_class, count in scenarios:
+                    # Ne pas faire payer au scénario suivant le ramasse-miettes du précédent
+                    gc.collect()
+                    size_bytes, p95 = self._measure(params, pagination_class, count)
+                    self.stdout.write(f"{size:>9} {label:<28} {size_bytes:>14,} {p95:>10.1f}")
+                transaction.set_rollback(True)
+
+    def _seed(self, size):
+        region = Region.objects.create(name="Benchmark Region")
+        prefecture = Prefecture.objects.create(name="Benchmark", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Benchmark", prefecture=prefecture)
+        ville = Ville.objects.create(name="Benchmark", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Benchmark", ville=ville)
+        secteur = Secteur.objects.create(name="Benchmark", quartier=quartier)
+        owner = User.objects.create_user(username='benchmark_owner', password='benchmark')
+
+        rng = random.Random(42)
+        batch = []
+        for i in range(size):
+            lat = 9.5 + rng.uniform(-0.2, 0.2)
+            lng = -13.7 + rng.uniform(-0.2, 0.2)
+            batch.append(Property(
+                owner=owner,
+                title=f"Appartement {i}",
+                description="Bel appartement lumineux, proche des commerces et du marché. " * 5,
+                property_type=rng.choice(Property.TYPE_CHOICES)[0],
+                price=rng.randint(500_000, 10_000_000),
+                secteur=secteur,
+                latitude=lat,
+                longitude=lng,
+                geohash=generate_geohash(lat, lng),
+                point_de_repere="À 50m de la Mosquée",
+            ))
+        Property.objects.bulk_create(batch, batch_size=2000)
+        rebuild_property_search(batch_size=2000)
+
+    def _measure(self, params, pagination_class, count):
+        view = PropertyViewSet.as_view({'get': 'list'}, pagination_class=pagination_class)
+        timings = []
+        size_bytes = 0
+        for _ in range(count):
+            request = self.factory.get('/api/properties/', params)
+            start = time.perf_counter()
+            response = view(request)
+            response.render()
+            timings.append((time.perf_counter() - start) * 1000)
+            size_bytes = len(response.content)
+        if len(timings) > 1:
+            p95 = statistics.quantiles(timings, n=20)[-1]
+        else:
+            p95 = timings[0]
+        return size_bytes, p95
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from properties.fulltext import rebuild_index
+from properties.search import rebuild_property_search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the flattened property_search read table and the property_fts full-text index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding property_search...")
+        total = rebuild_property_search(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Finished. {total} search entries refreshed"))
+
+        self.stdout.write("Rebuilding property_fts...")
+        total = rebuild_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Finished. {total} documents indexed"))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:11
+
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    from logema.utils.geo import generate_geohash
+
+    Property = apps.get_model('properties', 'Property')
+    to_update = []
+    for prop in Property.objects.filter(latitude__isnull=False, longitude__isnull=False).only('id', 'latitude', 'longitude'):
+        prop.geohash = generate_geohash(prop.latitude, prop.longitude)
+        to_update.append(prop)
+    Property.objects.bulk_update(to_update, ['geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0007_alter_property_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text="Cellule geohash pour l'index spatial (recherche de proximité)", max_length=12, null=True),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
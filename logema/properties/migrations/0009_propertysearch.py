@@ -0,0 +1,89 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:14
+
+import django.db.models.deletion
+from datetime import timedelta
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def populate_property_search(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    PropertySearch = apps.get_model('properties', 'PropertySearch')
+    OccupationRequest = apps.get_model('transactions', 'OccupationRequest')
+
+    latest_pending = dict(
+        OccupationRequest.objects.filter(status='PENDING')
+        .values('property_id')
+        .annotate(latest=Max('created_at'))
+        .values_list('property_id', 'latest')
+    )
+
+    entries = []
+    properties = Property.objects.select_related('secteur__quartier__ville__sous_prefecture__prefecture__region')
+    for prop in properties.iterator(chunk_size=500):
+        secteur = prop.secteur
+        quartier = secteur.quartier
+        ville = quartier.ville
+        sous_prefecture = ville.sous_prefecture
+        prefecture = sous_prefecture.prefecture
+        region = prefecture.region
+        latest = latest_pending.get(prop.pk)
+        entries.append(PropertySearch(
+            property_id=prop.pk,
+            region_id=region.pk, region_name=region.name,
+            prefecture_id=prefecture.pk, prefecture_name=prefecture.name,
+            sous_prefecture_id=sous_prefecture.pk, sous_prefecture_name=sous_prefecture.name,
+            ville_id=ville.pk, ville_name=ville.name,
+            quartier_id=quartier.pk, quartier_name=quartier.name,
+            secteur_id=secteur.pk, secteur_name=secteur.name,
+            property_type=prop.property_type,
+            price=prop.price,
+            latitude=prop.latitude,
+            longitude=prop.longitude,
+            is_available=prop.is_available,
+            under_validation_until=latest + timedelta(hours=5) if latest else None,
+            created_at=prop.created_at,
+        ))
+    PropertySearch.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_property_geohash'),
+        ('transactions', '0006_alter_visitvoucher_scheduled_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertySearch',
+            fields=[
+                ('property', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to='properties.property')),
+                ('region_id', models.BigIntegerField(db_index=True)),
+                ('region_name', models.CharField(max_length=100)),
+                ('prefecture_id', models.BigIntegerField(db_index=True)),
+                ('prefecture_name', models.CharField(max_length=100)),
+                ('sous_prefecture_id', models.BigIntegerField(db_index=True)),
+                ('sous_prefecture_name', models.CharField(max_length=100)),
+                ('ville_id', models.BigIntegerField(db_index=True)),
+                ('ville_name', models.CharField(max_length=100)),
+                ('quartier_id', models.BigIntegerField(db_index=True)),
+                ('quartier_name', models.CharField(max_length=100)),
+                ('secteur_id', models.BigIntegerField(db_index=True)),
+                ('secteur_name', models.CharField(max_length=100)),
+                ('property_type', models.CharField(choices=[('CHAMBRE_SIMPLE', 'Rentrée Couchée'), ('SALON_CHAMBRE', 'Salon Chambre'), ('APPARTEMENT', 'Appartement'), ('VILLA', 'Villa'), ('STUDIO', 'Studio'), ('MAGASIN', 'Magasin'), ('BUREAU', 'Bureau')], max_length=20)),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('is_available', models.BooleanField(default=True)),
+                ('under_validation_until', models.DateTimeField(blank=True, help_text='Fin de la période de validation de la dernière demande PENDING', null=True)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'Property search entries',
+                'db_table': 'property_search',
+                'indexes': [models.Index(fields=['is_available', 'property_type', 'price'], name='property_search_type_price'), models.Index(fields=['is_available', 'price'], name='property_search_price'), models.Index(fields=['is_available', 'under_validation_until'], name='property_search_validation'), models.Index(fields=['latitude', 'longitude'], name='property_search_coords')],
+            },
+        ),
+        migrations.RunPython(populate_property_search, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+def create_fulltext_index(apps, schema_editor):
+    from properties.fulltext import create_index, write_documents
+
+    Property = apps.get_model('properties', 'Property')
+    create_index(schema_editor.connection)
+    properties = Property.objects.select_related('secteur__quartier__ville')
+    batch = []
+    for prop in properties.iterator(chunk_size=500):
+        batch.append(prop)
+        if len(batch) == 500:
+            write_documents(batch, schema_editor.connection)
+            batch = []
+    write_documents(batch, schema_editor.connection)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    from properties.fulltext import drop_index
+
+    drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_propertysearch'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('locations', '0002_location_property_count'),
+        ('properties', '0010_property_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='propertysearch',
+            name='property_search_type_price',
+        ),
+        migrations.RemoveIndex(
+            model_name='propertysearch',
+            name='property_search_price',
+        ),
+        migrations.RemoveIndex(
+            model_name='propertysearch',
+            name='property_search_validation',
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['-created_at', 'id'], name='property_created_id'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['property_type', 'price'], name='property_avail_type_price'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['secteur', '-created_at'], name='property_avail_secteur'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearch',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['property_type', 'price'], name='property_search_type_price'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearch',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['price'], name='property_search_price'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearch',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['under_validation_until'], name='property_search_validation'),
+        ),
+        migrations.AddIndex(
+            model_name='propertysearch',
+            index=models.Index(condition=models.Q(('is_available', True)), fields=['-created_at'], name='property_search_created'),
+        ),
+    ]
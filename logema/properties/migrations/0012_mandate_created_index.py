@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_hot_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='managementmandate',
+            index=models.Index(fields=['created_at'], name='mandate_created'),
+        ),
+    ]
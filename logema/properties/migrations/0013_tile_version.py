@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_mandate_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PropertyTileVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tile', models.CharField(help_text='z/x/y', max_length=40, unique=True)),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
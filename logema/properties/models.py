@@ -1,3 +1,4 @@
+from datetime import timedelta
 from django.db import models
 from django.conf import settings
 from locations.models import Secteur
@@ -12,6 +13,9 @@ class Property(models.Model):
         ('MAGASIN', 'Magasin'),
         ('BUREAU', 'Bureau'),
     )
+
+    # Durée pendant laquelle une demande d'occupation PENDING masque le bien
+    VALIDATION_WINDOW = timedelta(hours=5)
     
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='properties_owned')
     agent = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='properties_managed')
@@ -26,6 +30,7 @@ class Property(models.Model):
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
     plus_code = models.CharField(max_length=20, blank=True, null=True, help_text="Code d'adresse numérique (ex: 89P5+XJ)")
+    geohash = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False, help_text="Cellule geohash pour l'index spatial (recherche de proximité)")
     
     # Landmark based navigation
     point_de_repere = models.TextField(blank=True, help_text="Repère visuel (ex: À 50m de la Mosquée)")
@@ -43,26 +48,44 @@ class Property(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
+        from logema.utils.geo import generate_plus_code, generate_geohash
+
         # Auto-generate plus code if coordinates are present
         if self.latitude and self.longitude and not self.plus_code:
-            from logema.utils.geo import generate_plus_code
             self.plus_code = generate_plus_code(self.latitude, self.longitude)
+
+        # Keep the spatial index cell in sync with the coordinates
+        self.geohash = generate_geohash(self.latitude, self.longitude)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
         super().save(*args, **kwargs)
 
     class Meta:
         ordering = ['-created_at']
         verbose_name_plural = "Properties"
+        indexes = [
+            # Ordre du listing et du curseur de pagination
+            models.Index(fields=['-created_at', 'id'], name='property_created_id'),
+            # Index partiels : seules les annonces disponibles sont listées
+            models.Index(
+                fields=['property_type', 'price'], condition=models.Q(is_available=True),
+                name='property_avail_type_price'
+            ),
+            models.Index(
+                fields=['secteur', '-created_at'], condition=models.Q(is_available=True),
+                name='property_avail_secteur'
+            ),
+        ]
 
     @property
     def is_under_validation(self):
         """
         Check if there is a pending occupation request within the last 5 hours.
         """
-        from transactions.models import OccupationRequest
         from django.utils import timezone
-        from datetime import timedelta
         
-        five_hours_ago = timezone.now() - timedelta(hours=5)
+        five_hours_ago = timezone.now() - self.VALIDATION_WINDOW
         return self.occupation_requests.filter(
             status='PENDING',
             created_at__gte=five_hours_ago
@@ -71,6 +94,73 @@ class Property(models.Model):
     def __str__(self):
         return f"{self.title} - {self.property_type}"
 
+class PropertySearch(models.Model):
+    """
+    Modèle de lecture dénormalisé pour la recherche de biens.
+    Une ligne par Property, avec toute la hiérarchie de localisation aplatie,
+    maintenue par les signaux de properties/signals.py.
+    """
+    property = models.OneToOneField(Property, on_delete=models.CASCADE, primary_key=True, related_name='search_entry')
+
+    region_id = models.BigIntegerField(db_index=True)
+    region_name = models.CharField(max_length=100)
+    prefecture_id = models.BigIntegerField(db_index=True)
+    prefecture_name = models.CharField(max_length=100)
+    sous_prefecture_id = models.BigIntegerField(db_index=True)
+    sous_prefecture_name = models.CharField(max_length=100)
+    ville_id = models.BigIntegerField(db_index=True)
+    ville_name = models.CharField(max_length=100)
+    quartier_id = models.BigIntegerField(db_index=True)
+    quartier_name = models.CharField(max_length=100)
+    secteur_id = models.BigIntegerField(db_index=True)
+    secteur_name = models.CharField(max_length=100)
+
+    property_type = models.CharField(max_length=20, choices=Property.TYPE_CHOICES)
+    price = models.DecimalField(max_digits=12, decimal_places=2)
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    is_available = models.BooleanField(default=True)
+    under_validation_until = models.DateTimeField(null=True, blank=True, help_text="Fin de la période de validation de la dernière demande PENDING")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'property_search'
+        verbose_name_plural = "Property search entries"
+        # Index partiels sur is_available : un booléen seul en tête d'index composite
+        # n'est pas utilisable par SQLite (le filtre est rendu `WHERE "is_available"`)
+        indexes = [
+            models.Index(
+                fields=['property_type', 'price'], condition=models.Q(is_available=True),
+                name='property_search_type_price'
+            ),
+            models.Index(fields=['price'], condition=models.Q(is_available=True), name='property_search_price'),
+            models.Index(
+                fields=['under_validation_until'], condition=models.Q(is_available=True),
+                name='property_search_validation'
+            ),
+            models.Index(
+                fields=['-created_at'], condition=models.Q(is_available=True),
+                name='property_search_created'
+            ),
+            models.Index(fields=['latitude', 'longitude'], name='property_search_coords'),
+        ]
+
+    def __str__(self):
+        return f"Search entry for property {self.property_id}"
+
+
+class PropertyTileVersion(models.Model):
+    """
+    Version du cache d'une tuile de carte (properties.tiles), incrémentée quand un
+    bien de la tuile change. Stockée en base pour que l'invalidation vaille pour
+    tous les processus, même avec un cache local à chacun.
+    """
+    tile = models.CharField(max_length=40, unique=True, help_text="z/x/y")
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Tile {self.tile} v{self.version}"
+
 class PropertyImage(models.Model):
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='properties/')
@@ -112,6 +202,12 @@ class ManagementMandate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Mandats créés depuis le dernier instantané (accounts.admin_stats)
+            models.Index(fields=['created_at'], name='mandate_created'),
+        ]
+
     def __str__(self):
         return f"Mandat {self.id} ({self.get_mandate_type_display()}) - {self.owner.username} ({self.get_status_display()})"
 
@@ -0,0 +1,35 @@
+from rest_framework.pagination import CursorPagination
+
+
+class PropertyCursorPagination(CursorPagination):
+    """
+    Pagination par curseur (keyset) pour le listing des biens.
+    La position est encodée sur listed_at (created_at de property_search, annoté
+    par PropertyViewSet), ce qui garde un coût constant quelle que soit la
+    profondeur de la page demandée.
+    """
+    ordering = ('-listed_at', 'id')
+    search_ordering = ('search_rank', '-listed_at', 'id')
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # ?with_count=1 sur la première page : total exact pour "N logements trouvés"
+    count_query_param = 'with_count'
+
+    def get_ordering(self, request, queryset, view):
+        # Avec ?q=, les résultats sont triés par pertinence (search_rank annoté par fulltext.search)
+        if getattr(view, 'search_query', None):
+            return self.search_ordering
+        return super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) and not request.query_params.get(self.cursor_query_param):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data['count'] = self.count
+        return response
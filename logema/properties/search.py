@@ -0,0 +1,125 @@
+"""
+Maintenance du modèle de lecture PropertySearch (table property_search)
+"""
+from django.db.models import Max
+
+from .models import Property, PropertySearch
+
+SEARCH_UPDATE_FIELDS = [
+    'region_id', 'region_name',
+    'prefecture_id', 'prefecture_name',
+    'sous_prefecture_id', 'sous_prefecture_name',
+    'ville_id', 'ville_name',
+    'quartier_id', 'quartier_name',
+    'secteur_id', 'secteur_name',
+    'property_type', 'price', 'latitude', 'longitude',
+    'is_available', 'under_validation_until', 'created_at',
+]
+
+# Champ de PropertySearch correspondant à chaque modèle de localisation
+LOCATION_SEARCH_FIELDS = {
+    'Region': 'region_id',
+    'Prefecture': 'prefecture_id',
+    'SousPrefecture': 'sous_prefecture_id',
+    'Ville': 'ville_id',
+    'Quartier': 'quartier_id',
+    'Secteur': 'secteur_id',
+}
+
+
+def build_search_entry(prop, latest_pending=None):
+    """
+    Construit (sans sauvegarder) la ligne PropertySearch d'un bien.
+    Le bien doit avoir sa hiérarchie de localisation chargée.
+    """
+    secteur = prop.secteur
+    quartier = secteur.quartier
+    ville = quartier.ville
+    sous_prefecture = ville.sous_prefecture
+    prefecture = sous_prefecture.prefecture
+    region = prefecture.region
+
+    return PropertySearch(
+        property_id=prop.pk,
+        region_id=region.pk,
+        region_name=region.name,
+        prefecture_id=prefecture.pk,
+        prefecture_name=prefecture.name,
+        sous_prefecture_id=sous_prefecture.pk,
+        sous_prefecture_name=sous_prefecture.name,
+        ville_id=ville.pk,
+        ville_name=ville.name,
+        quartier_id=quartier.pk,
+        quartier_name=quartier.name,
+        secteur_id=secteur.pk,
+        secteur_name=secteur.name,
+        property_type=prop.property_type,
+        price=prop.price,
+        latitude=prop.latitude,
+        longitude=prop.longitude,
+        is_available=prop.is_available,
+        under_validation_until=latest_pending + Property.VALIDATION_WINDOW if latest_pending else None,
+        created_at=prop.created_at,
+    )
+
+
+def refresh_property_search(property_ids):
+    """
+    Recalcule les lignes PropertySearch des biens donnés.
+    Trois requêtes quel que soit le nombre de biens : chargement des biens,
+    dernière demande PENDING par bien, puis upsert.
+    """
+    from transactions.models import OccupationRequest
+
+    property_ids = list(property_ids)
+    if not property_ids:
+        return 0
+
+    properties = Property.objects.filter(pk__in=property_ids).select_related(
+        'secteur__quartier__ville__sous_prefecture__prefecture__region'
+    )
+    latest_pending = dict(
+        OccupationRequest.objects.filter(property_id__in=property_ids, status='PENDING')
+        .values('property_id')
+        .annotate(latest=Max('created_at'))
+        .values_list('property_id', 'latest')
+    )
+
+    entries = [build_search_entry(prop, latest_pending.get(prop.pk)) for prop in properties]
+    PropertySearch.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=['property'],
+        update_fields=SEARCH_UPDATE_FIELDS,
+    )
+    return len(entries)
+
+
+def location_property_ids(location):
+    """
+    Ids des biens situés sous un nœud de localisation.
+    """
+    field = LOCATION_SEARCH_FIELDS[location.__class__.__name__]
+    property_ids = set(PropertySearch.objects.filter(**{field: location.pk}).values_list('property_id', flat=True))
+    if field == 'secteur_id':
+        property_ids.update(Property.objects.filter(secteur_id=location.pk).values_list('id', flat=True))
+    return property_ids
+
+
+def refresh_location_search(location):
+    """
+    Recalcule les biens situés sous un nœud de localisation (renommage ou déplacement).
+    """
+    return refresh_property_search(location_property_ids(location))
+
+
+def rebuild_property_search(batch_size=500):
+    """
+    Reconstruit entièrement la table property_search.
+    """
+    PropertySearch.objects.exclude(property__in=Property.objects.all()).delete()
+    ids = list(Property.objects.values_list('id', flat=True))
+    total = 0
+    for start in range(0, len(ids), batch_size):
+        total += refresh_property_search(ids[start:start + batch_size])
+    return total
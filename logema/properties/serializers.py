@@ -7,8 +7,32 @@ class PropertyImageSerializer(serializers.ModelSerializer):
         model = PropertyImage
         fields = ['id', 'image', 'caption']
 
-class PropertySerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Restreint les champs sérialisés à ceux demandés via ?fields=id,price,...
+    (requêtes GET uniquement, les champs inconnus sont ignorés).
+    """
+    fields_query_param = 'fields'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.get_requested_fields(self.context.get('request'))
+        if requested:
+            for field_name in set(self.fields) - requested:
+                self.fields.pop(field_name)
+
+    @classmethod
+    def get_requested_fields(cls, request):
+        if request is None or request.method != 'GET':
+            return None
+        raw = request.query_params.get(cls.fields_query_param)
+        if not raw:
+            return None
+        return {name.strip() for name in raw.split(',') if name.strip()}
+
+class PropertySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     images = PropertyImageSerializer(many=True, read_only=True)
+    thumbnail = serializers.SerializerMethodField()
     secteur = serializers.PrimaryKeyRelatedField(queryset=Secteur.objects.all(), required=False, allow_null=True)
     secteur_name = serializers.ReadOnlyField(source='secteur.name')
     quartier_name = serializers.ReadOnlyField(source='secteur.quartier.name')
@@ -18,7 +42,7 @@ class PropertySerializer(serializers.ModelSerializer):
     agent_phone = serializers.ReadOnlyField(source='agent.phone')
     owner_name = serializers.ReadOnlyField(source='owner.username')
     owner_phone = serializers.ReadOnlyField(source='owner.phone')
-    is_under_validation = serializers.ReadOnlyField()
+    is_under_validation = serializers.SerializerMethodField()
     
     class Meta:
         model = Property
@@ -29,10 +53,26 @@ class PropertySerializer(serializers.ModelSerializer):
             'quartier_name', 'latitude', 'longitude', 'plus_code',
             'point_de_repere', 'description_direction', 'address_details', 
             'religion_preference', 'ethnic_preference', 'is_available', 
-            'is_under_validation', 'images', 'created_at'
+            'is_under_validation', 'images', 'thumbnail', 'created_at'
         ]
         read_only_fields = ['owner']
 
+    def get_is_under_validation(self, obj):
+        # Annotated by PropertyViewSet.get_queryset; fall back to the per-row query otherwise
+        annotated = getattr(obj, 'under_validation', None)
+        if annotated is not None:
+            return annotated
+        return obj.is_under_validation
+
+    def get_thumbnail(self, obj):
+        # Première image, lue depuis le cache du prefetch_related('images')
+        images = obj.images.all()
+        if not images:
+            return None
+        url = images[0].image.url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
 class ManagementMandateSerializer(serializers.ModelSerializer):
     owner_username = serializers.ReadOnlyField(source='owner.username')
     agent_username = serializers.ReadOnlyField(source='agent.username', allow_null=True)
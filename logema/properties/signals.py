@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from locations.counters import PARENT_FIELDS, move_property_count, recount_moved_location
+from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+from transactions.models import OccupationRequest
+from .models import Property
+from .fulltext import index_properties, remove_properties
+from .search import location_property_ids, refresh_property_search
+from .tiles import invalidate_tiles_for_point, invalidate_tiles_for_properties
+
+
+def refresh_properties(property_ids):
+    """
+    À appeler après un queryset.update() sur des biens ou leurs demandes
+    d'occupation, qui n'envoie pas de signaux.
+    """
+    property_ids = list(property_ids)
+    # Tuiles de l'ancienne position (lue dans property_search) puis de la nouvelle
+    invalidate_tiles_for_properties(property_ids)
+    refresh_property_search(property_ids)
+    invalidate_tiles_for_properties(property_ids)
+
+
+def refresh_property(property_id):
+    refresh_properties([property_id])
+
+
+def defer_count_move(old_state, new_state):
+    # Compteurs ajustés au commit : une sauvegarde ou suppression annulée n'y touche pas
+    transaction.on_commit(lambda: move_property_count(old_state, new_state))
+
+
+@receiver(pre_save, sender=Property)
+def property_pre_save(sender, instance, raw=False, **kwargs):
+    # État précédent (secteur, disponibilité) pour ajuster les compteurs de localisation
+    instance._previous_count_state = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_count_state = Property.objects.filter(pk=instance.pk).values_list(
+        'secteur_id', 'is_available'
+    ).first()
+
+
+@receiver(post_save, sender=Property)
+def property_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    defer_count_move(
+        getattr(instance, '_previous_count_state', None),
+        (instance.secteur_id, instance.is_available),
+    )
+    refresh_property(instance.pk)
+    index_properties([instance.pk])
+
+
+@receiver(post_delete, sender=Property)
+def property_deleted(sender, instance, **kwargs):
+    defer_count_move((instance.secteur_id, instance.is_available), None)
+    remove_properties([instance.pk])
+    invalidate_tiles_for_point(instance.latitude, instance.longitude)
+
+
+@receiver(post_save, sender=OccupationRequest)
+def occupation_request_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    refresh_property(instance.property_id)
+
+
+@receiver(post_delete, sender=OccupationRequest)
+def occupation_request_deleted(sender, instance, **kwargs):
+    # Différé au commit : la suppression peut venir d'une cascade sur le bien lui-même
+    property_id = instance.property_id
+    transaction.on_commit(lambda: refresh_property(property_id))
+
+
+def location_pre_save(sender, instance, raw=False, **kwargs):
+    instance._previous_parent_id = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    parent_field = PARENT_FIELDS.get(sender)
+    previous = sender.objects.filter(pk=instance.pk).values_list(
+        'property_count', parent_field or 'pk'
+    ).first()
+    if previous is None:
+        return
+    # property_count n'est tenu que par des update() : la valeur en mémoire peut être
+    # périmée et ne doit pas écraser le compteur
+    instance.property_count = previous[0]
+    # Parent précédent : seuls les compteurs des ancêtres d'un nœud déplacé sont recalculés
+    if parent_field:
+        instance._previous_parent_id = previous[1]
+
+
+def location_saved(sender, instance, created=False, raw=False, **kwargs):
+    # Un nœud tout juste créé n'a encore aucun bien
+    if raw or created:
+        return
+    # Les noms de localisation sont dénormalisés dans property_search et l'index plein texte
+    property_ids = location_property_ids(instance)
+    refresh_property_search(property_ids)
+    index_properties(property_ids)
+
+    parent_field = PARENT_FIELDS.get(sender)
+    previous_parent_id = getattr(instance, '_previous_parent_id', None)
+    if parent_field and previous_parent_id is not None and previous_parent_id != getattr(instance, parent_field):
+        new_parent_id = getattr(instance, parent_field)
+        transaction.on_commit(lambda: recount_moved_location(sender, previous_parent_id, new_parent_id))
+
+
+for location_model in (Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur):
+    pre_save.connect(location_pre_save, sender=location_model, dispatch_uid=f'property_search_pre_{location_model.__name__}')
+    post_save.connect(location_saved, sender=location_model, dispatch_uid=f'property_search_{location_model.__name__}')
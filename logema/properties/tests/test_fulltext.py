@@ -0,0 +1,115 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from properties.fulltext import fold_text, query_terms, rebuild_index
+from properties.models import Property
+from accounts.models import User
+from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+
+
+class FullTextSearchTests(TestCase):
+    """Tests de la recherche plein texte ?q= sur /api/properties/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Ratoma", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Ratoma Centre", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        self.quartier = Quartier.objects.create(name="Kagbélen", ville=ville)
+        self.secteur = Secteur.objects.create(name="Secteur 2", quartier=self.quartier)
+        other_quartier = Quartier.objects.create(name="Kipé", ville=ville)
+        self.other_secteur = Secteur.objects.create(name="Secteur 1", quartier=other_quartier)
+
+        self.owner = User.objects.create_user(username='owner_fts', password='password', is_proprietaire=True)
+
+        self.rentree = self.create_property(
+            title="Rentrée couchée meublée",
+            description="Petite chambre calme",
+            point_de_repere="Derrière la pharmacie",
+            secteur=self.other_secteur,
+        )
+        self.villa = self.create_property(
+            title="Villa avec jardin",
+            description="Grande villa, proche d'une rentrée couchée",
+            point_de_repere="Près de l'école",
+        )
+        self.studio = self.create_property(
+            title="Studio moderne",
+            description="Cuisine équipée",
+            point_de_repere="Face à la Mosquée",
+        )
+
+    def create_property(self, **kwargs):
+        data = {
+            'owner': self.owner,
+            'property_type': "APPARTEMENT",
+            'price': 1500000,
+            'secteur': self.secteur,
+        }
+        data.update(kwargs)
+        return Property.objects.create(**data)
+
+    def search(self, query):
+        response = self.client.get('/api/properties/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_fold_text(self):
+        """Le repliement supprime accents et majuscules."""
+        self.assertEqual(fold_text("Rentrée à Kagbélen"), "rentree a kagbelen")
+        self.assertEqual(query_terms("  Kagbélen, MOSQUÉE! "), ["kagbelen", "mosquee"])
+
+    def test_accent_insensitive(self):
+        """Avec ou sans accents, la même annonce est trouvée."""
+        self.assertEqual(self.search("mosquée"), [self.studio.id])
+        self.assertEqual(self.search("MOSQUEE"), [self.studio.id])
+
+    def test_location_names_are_indexed(self):
+        """Le nom du quartier (Kagbélen) est cherchable sans accent."""
+        self.assertEqual(set(self.search("kagbelen")), {self.villa.id, self.studio.id})
+
+    def test_ranking_prefers_title(self):
+        """Un terme présent dans le titre passe devant un terme de la description."""
+        self.assertEqual(self.search("rentree couchee"), [self.rentree.id, self.villa.id])
+
+    def test_prefix_and_all_terms(self):
+        """Chaque terme est cherché en préfixe et tous doivent correspondre."""
+        self.assertEqual(self.search("pharma"), [self.rentree.id])
+        self.assertEqual(self.search("villa pharmacie"), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Les signaux tiennent l'index à jour."""
+        self.studio.title = "Duplex lumineux"
+        self.studio.save()
+        self.assertEqual(self.search("duplex"), [self.studio.id])
+        self.assertEqual(self.search("studio"), [])
+
+        self.studio.delete()
+        self.assertEqual(self.search("duplex"), [])
+
+    def test_location_rename_reindexes(self):
+        """Renommer un quartier met à jour les documents de ses biens."""
+        self.quartier.name = "Sonfonia"
+        self.quartier.save()
+        self.assertEqual(set(self.search("sonfonia")), {self.villa.id, self.studio.id})
+        self.assertEqual(self.search("kagbelen"), [])
+
+    def test_rebuild_index(self):
+        """La reconstruction complète réindexe tous les biens."""
+        self.assertEqual(rebuild_index(), 3)
+        self.assertEqual(self.search("jardin"), [self.villa.id])
+
+    def test_combines_with_filters(self):
+        """?q= se combine avec les autres filtres."""
+        response = self.client.get('/api/properties/', {'q': 'kagbelen', 'secteur': self.secteur.id, 'max_price': 100})
+        self.assertEqual(response.data['results'], [])
+
+    def test_cursor_pagination_by_rank(self):
+        """Le curseur suit l'ordre de pertinence d'une page à l'autre."""
+        response = self.client.get('/api/properties/', {'q': 'rentree couchee', 'page_size': 1})
+        ids = [item['id'] for item in response.data['results']]
+        response = self.client.get(response.data['next'])
+        ids += [item['id'] for item in response.data['results']]
+        self.assertEqual(ids, [self.rentree.id, self.villa.id])
+        self.assertIsNone(response.data['next'])
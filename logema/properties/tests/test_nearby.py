@@ -0,0 +1,126 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from properties.models import Property
+from accounts.models import User
+from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+from logema.utils.geo import (
+    generate_geohash, geohash_cells, geohash_successor, calculate_distance, rank_by_distance
+)
+
+
+class GeohashTests(TestCase):
+    """Tests pour l'index spatial geohash"""
+
+    def test_generate_geohash_known_value(self):
+        """Encodage d'un point de référence connu."""
+        self.assertEqual(generate_geohash(57.64911, 10.40744, precision=11), 'u4pruydqqvj')
+
+    def test_generate_geohash_without_coordinates(self):
+        """Pas de geohash sans coordonnées."""
+        self.assertIsNone(generate_geohash(None, -13.7))
+
+    def test_cells_cover_the_origin(self):
+        """Les cellules couvrent le point de recherche et restent peu nombreuses."""
+        cells = geohash_cells(9.5092, -13.7122, 5)
+        self.assertLessEqual(len(cells), 16)
+        origin = generate_geohash(9.5092, -13.7122)
+        self.assertTrue(any(origin.startswith(cell) for cell in cells))
+
+    def test_successor_bounds_the_prefix(self):
+        """La borne haute suit l'alphabet base32, avec retenue."""
+        self.assertEqual(geohash_successor('s0e'), 's0f')
+        self.assertEqual(geohash_successor('s0z'), 's1')
+        self.assertEqual(geohash_successor('9'), 'b')
+        self.assertIsNone(geohash_successor('zz'))
+
+
+class DistanceEngineTests(TestCase):
+    """Tests pour le moteur de distance vectorisé"""
+
+    def test_matches_scalar_haversine(self):
+        """Les distances vectorisées correspondent au calcul scalaire."""
+        lats = [9.5100, 9.5300, 10.0570]
+        lngs = [-13.7120, -13.7000, -12.8650]
+        distances, _, _ = rank_by_distance(9.5092, -13.7122, lats, lngs)
+        for distance, lat, lng in zip(distances, lats, lngs):
+            self.assertAlmostEqual(distance, calculate_distance(9.5092, -13.7122, lat, lng), places=6)
+
+    def test_radius_mask_and_order(self):
+        """Le masque respecte le rayon et l'ordre trie par distance."""
+        lats = [9.5300, None, 9.5100, 10.0570]
+        lngs = [-13.7000, -13.7000, -13.7120, -12.8650]
+        _, mask, order = rank_by_distance(9.5092, -13.7122, lats, lngs, radius_km=10)
+        self.assertEqual(mask.tolist(), [True, False, True, False])
+        self.assertEqual(order.tolist(), [2, 0])
+
+        _, _, order = rank_by_distance(9.5092, -13.7122, lats, lngs, radius_km=10, k=1)
+        self.assertEqual(order.tolist(), [2])
+
+
+class NearbyPropertiesTests(TestCase):
+    """Tests pour l'endpoint /api/properties/nearby/"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.region = Region.objects.create(name="Conakry")
+        self.prefecture = Prefecture.objects.create(name="Kaloum", region=self.region)
+        self.sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=self.prefecture)
+        self.ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=self.sous_prefecture)
+        self.quartier = Quartier.objects.create(name="Almamya", ville=self.ville)
+        self.secteur = Secteur.objects.create(name="Secteur 1", quartier=self.quartier)
+        self.owner = User.objects.create_user(username='owner_geo', password='password', is_proprietaire=True)
+
+        self.origin = (9.5092, -13.7122)
+        self.close = self._create_property("Très proche", 9.5100, -13.7120)
+        self.medium = self._create_property("Proche", 9.5300, -13.7000)
+        self.far = self._create_property("Loin (Kindia)", 10.0570, -12.8650)
+
+    def _create_property(self, title, lat, lng):
+        return Property.objects.create(
+            owner=self.owner,
+            title=title,
+            description="Test",
+            property_type="APPARTEMENT",
+            price=1500000,
+            secteur=self.secteur,
+            latitude=lat,
+            longitude=lng
+        )
+
+    def test_geohash_maintained_on_save(self):
+        """Le geohash suit les coordonnées lors de la sauvegarde."""
+        self.assertEqual(self.close.geohash, generate_geohash(9.5100, -13.7120))
+
+        self.close.latitude = 9.6000
+        self.close.save(update_fields=['latitude'])
+        self.close.refresh_from_db()
+        self.assertEqual(self.close.geohash, generate_geohash(9.6000, -13.7120))
+
+    def test_nearby_sorted_with_radius_cutoff(self):
+        """Les résultats sont triés par distance et limités au rayon."""
+        response = self.client.get('/api/properties/nearby/', {
+            'lat': self.origin[0], 'lng': self.origin[1], 'dist': 10
+        })
+        self.assertEqual(response.status_code, 200)
+        ids = [item['id'] for item in response.data]
+        self.assertEqual(ids, [self.close.id, self.medium.id])
+        self.assertLessEqual(response.data[0]['distance'], response.data[1]['distance'])
+
+    def test_nearby_k_nearest(self):
+        """Le paramètre k limite aux k plus proches."""
+        response = self.client.get('/api/properties/nearby/', {
+            'lat': self.origin[0], 'lng': self.origin[1], 'dist': 10, 'k': 1
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['id'] for item in response.data], [self.close.id])
+
+    def test_nearby_invalid_parameters(self):
+        """Des paramètres invalides renvoient une erreur 400."""
+        response = self.client.get('/api/properties/nearby/', {'lat': 'abc', 'lng': self.origin[1]})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get('/api/properties/nearby/', {
+            'lat': self.origin[0], 'lng': self.origin[1], 'k': 0
+        })
+        self.assertEqual(response.status_code, 400)
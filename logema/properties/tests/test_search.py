@@ -0,0 +1,203 @@
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from properties.models import Property, PropertySearch
+from properties.search import rebuild_property_search
+from transactions.models import OccupationRequest
+from accounts.models import User
+from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+
+
+class PropertySearchTableTests(TestCase):
+    """Tests pour la table de recherche dénormalisée property_search"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.region = Region.objects.create(name="Conakry")
+        self.prefecture = Prefecture.objects.create(name="Ratoma", region=self.region)
+        self.sous_prefecture = SousPrefecture.objects.create(name="Ratoma Centre", prefecture=self.prefecture)
+        self.ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=self.sous_prefecture)
+        self.quartier = Quartier.objects.create(name="Kipé", ville=self.ville)
+        self.secteur = Secteur.objects.create(name="Secteur 3", quartier=self.quartier)
+
+        self.other_region = Region.objects.create(name="Kindia")
+        self.other_prefecture = Prefecture.objects.create(name="Coyah", region=self.other_region)
+        self.other_sp = SousPrefecture.objects.create(name="Coyah Centre", prefecture=self.other_prefecture)
+        self.other_ville = Ville.objects.create(name="Coyah", sous_prefecture=self.other_sp)
+        self.other_quartier = Quartier.objects.create(name="Manéah", ville=self.other_ville)
+        self.other_secteur = Secteur.objects.create(name="Secteur 1", quartier=self.other_quartier)
+
+        self.owner = User.objects.create_user(username='owner_search', password='password', is_proprietaire=True)
+        self.tenant = User.objects.create_user(username='tenant_search', password='password')
+
+        self.prop = Property.objects.create(
+            owner=self.owner,
+            title="Appartement Kipé",
+            description="Test",
+            property_type="APPARTEMENT",
+            price=2000000,
+            secteur=self.secteur
+        )
+
+    def test_entry_created_with_flattened_hierarchy(self):
+        """La création d'un bien alimente la table de recherche."""
+        entry = PropertySearch.objects.get(property=self.prop)
+        self.assertEqual(entry.region_id, self.region.id)
+        self.assertEqual(entry.region_name, "Conakry")
+        self.assertEqual(entry.quartier_name, "Kipé")
+        self.assertEqual(entry.secteur_id, self.secteur.id)
+        self.assertEqual(entry.price, 2000000)
+        self.assertIsNone(entry.under_validation_until)
+
+    def test_entry_follows_property_changes(self):
+        """Déplacement de secteur et disponibilité sont répercutés."""
+        self.prop.secteur = self.other_secteur
+        self.prop.is_available = False
+        self.prop.save()
+
+        entry = PropertySearch.objects.get(property=self.prop)
+        self.assertEqual(entry.region_id, self.other_region.id)
+        self.assertEqual(entry.ville_name, "Coyah")
+        self.assertFalse(entry.is_available)
+
+    def test_entry_follows_location_rename(self):
+        """Le renommage d'un nœud de localisation met à jour les noms."""
+        self.quartier.name = "Kipé Centre"
+        self.quartier.save()
+        self.assertEqual(PropertySearch.objects.get(property=self.prop).quartier_name, "Kipé Centre")
+
+    def test_entry_follows_occupation_requests(self):
+        """Une demande PENDING fixe la fin de la période de validation."""
+        request = OccupationRequest.objects.create(property=self.prop, user=self.tenant, status='PENDING')
+        entry = PropertySearch.objects.get(property=self.prop)
+        self.assertEqual(entry.under_validation_until, request.created_at + Property.VALIDATION_WINDOW)
+
+        request.status = 'CANCELLED'
+        request.save()
+        self.assertIsNone(PropertySearch.objects.get(property=self.prop).under_validation_until)
+
+    def test_listing_filters_use_search_table(self):
+        """Les filtres de l'API et le masquage des biens en validation passent par la table."""
+        other = Property.objects.create(
+            owner=self.owner,
+            title="Villa Coyah",
+            description="Test",
+            property_type="VILLA",
+            price=9000000,
+            secteur=self.other_secteur
+        )
+
+        response = self.client.get('/api/properties/', {'region': self.other_region.id})
+        self.assertEqual([item['id'] for item in response.data['results']], [other.id])
+
+        response = self.client.get('/api/properties/', {'max_price': 5000000})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.prop.id])
+
+        OccupationRequest.objects.create(property=self.prop, user=self.tenant, status='PENDING')
+        response = self.client.get('/api/properties/')
+        self.assertEqual([item['id'] for item in response.data['results']], [other.id])
+
+    def test_rebuild_repairs_missing_entries(self):
+        """La reconstruction recrée les lignes manquantes."""
+        PropertySearch.objects.all().delete()
+        self.assertEqual(rebuild_property_search(), 1)
+        self.assertTrue(PropertySearch.objects.filter(property=self.prop).exists())
+
+
+class PropertyListQueryCountTests(TestCase):
+    """Le listing des biens doit coûter un nombre constant de requêtes"""
+
+    def setUp(self):
+        self.client = APIClient()
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Matam", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Matam Centre", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Madina", ville=ville)
+        self.secteur = Secteur.objects.create(name="Secteur 2", quartier=quartier)
+        self.owner = User.objects.create_user(username='owner_count', password='password', is_proprietaire=True)
+        self.agent = User.objects.create_user(username='agent_count', password='password', is_demarcheur=True)
+
+    def _create_properties(self, count):
+        for i in range(count):
+            Property.objects.create(
+                owner=self.owner,
+                agent=self.agent,
+                title=f"Studio {i}",
+                description="Test",
+                property_type="STUDIO",
+                price=800000,
+                secteur=self.secteur
+            )
+
+    def test_list_query_count_is_constant(self):
+        """Propriétés + images : deux requêtes, quel que soit le nombre de biens."""
+        self._create_properties(3)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/properties/')
+        self.assertEqual(len(response.data['results']), 3)
+
+        self._create_properties(7)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/properties/')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertFalse(any(item['is_under_validation'] for item in response.data['results']))
+
+    def test_cursor_pagination(self):
+        """Le listing est paginé par curseur, sans doublon entre les pages."""
+        self._create_properties(5)
+        response = self.client.get('/api/properties/', {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        seen = [item['id'] for item in response.data['results']]
+        next_url = response.data['next']
+        while next_url:
+            response = self.client.get(next_url)
+            seen.extend(item['id'] for item in response.data['results'])
+            next_url = response.data['next']
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_count_on_first_page(self):
+        """?with_count=1 ajoute le total exact sur la première page uniquement."""
+        self._create_properties(5)
+        response = self.client.get('/api/properties/', {'page_size': 2, 'with_count': 1})
+        self.assertEqual(response.data['count'], 5)
+
+        response = self.client.get(response.data['next'])
+        self.assertNotIn('count', response.data)
+        self.assertNotIn('count', self.client.get('/api/properties/').data)
+
+    def test_sparse_fieldset(self):
+        """?fields= restreint la réponse et évite le prefetch des images inutile."""
+        self._create_properties(3)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/properties/', {'fields': 'id,latitude,longitude,price'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'latitude', 'longitude', 'price'})
+
+        response = self.client.get('/api/properties/', {'fields': 'id,price,thumbnail'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'price', 'thumbnail'})
+        self.assertIsNone(response.data['results'][0]['thumbnail'])
+
+
+class QueryPlanAuditTests(TestCase):
+    """Tests de la commande audit_query_plans"""
+
+    def test_canonical_queries_use_indexes(self):
+        """Aucune requête canonique du listing ne fait de parcours complet."""
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('audit_query_plans', stdout=out)
+        self.assertNotIn('FULL SCAN', out.getvalue())
+
+    def test_full_scan_detection(self):
+        """Les lignes SCAN sans index sont détectées, les parcours d'index non."""
+        from properties.management.commands.audit_query_plans import SQLITE_FULL_SCAN
+
+        self.assertEqual(SQLITE_FULL_SCAN.findall("2 0 0 SCAN property_search"), ['property_search'])
+        self.assertEqual(SQLITE_FULL_SCAN.findall("2 0 0 SCAN property_search USING INDEX property_search_created"), [])
+        self.assertEqual(SQLITE_FULL_SCAN.findall("16 14 0 SCAN property_fts VIRTUAL TABLE INDEX 0:M4"), [])
@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from properties.models import Property
+from properties.tiles import tile_for_point, tile_bounds
+from accounts.models import User
+from locations.models import Region, Prefecture, SousPrefecture, Ville, Quartier, Secteur
+
+
+class PropertyTilesTests(TestCase):
+    """Tests pour l'endpoint /api/properties/tiles/{z}/{x}/{y}/"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        region = Region.objects.create(name="Conakry")
+        prefecture = Prefecture.objects.create(name="Dixinn", region=region)
+        sous_prefecture = SousPrefecture.objects.create(name="Dixinn Centre", prefecture=prefecture)
+        ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=sous_prefecture)
+        quartier = Quartier.objects.create(name="Landréah", ville=ville)
+        self.secteur = Secteur.objects.create(name="Secteur 1", quartier=quartier)
+        self.owner = User.objects.create_user(username='owner_tiles', password='password', is_proprietaire=True)
+
+        # Trois biens regroupés à Dixinn, un isolé à Kindia
+        self.dixinn = [self._create_property(9.5370 + i * 0.0001, -13.6773) for i in range(3)]
+        self.kindia = self._create_property(10.0570, -12.8650)
+
+    def _create_property(self, lat, lng):
+        return Property.objects.create(
+            owner=self.owner,
+            title="Appartement",
+            description="Test",
+            property_type="APPARTEMENT",
+            price=1500000,
+            secteur=self.secteur,
+            latitude=lat,
+            longitude=lng
+        )
+
+    def _get_tile(self, z, lat, lng):
+        x, y = tile_for_point(lat, lng, z)
+        return self.client.get(f'/api/properties/tiles/{z}/{x}/{y}/')
+
+    def test_tile_bounds_contain_point(self):
+        """La tuile calculée pour un point contient bien ce point."""
+        x, y = tile_for_point(9.5370, -13.6773, 12)
+        south, north, west, east = tile_bounds(12, x, y)
+        self.assertTrue(south <= 9.5370 < north)
+        self.assertTrue(west <= -13.6773 < east)
+
+    def test_low_zoom_returns_clusters(self):
+        """À faible zoom, les biens proches sont regroupés en clusters."""
+        response = self._get_tile(4, 9.5370, -13.6773)
+        self.assertEqual(response.status_code, 200)
+        clusters = response.data['clusters']
+        self.assertEqual([c['count'] for c in clusters], [4])
+        self.assertNotIn('property_id', clusters[0])
+
+    def test_single_property_cluster_exposes_id(self):
+        """Un cluster d'un seul bien expose son identifiant."""
+        response = self._get_tile(14, 10.0570, -12.8650)
+        self.assertEqual(response.data['clusters'], [{
+            'latitude': 10.0570, 'longitude': -12.8650, 'count': 1, 'property_id': self.kindia.id
+        }])
+
+    def test_tile_cache_invalidated_on_change(self):
+        """Le cache de la tuile est invalidé quand un bien de la tuile change."""
+        self._get_tile(14, 10.0570, -12.8650)
+        # Tuile en cache : seule sa version est lue
+        with self.assertNumQueries(1):
+            self._get_tile(14, 10.0570, -12.8650)
+
+        self.kindia.is_available = False
+        self.kindia.save()
+        response = self._get_tile(14, 10.0570, -12.8650)
+        self.assertEqual(response.data['clusters'], [])
+
+    def test_invalidation_seen_by_other_processes(self):
+        """L'invalidation passe par la version en base, pas par le cache du processus."""
+        from ..models import PropertySearch
+        from ..tiles import invalidate_tiles_for_properties
+
+        self._get_tile(14, 10.0570, -12.8650)
+        # update() sans signal : la tuile en cache reste servie
+        PropertySearch.objects.filter(property_id=self.kindia.id).update(is_available=False)
+        self.assertEqual(len(self._get_tile(14, 10.0570, -12.8650).data['clusters']), 1)
+
+        # Seule la version en base change, le cache lui-même n'est pas touché
+        invalidate_tiles_for_properties([self.kindia.id])
+        self.assertEqual(self._get_tile(14, 10.0570, -12.8650).data['clusters'], [])
+
+    def test_invalid_tile(self):
+        """Des coordonnées de tuile hors limites renvoient une erreur 400."""
+        response = self.client.get('/api/properties/tiles/2/9/0/')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,162 @@
+"""
+Clustering des biens par tuile de carte (schéma XYZ / Web Mercator)
+"""
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, Min, Q
+from django.db.models.functions import Floor
+from django.utils import timezone
+
+from .models import PropertySearch, PropertyTileVersion
+
+MAX_TILE_ZOOM = 18
+
+
+def get_tile_grid_size():
+    return getattr(settings, 'PROPERTY_TILE_GRID_SIZE', 8)
+
+
+def get_tile_cache_timeout():
+    return getattr(settings, 'PROPERTY_TILE_CACHE_TIMEOUT', 600)
+
+
+def tile_bounds(z, x, y):
+    """
+    Returns (south, north, west, east) in degrees for an XYZ tile.
+    """
+    n = 2 ** z
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, north, west, east
+
+
+def tile_for_point(latitude, longitude, z):
+    """
+    Returns the (x, y) tile containing a point at zoom z.
+    """
+    n = 2 ** z
+    lat = max(min(latitude, 85.0511), -85.0511)
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_name(z, x, y):
+    return f'{z}/{x}/{y}'
+
+
+def tile_cache_key(z, x, y, version=0):
+    return f'property_tile:{z}:{x}:{y}:v{version}'
+
+
+def cluster_tile(z, x, y):
+    """
+    Groups the visible properties of a tile into a grid_size x grid_size grid.
+    The grouping runs in SQL over the property_search table, so the payload is
+    bounded by the grid size whatever the number of listings in the tile.
+    """
+    south, north, west, east = tile_bounds(z, x, y)
+    grid = get_tile_grid_size()
+    cell_width = (east - west) / grid
+    cell_height = (north - south) / grid
+
+    rows = (
+        PropertySearch.objects
+        .filter(
+            Q(under_validation_until__isnull=True) | Q(under_validation_until__lt=timezone.now()),
+            is_available=True,
+            latitude__gte=south, latitude__lt=north,
+            longitude__gte=west, longitude__lt=east,
+        )
+        .annotate(
+            cell_x=Floor((F('longitude') - west) / cell_width),
+            cell_y=Floor((north - F('latitude')) / cell_height),
+        )
+        .values('cell_x', 'cell_y')
+        .annotate(
+            count=Count('property_id'),
+            lat=Avg('latitude'),
+            lng=Avg('longitude'),
+            first_property=Min('property_id'),
+        )
+        .order_by('cell_y', 'cell_x')
+    )
+
+    clusters = []
+    for row in rows:
+        cluster = {
+            'latitude': row['lat'],
+            'longitude': row['lng'],
+            'count': row['count'],
+        }
+        if row['count'] == 1:
+            cluster['property_id'] = row['first_property']
+        clusters.append(cluster)
+
+    return {
+        'z': z,
+        'x': x,
+        'y': y,
+        'bounds': {'south': south, 'north': north, 'west': west, 'east': east},
+        'clusters': clusters,
+    }
+
+
+def get_tile(z, x, y):
+    """
+    Returns the cached clusters of a tile, computing them on a miss.
+    The cache key carries the tile version stored in the database, so an
+    invalidation from any process is seen by every process.
+    """
+    version = PropertyTileVersion.objects.filter(tile=tile_name(z, x, y)).values_list('version', flat=True).first()
+    key = tile_cache_key(z, x, y, version or 0)
+    data = cache.get(key)
+    if data is None:
+        data = cluster_tile(z, x, y)
+        cache.set(key, data, get_tile_cache_timeout())
+    return data
+
+
+def bump_tile_versions(tiles, batch_size=500):
+    """
+    Increments the version of the given (z, x, y) tiles: their cached entries are
+    no longer read and expire on their own.
+    """
+    names = sorted({tile_name(*tile) for tile in tiles})
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        PropertyTileVersion.objects.filter(tile__in=batch).update(version=F('version') + 1)
+        # Tuiles jamais invalidées : créées directement en version 1
+        PropertyTileVersion.objects.bulk_create(
+            [PropertyTileVersion(tile=name, version=1) for name in batch], ignore_conflicts=True
+        )
+
+
+def tiles_for_point(latitude, longitude):
+    """
+    The tiles containing this point at every zoom level.
+    """
+    if latitude is None or longitude is None:
+        return []
+    return [(z, *tile_for_point(latitude, longitude, z)) for z in range(MAX_TILE_ZOOM + 1)]
+
+
+def invalidate_tiles_for_point(latitude, longitude):
+    """
+    Invalidates the cached tile containing this point at every zoom level.
+    """
+    bump_tile_versions(tiles_for_point(latitude, longitude))
+
+
+def invalidate_tiles_for_properties(property_ids):
+    """
+    Invalidates the cached tiles of the given properties, using their indexed coordinates.
+    """
+    coordinates = PropertySearch.objects.filter(property_id__in=property_ids).values_list('latitude', 'longitude')
+    bump_tile_versions(
+        tile for latitude, longitude in coordinates for tile in tiles_for_point(latitude, longitude)
+    )
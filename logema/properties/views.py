@@ -2,22 +2,28 @@ from django.db import models
 from rest_framework import viewsets, permissions
 from .models import Property, ManagementMandate
 from locations.models import Ville, Quartier, Secteur
+from transactions.models import OccupationRequest
+from accounts.notifications import notify_user
 from .serializers import PropertySerializer, ManagementMandateSerializer
 from .filters import PropertyFilter
+from .fulltext import search as fulltext_search
+from .pagination import PropertyCursorPagination
+from .tiles import MAX_TILE_ZOOM, get_tile
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from math import sin, cos, sqrt, atan2, radians
+from logema.utils.geo import bounding_box, geohash_ranges, rank_by_distance
 
 from .permissions import IsVerifiedOwnerOrAgent
 
 class PropertyViewSet(viewsets.ModelViewSet):
     queryset = Property.objects.select_related(
-        'secteur__quartier__ville__sous_prefecture__prefecture__region',
+        'secteur__quartier',
         'owner',
         'agent'
     ).prefetch_related('images').all()
     serializer_class = PropertySerializer
     filterset_class = PropertyFilter
+    pagination_class = PropertyCursorPagination
 
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -63,20 +69,44 @@ class PropertyViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = super().get_queryset()
         
+        # Sparse fieldsets: skip the images prefetch when neither images nor thumbnail are requested
+        requested = PropertySerializer.get_requested_fields(self.request)
+        if requested and not requested & {'images', 'thumbnail'}:
+            queryset = queryset.prefetch_related(None)
+
         # Move common filtering logic to a reusable method or apply it here
         from django.utils import timezone
-        from datetime import timedelta
-        five_hours_ago = timezone.now() - timedelta(hours=5)
+        now = timezone.now()
         
+        # Both predicates below are read from the flattened property_search table
         # Hide properties that are not available
-        queryset = queryset.filter(is_available=True)
+        queryset = queryset.filter(search_entry__is_available=True)
         
         # "Clean Search": Hide properties under validation
-        # We exclude properties that have any PENDING occupation request from the last 5 hours
-        queryset = queryset.exclude(
-            occupation_requests__status='PENDING',
-            occupation_requests__created_at__gte=five_hours_ago
-        ).distinct()
+        # We exclude properties whose latest PENDING occupation request is still within its validation window
+        queryset = queryset.filter(
+            models.Q(search_entry__under_validation_until__isnull=True) |
+            models.Q(search_entry__under_validation_until__lt=now)
+        )
+
+        # Listing order read from property_search so the partial created_at index drives the page
+        queryset = queryset.annotate(listed_at=models.F('search_entry__created_at'))
+
+        # Compute is_under_validation once in SQL instead of one query per serialized row
+        queryset = queryset.annotate(
+            under_validation=models.Exists(
+                OccupationRequest.objects.filter(
+                    property=models.OuterRef('pk'),
+                    status='PENDING',
+                    created_at__gte=now - Property.VALIDATION_WINDOW
+                )
+            )
+        )
+
+        # Full-text search (title, description, landmarks, location names), ranked by relevance
+        self.search_query = self.request.query_params.get('q', '').strip()
+        if self.search_query:
+            queryset = fulltext_search(queryset, self.search_query).order_by('search_rank', '-listed_at', 'id')
 
         lat = self.request.query_params.get('lat')
         lng = self.request.query_params.get('lng')
@@ -84,66 +114,93 @@ class PropertyViewSet(viewsets.ModelViewSet):
 
         if lat and lng:
             try:
-                lat = float(lat)
-                lng = float(lng)
-                dist = float(dist)
-                
-                # Simple approximation for SQLite (bounding box)
-                lat_range = dist / 111.0
-                lng_range = dist / (111.0 * abs(cos(radians(lat))))
-                
-                queryset = queryset.filter(
-                    latitude__range=(lat - lat_range, lat + lat_range),
-                    longitude__range=(lng - lng_range, lng + lng_range)
-                )
+                queryset = self.filter_by_distance(queryset, float(lat), float(lng), float(dist))
             except (ValueError, TypeError):
                 pass
         return queryset
 
+    def filter_by_distance(self, queryset, lat, lng, dist):
+        """
+        Restricts the queryset to the geohash cells covering `dist` km around
+        (lat, lng), then trims it to the exact bounding box.
+        The cell ranges hit the geohash index, so the database never scans
+        listings outside the search area.
+        """
+        cells = models.Q()
+        for low, high in geohash_ranges(lat, lng, dist):
+            cell = models.Q(geohash__gte=low)
+            if high is not None:
+                cell &= models.Q(geohash__lt=high)
+            cells |= cell
+
+        min_lat, max_lat, min_lng, max_lng = bounding_box(lat, lng, dist)
+        return queryset.filter(
+            cells,
+            latitude__range=(min_lat, max_lat),
+            longitude__range=(min_lng, max_lng)
+        )
+
     @action(detail=False, methods=['get'])
     def nearby(self, request):
         """
         Special endpoint to return nearby properties with distance calculation.
+        Candidates are ranked on their coordinates alone; only the properties
+        within `dist` km (and the `k` closest, if given) are serialized.
         """
         lat = request.query_params.get('lat')
         lng = request.query_params.get('lng')
         
         if not lat or not lng:
             return Response({"error": "Latitude and longitude are required"}, status=400)
-            
+
+        try:
+            user_lat = float(lat)
+            user_lng = float(lng)
+            dist_limit = float(request.query_params.get('dist', 10))
+            k = request.query_params.get('k')
+            k = int(k) if k else None
+        except (ValueError, TypeError):
+            return Response({"error": "Invalid lat, lng, dist or k"}, status=400)
+
+        if k is not None and k <= 0:
+            return Response({"error": "k must be a positive integer"}, status=400)
+
         queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        data = serializer.data
-        
-        # Add distance to each property
-        user_lat = float(lat)
-        user_lng = float(lng)
-        R = 6371.0 # Earth radius
-        
-        dist_limit = float(request.query_params.get('dist', 10))
+
+        # Rank on raw coordinates before paying any serialization cost
+        candidates = list(queryset.values_list('id', 'latitude', 'longitude'))
+        ids = [row[0] for row in candidates]
+        distances, _, order = rank_by_distance(
+            user_lat, user_lng,
+            [row[1] for row in candidates],
+            [row[2] for row in candidates],
+            radius_km=dist_limit,
+            k=k
+        )
+        ranked = [(float(distances[i]), ids[i]) for i in order]
+
+        properties = queryset.in_bulk([pk for _, pk in ranked])
+        serializer = self.get_serializer([properties[pk] for _, pk in ranked], many=True)
+
         final_data = []
-        
-        for prop in data:
-            if prop['latitude'] and prop['longitude']:
-                p_lat = float(prop['latitude'])
-                p_lng = float(prop['longitude'])
-                
-                dlon = radians(p_lng - user_lng)
-                dlat = radians(p_lat - user_lat)
-                
-                a = sin(dlat / 2)**2 + cos(radians(user_lat)) * cos(radians(p_lat)) * sin(dlon / 2)**2
-                c = 2 * atan2(sqrt(a), sqrt(1 - a))
-                distance = R * c
-                
-                if distance <= dist_limit:
-                    prop['distance'] = round(distance, 2)
-                    final_data.append(prop)
-        
-        # Sort by distance
-        final_data.sort(key=lambda x: x.get('distance', 999999))
+        for (distance, _), prop in zip(ranked, serializer.data):
+            prop['distance'] = round(distance, 2)
+            final_data.append(prop)
         
         return Response(final_data)
 
+    @action(detail=False, methods=['get'], url_path=r'tiles/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)')
+    def tiles(self, request, z=None, x=None, y=None):
+        """
+        Pre-clustered markers for one XYZ map tile.
+        Each tile holds at most PROPERTY_TILE_GRID_SIZE² clusters (count + centroid),
+        cached until a property inside the tile changes.
+        """
+        z, x, y = int(z), int(x), int(y)
+        if z > MAX_TILE_ZOOM or x >= 2 ** z or y >= 2 ** z:
+            return Response({"error": "Invalid tile coordinates"}, status=400)
+        return Response(get_tile(z, x, y))
+
 class ManagementMandateViewSet(viewsets.ModelViewSet):
     queryset = ManagementMandate.objects.all()
     serializer_class = ManagementMandateSerializer
@@ -195,6 +252,11 @@ class ManagementMandateViewSet(viewsets.ModelViewSet):
         mandate.signature_agent = f"signed_by_{request.user.id}_{timezone.now().timestamp()}"
         mandate.signed_at = timezone.now()
         mandate.save()
+        notify_user(
+            mandate.owner,
+            f"Votre mandat de gestion a été signé par {request.user.username}.",
+            kind='MANDATE_SIGNED'
+        )
         return Response(self.get_serializer(mandate).data)
 
     @action(detail=True, methods=['post'])
@@ -221,6 +283,11 @@ class ManagementMandateViewSet(viewsets.ModelViewSet):
             mandate.signed_at = timezone.now()
             
         mandate.save()
+        notify_user(
+            mandate.agent,
+            f"Le propriétaire {request.user.username} a signé votre proposition de mandat.",
+            kind='MANDATE_SIGNED'
+        )
         return Response(self.get_serializer(mandate).data)
 
 
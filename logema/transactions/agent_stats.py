@@ -0,0 +1,140 @@
+"""
+Statistiques des agents (AgentStats)
+
+Chaque visite compte dans le compteur de son statut courant et, si elle est notée,
+dans rating_count / rating_sum de son agent. Les compteurs sont ajustés par delta
+avec F() à chaque changement de visite (voir transactions.signals) : noter une
+visite ne relit plus toutes les notes de l'agent. `recount_agent_stats` les
+recalcule depuis la table des visites.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, Round
+
+from .models import AgentStats, VisitVoucher
+
+STATUS_FIELDS = {status: f'visits_{status.lower()}' for status, _label in VisitVoucher.STATUS_CHOICES}
+
+COUNTER_FIELDS = list(STATUS_FIELDS.values()) + ['rating_count', 'rating_sum']
+
+
+def visit_state(visit):
+    """État (agent_id, status, rating) d'une visite, tel que compté dans AgentStats."""
+    rating = int(visit.rating) if visit.rating not in (None, '') else None
+    return (visit.agent_id, visit.status, rating)
+
+
+def state_deltas(state, sign):
+    agent_id, status, rating = state
+    deltas = {STATUS_FIELDS[status]: sign} if status in STATUS_FIELDS else {}
+    if rating is not None:
+        deltas['rating_count'] = sign
+        deltas['rating_sum'] = sign * rating
+    return agent_id, deltas
+
+
+def adjust_agent_stats(agent_id, deltas):
+    """
+    Ajoute les deltas aux compteurs d'un agent, en un UPDATE avec F()
+    (la ligne est créée au premier changement).
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas or agent_id is None:
+        return
+    values = {field: F(field) + delta for field, delta in deltas.items()}
+    if not AgentStats.objects.filter(agent_id=agent_id).update(**values):
+        AgentStats.objects.bulk_create([AgentStats(agent_id=agent_id)], ignore_conflicts=True)
+        AgentStats.objects.filter(agent_id=agent_id).update(**values)
+
+
+def move_visit(old_state, new_state):
+    """
+    Applique le changement d'une visite entre deux états (agent_id, status, rating).
+    Un état None signifie que la visite n'existe pas (création ou suppression).
+    """
+    if old_state == new_state:
+        return
+    changes = defaultdict(lambda: defaultdict(int))
+    for state, sign in ((old_state, -1), (new_state, 1)):
+        if state is None:
+            continue
+        agent_id, deltas = state_deltas(state, sign)
+        for field, delta in deltas.items():
+            changes[agent_id][field] += delta
+
+    with transaction.atomic():
+        for agent_id, deltas in changes.items():
+            adjust_agent_stats(agent_id, deltas)
+        rated = [
+            agent_id for agent_id, deltas in changes.items()
+            if deltas.get('rating_count') or deltas.get('rating_sum')
+        ]
+        if rated:
+            update_reputation(rated)
+
+
+def update_reputation(agent_ids):
+    """
+    Reporte la moyenne des notes dans User.reputation_score, en un UPDATE de cette seule colonne.
+    Un agent sans note garde son score.
+    """
+    User = get_user_model()
+    average = AgentStats.objects.filter(agent_id=OuterRef('pk'), rating_count__gt=0).annotate(
+        score=Round(Cast('rating_sum', FloatField()) / F('rating_count'), 1)
+    ).values('score')[:1]
+    return User.objects.filter(pk__in=agent_ids).update(
+        reputation_score=Coalesce(Subquery(average, output_field=FloatField()), F('reputation_score'))
+    )
+
+
+def get_agent_stats(agent):
+    """Statistiques d'un agent ; un agent sans visite a des compteurs à zéro."""
+    stats = AgentStats.objects.filter(agent=agent).first() or AgentStats()
+    stats.agent = agent
+    return stats
+
+
+def recount_agent_stats():
+    """
+    Recalcule les compteurs de tous les agents depuis la table des visites.
+    Deux agrégations puis bulk_create / bulk_update ; retourne le nombre d'agents corrigés.
+    """
+    expected = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    by_status = VisitVoucher.objects.values('agent_id', 'status').annotate(total=Count('id')).values_list(
+        'agent_id', 'status', 'total'
+    )
+    for agent_id, status, total in by_status:
+        if status in STATUS_FIELDS:
+            expected[agent_id][STATUS_FIELDS[status]] = total
+    ratings = (
+        VisitVoucher.objects.filter(rating__isnull=False)
+        .values('agent_id')
+        .annotate(count=Count('id'), total=Sum('rating'))
+        .values_list('agent_id', 'count', 'total')
+    )
+    for agent_id, count, total in ratings:
+        expected[agent_id].update(rating_count=count, rating_sum=total)
+
+    with transaction.atomic():
+        changed, rated = [], []
+        existing = AgentStats.objects.select_for_update()
+        for stats in existing:
+            counters = expected.pop(stats.agent_id, dict.fromkeys(COUNTER_FIELDS, 0))
+            if any(getattr(stats, field) != value for field, value in counters.items()):
+                if (stats.rating_count, stats.rating_sum) != (counters['rating_count'], counters['rating_sum']):
+                    rated.append(stats.agent_id)
+                for field, value in counters.items():
+                    setattr(stats, field, value)
+                changed.append(stats)
+        AgentStats.objects.bulk_update(changed, COUNTER_FIELDS, batch_size=500)
+
+        missing = [AgentStats(agent_id=agent_id, **counters) for agent_id, counters in expected.items()]
+        AgentStats.objects.bulk_create(missing, batch_size=500)
+        rated += [stats.agent_id for stats in missing if stats.rating_count]
+
+        if rated:
+            update_reputation(rated)
+    return len(changed) + len(missing)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from transactions.agent_stats import recount_agent_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les statistiques des agents (visites par statut, notes, réputation) depuis les visites'
+
+    def handle(self, *args, **options):
+        updated = recount_agent_stats()
+        self.stdout.write(self.style.SUCCESS(f'{updated} agent(s) corrigé(s)'))
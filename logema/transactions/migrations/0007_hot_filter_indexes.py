@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-17 23:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_hot_filter_indexes'),
+        ('transactions', '0006_alter_visitvoucher_scheduled_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='occupationrequest',
+            index=models.Index(fields=['property', 'status', 'created_at'], name='occupation_prop_status_date'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_agent_stats(apps, schema_editor):
+    VisitVoucher = apps.get_model('transactions', 'VisitVoucher')
+    AgentStats = apps.get_model('transactions', 'AgentStats')
+    stats = {}
+    for agent_id, status, total in VisitVoucher.objects.values('agent_id', 'status').annotate(
+        total=Count('id')
+    ).values_list('agent_id', 'status', 'total'):
+        row = stats.setdefault(agent_id, AgentStats(agent_id=agent_id))
+        setattr(row, f'visits_{status.lower()}', total)
+    for agent_id, count, total in VisitVoucher.objects.filter(rating__isnull=False).values('agent_id').annotate(
+        count=Count('id'), total=Sum('rating')
+    ).values_list('agent_id', 'count', 'total'):
+        stats[agent_id].rating_count = count
+        stats[agent_id].rating_sum = total
+    AgentStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_phoneotp_email_alter_phoneotp_phone_number'),
+        ('transactions', '0007_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentStats',
+            fields=[
+                ('agent', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='agent_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('visits_requested', models.PositiveIntegerField(default=0)),
+                ('visits_accepted', models.PositiveIntegerField(default=0)),
+                ('visits_validated', models.PositiveIntegerField(default=0)),
+                ('visits_rejected', models.PositiveIntegerField(default=0)),
+                ('visits_missed', models.PositiveIntegerField(default=0)),
+                ('visits_cancelled', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_agent_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_hot_filter_indexes'),
+        ('transactions', '0008_agent_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='occupationrequest',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='interests', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='occupationrequest',
+            index=models.Index(fields=['user', '-created_at'], name='occupation_user_created'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0012_mandate_created_index'),
+        ('transactions', '0009_occupation_user_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='occupationrequest',
+            index=models.Index(fields=['created_at'], name='occupation_created'),
+        ),
+    ]
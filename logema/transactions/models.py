@@ -17,7 +17,8 @@ class OccupationRequest(models.Model):
     )
 
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='occupation_requests')
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='interests')
+    # Pas d'index simple : couvert par occupation_user_created
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='interests', db_index=False)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     
     # Champs de paiement
@@ -43,6 +44,16 @@ class OccupationRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Demande PENDING récente d'un bien (is_under_validation, property_search)
+            models.Index(fields=['property', 'status', 'created_at'], name='occupation_prop_status_date'),
+            # Demandes d'un locataire (visibilité de OccupationRequestViewSet)
+            models.Index(fields=['user', '-created_at'], name='occupation_user_created'),
+            # Demandes créées depuis le dernier instantané (accounts.admin_stats)
+            models.Index(fields=['created_at'], name='occupation_created'),
+        ]
+
     def __str__(self):
         return f"Demande {self.id} - {self.property.title} ({self.status})"
     
@@ -82,3 +93,43 @@ class VisitVoucher(models.Model):
 
     def __str__(self):
         return f"Visite {self.property.title} - {self.visitor.username} ({self.scheduled_at})"
+
+
+class AgentStats(models.Model):
+    """
+    Statistiques d'un agent, maintenues par delta (voir transactions.agent_stats)
+    et recalculables avec `recount_agent_stats`.
+    Un compteur par statut de visite : une visite compte dans le compteur de son statut courant.
+    """
+    agent = models.OneToOneField(
+        settings.AUTH_USER_MODEL, primary_key=True, related_name='agent_stats', on_delete=models.CASCADE
+    )
+
+    visits_requested = models.PositiveIntegerField(default=0)
+    visits_accepted = models.PositiveIntegerField(default=0)
+    visits_validated = models.PositiveIntegerField(default=0)
+    visits_rejected = models.PositiveIntegerField(default=0)
+    visits_missed = models.PositiveIntegerField(default=0)
+    visits_cancelled = models.PositiveIntegerField(default=0)
+
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+
+    @property
+    def reputation_score(self):
+        """Moyenne des notes sur 5 (None sans note)"""
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 1)
+
+    @property
+    def acceptance_rate(self):
+        """Part des demandes acceptées parmi celles auxquelles l'agent a répondu"""
+        accepted = self.visits_accepted + self.visits_validated + self.visits_missed
+        answered = accepted + self.visits_rejected
+        if not answered:
+            return None
+        return round(accepted / answered, 2)
+
+    def __str__(self):
+        return f"Stats {self.agent_id}"
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import OccupationRequest, VisitVoucher, VisitVoucher
+from .models import AgentStats, OccupationRequest, VisitVoucher
 
 class OccupationRequestSerializer(serializers.ModelSerializer):
     property_title = serializers.ReadOnlyField(source='property.title')
@@ -35,3 +35,19 @@ class VisitVoucherSerializer(serializers.ModelSerializer):
         if obj.status == 'ACCEPTED' and obj.property.latitude and obj.property.longitude:
             return f"https://www.google.com/maps/search/?api=1&query={obj.property.latitude},{obj.property.longitude}"
         return None
+
+
+class AgentStatsSerializer(serializers.ModelSerializer):
+    agent_username = serializers.ReadOnlyField(source='agent.username')
+    visits_done = serializers.IntegerField(source='visits_validated', read_only=True)
+    reputation_score = serializers.FloatField(read_only=True)
+    acceptance_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = AgentStats
+        fields = [
+            'agent', 'agent_username', 'visits_requested', 'visits_accepted', 'visits_done',
+            'visits_rejected', 'visits_missed', 'visits_cancelled',
+            'rating_count', 'reputation_score', 'acceptance_rate'
+        ]
+        read_only_fields = fields
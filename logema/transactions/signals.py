@@ -0,0 +1,28 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .agent_stats import move_visit, visit_state
+from .models import VisitVoucher
+
+
+@receiver(pre_save, sender=VisitVoucher)
+def visit_pre_save(sender, instance, raw=False, **kwargs):
+    # État précédent (agent, statut, note) pour ajuster les statistiques de l'agent
+    instance._previous_stats_state = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_stats_state = VisitVoucher.objects.filter(pk=instance.pk).values_list(
+        'agent_id', 'status', 'rating'
+    ).first()
+
+
+@receiver(post_save, sender=VisitVoucher)
+def visit_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    move_visit(getattr(instance, '_previous_stats_state', None), visit_state(instance))
+
+
+@receiver(post_delete, sender=VisitVoucher)
+def visit_deleted(sender, instance, **kwargs):
+    move_visit(visit_state(instance), None)
@@ -317,3 +317,70 @@ class VisitVoucherTests(TestCase):
         
         self.assertEqual(self.property.visits.count(), 2)
         self.assertNotEqual(visit1.visitor, visit2.visitor)
+
+
+class OccupationRequestVisibilityTests(TestCase):
+    """Visibilité des demandes d'occupation via l'API"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.region = Region.objects.create(name="Conakry")
+        self.prefecture = Prefecture.objects.create(name="Kaloum", region=self.region)
+        self.sous_prefecture = SousPrefecture.objects.create(name="Kaloum Centre", prefecture=self.prefecture)
+        self.ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=self.sous_prefecture)
+        self.quartier = Quartier.objects.create(name="Almamya", ville=self.ville)
+        self.secteur = Secteur.objects.create(name="Secteur 1", quartier=self.quartier)
+
+        self.tenant = User.objects.create_user(username='tenant', password='pass123')
+        self.owner = User.objects.create_user(username='owner', password='pass123', is_proprietaire=True)
+        self.agent = User.objects.create_user(username='agent', password='pass123', is_demarcheur=True)
+        self.stranger = User.objects.create_user(username='stranger', password='pass123')
+
+        self.managed = Property.objects.create(
+            owner=self.owner, agent=self.agent, title="Bien géré", description="Test",
+            property_type="APPARTEMENT", price=5000000, secteur=self.secteur
+        )
+        self.self_managed = Property.objects.create(
+            owner=self.owner, title="Bien du propriétaire", description="Test",
+            property_type="APPARTEMENT", price=3000000, secteur=self.secteur
+        )
+        self.on_managed = OccupationRequest.objects.create(property=self.managed, user=self.tenant)
+        self.on_self_managed = OccupationRequest.objects.create(property=self.self_managed, user=self.tenant)
+        self.client = APIClient()
+
+    def visible_ids(self, user):
+        self.client.force_authenticate(user=user)
+        response = self.client.get('/api/occupations/')
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.data}
+
+    def test_each_role_sees_its_requests(self):
+        self.assertEqual(self.visible_ids(self.tenant), {self.on_managed.id, self.on_self_managed.id})
+        self.assertEqual(self.visible_ids(self.owner), {self.on_managed.id, self.on_self_managed.id})
+        self.assertEqual(self.visible_ids(self.agent), {self.on_managed.id})
+        self.assertEqual(self.visible_ids(self.stranger), set())
+
+    def test_list_query_count_is_constant(self):
+        """Bien et locataire sont chargés avec la liste, sans requête par ligne."""
+        for i in range(5):
+            OccupationRequest.objects.create(
+                property=self.managed,
+                user=User.objects.create_user(username=f'tenant_{i}', password='pass123')
+            )
+        self.client.force_authenticate(user=self.owner)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/occupations/')
+
+        self.assertEqual(len(response.data), 7)
+        self.assertEqual(response.data[0]['property_title'], "Bien géré")
+
+    def test_owner_can_validate_request_on_own_property(self):
+        self.client.force_authenticate(user=self.owner)
+
+        response = self.client.post(f'/api/occupations/{self.on_self_managed.id}/validate_occupation/')
+
+        self.assertEqual(response.status_code, 200)
+        self.on_self_managed.refresh_from_db()
+        self.assertEqual(self.on_self_managed.status, 'VALIDATED')
@@ -1,3 +1,5 @@
+from io import StringIO
+
 from django.test import TestCase
 from accounts.models import User
 from properties.models import Property
@@ -110,3 +112,128 @@ class VisitTests(TestCase):
         voucher.save()
         serializer = VisitVoucherSerializer(voucher)
         self.assertIsNone(serializer.data['location_link'])
+
+
+class AgentStatsTests(TestCase):
+    """Statistiques et réputation des agents maintenues par delta"""
+
+    def setUp(self):
+        from rest_framework.test import APIClient
+
+        self.region = Region.objects.create(name="Conakry")
+        self.prefecture = Prefecture.objects.create(name="Ratoma", region=self.region)
+        self.sous_prefecture = SousPrefecture.objects.create(name="Ratoma Centre", prefecture=self.prefecture)
+        self.ville = Ville.objects.create(name="Conakry Ville", sous_prefecture=self.sous_prefecture)
+        self.quartier = Quartier.objects.create(name="Kipé", ville=self.ville)
+        self.secteur = Secteur.objects.create(name="Secteur 3", quartier=self.quartier)
+
+        self.agent = User.objects.create_user(username='agent_stats', password='password', is_demarcheur=True)
+        self.visitor = User.objects.create_user(username='visitor_stats', password='password')
+        self.prop = Property.objects.create(
+            owner=self.agent,
+            agent=self.agent,
+            title="Appartement stats",
+            property_type="APPARTEMENT",
+            price=2000000,
+            secteur=self.secteur
+        )
+        self.client = APIClient()
+
+    def create_visit(self, **kwargs):
+        kwargs.setdefault('status', 'REQUESTED')
+        return VisitVoucher.objects.create(
+            property=self.prop, visitor=self.visitor, agent=self.agent, validation_code="123456", **kwargs
+        )
+
+    def test_status_counters_follow_visits(self):
+        """Chaque visite compte dans le compteur de son statut courant."""
+        from transactions.models import AgentStats
+
+        accepted = self.create_visit()
+        rejected = self.create_visit()
+        missed = self.create_visit()
+        accepted.status = 'ACCEPTED'
+        accepted.save()
+        rejected.status = 'REJECTED'
+        rejected.save()
+        missed.status = 'MISSED'
+        missed.save()
+        self.create_visit()
+
+        stats = AgentStats.objects.get(agent=self.agent)
+        self.assertEqual(stats.visits_requested, 1)
+        self.assertEqual(stats.visits_accepted, 1)
+        self.assertEqual(stats.visits_rejected, 1)
+        self.assertEqual(stats.visits_missed, 1)
+        # Acceptées (ACCEPTED + MISSED) sur réponses (+ REJECTED)
+        self.assertEqual(stats.acceptance_rate, 0.67)
+
+        missed.delete()
+        stats.refresh_from_db()
+        self.assertEqual(stats.visits_missed, 0)
+
+    def test_rate_visit_updates_reputation_incrementally(self):
+        """Noter une visite coûte un nombre de requêtes indépendant du nombre de notes de l'agent."""
+        for rating in (4, 5, 3):
+            self.create_visit(status='VALIDATED', rating=rating)
+        visit = self.create_visit(status='VALIDATED')
+        self.client.force_authenticate(user=self.visitor)
+
+        with self.assertNumQueries(7):
+            response = self.client.post(f'/api/visits/{visit.id}/rate_visit/', {'rating': 2}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        self.agent.refresh_from_db()
+        self.assertEqual(self.agent.reputation_score, 3.5)
+
+        # Une nouvelle note remplace l'ancienne
+        self.client.post(f'/api/visits/{visit.id}/rate_visit/', {'rating': 4}, format='json')
+        self.agent.refresh_from_db()
+        self.assertEqual(self.agent.reputation_score, 4.0)
+        self.assertEqual(self.agent.agent_stats.rating_count, 4)
+
+    def test_rate_visit_rejects_invalid_rating(self):
+        visit = self.create_visit(status='VALIDATED')
+        self.client.force_authenticate(user=self.visitor)
+
+        response = self.client.post(f'/api/visits/{visit.id}/rate_visit/', {'rating': 9}, format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.agent.refresh_from_db()
+        self.assertEqual(self.agent.reputation_score, 5.0)
+
+    def test_recount_repairs_drift(self):
+        """recount_agent_stats recalcule les compteurs et la réputation depuis les visites."""
+        from django.core.management import call_command
+        from transactions.models import AgentStats
+
+        self.create_visit(status='VALIDATED', rating=4)
+        self.create_visit(status='VALIDATED', rating=2)
+        AgentStats.objects.filter(agent=self.agent).update(visits_validated=10, rating_count=1, rating_sum=5)
+        VisitVoucher.objects.filter(agent=self.agent).update(status='MISSED')
+
+        call_command('recount_agent_stats', stdout=StringIO())
+
+        stats = AgentStats.objects.get(agent=self.agent)
+        self.assertEqual(stats.visits_validated, 0)
+        self.assertEqual(stats.visits_missed, 2)
+        self.assertEqual((stats.rating_count, stats.rating_sum), (2, 6))
+        self.agent.refresh_from_db()
+        self.assertEqual(self.agent.reputation_score, 3.0)
+
+    def test_agent_stats_endpoint(self):
+        self.create_visit(status='VALIDATED', rating=5)
+        self.create_visit(status='REJECTED')
+        self.client.force_authenticate(user=self.visitor)
+
+        response = self.client.get('/api/visits/agent-stats/', {'agent': self.agent.id})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['visits_done'], 1)
+        self.assertEqual(response.data['visits_rejected'], 1)
+        self.assertEqual(response.data['reputation_score'], 5.0)
+        self.assertEqual(response.data['acceptance_rate'], 0.5)
+
+        response = self.client.get('/api/visits/agent-stats/')
+        self.assertEqual(response.data['visits_done'], 0)
+        self.assertIsNone(response.data['acceptance_rate'])
@@ -1,13 +1,15 @@
 
 from django.db import models
 from django.shortcuts import render
-from django.db import models
 from django.utils.crypto import get_random_string
 from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from .agent_stats import get_agent_stats
 from .models import OccupationRequest, VisitVoucher
-from .serializers import OccupationRequestSerializer, VisitVoucherSerializer
+from .serializers import AgentStatsSerializer, OccupationRequestSerializer, VisitVoucherSerializer
+from accounts.models import User
+from accounts.notifications import notify_user
 from properties.models import Property
 
 class OccupationRequestViewSet(viewsets.ModelViewSet):
@@ -19,17 +21,23 @@ class OccupationRequestViewSet(viewsets.ModelViewSet):
         serializer.save(user=self.request.user)
 
     def get_queryset(self):
-        # Users see their requests, Agents/Owners see requests on their properties
+        """
+        Demandes visibles : celles du locataire et celles des biens dont
+        l'utilisateur est propriétaire ou démarcheur, en une requête.
+        """
         user = self.request.user
-        if user.is_demarcheur or user.is_proprietaire:
-             # Logic could be refined: agent sees requests on properties they manage
-             return OccupationRequest.objects.filter(property__agent=user) | OccupationRequest.objects.filter(user=user)
+        # Sous-requête sur les index owner / agent des biens plutôt qu'un OR de jointures
+        managed_properties = Property.objects.filter(models.Q(owner=user) | models.Q(agent=user)).values('pk')
+        return OccupationRequest.objects.filter(
+            models.Q(user=user) | models.Q(property__in=managed_properties)
+        ).select_related('property', 'user').order_by('-created_at')
+
     @action(detail=True, methods=['post'])
     def validate_occupation(self, request, pk=None):
         """Démarcheur valide le dossier de réservation"""
         occupation = self.get_object()
         # Verify if user is the agent of the property
-        if request.user != occupation.property.agent and request.user != occupation.property.owner:
+        if request.user.pk not in (occupation.property.agent_id, occupation.property.owner_id):
             return Response({"error": "Non autorisé"}, status=403)
             
         if occupation.status != 'PENDING':
@@ -45,8 +53,8 @@ class OccupationRequestViewSet(viewsets.ModelViewSet):
         occupation = self.get_object()
         
         # Check permissions
-        is_agent = (request.user == occupation.property.agent or request.user == occupation.property.owner)
-        is_tenant = (request.user == occupation.user)
+        is_agent = request.user.pk in (occupation.property.agent_id, occupation.property.owner_id)
+        is_tenant = (request.user.pk == occupation.user_id)
         
         if not is_agent and not is_tenant:
              return Response({"error": "Non autorisé"}, status=403)
@@ -118,6 +126,11 @@ class VisitVoucherViewSet(viewsets.ModelViewSet):
         
         visit.status = 'ACCEPTED'
         visit.save()
+        notify_user(
+            visit.visitor,
+            f"Votre demande de visite pour « {visit.property.title} » a été acceptée.",
+            kind='VISIT_ACCEPTED'
+        )
         return Response({"status": "Visite acceptée"})
 
     @action(detail=True, methods=['post'])
@@ -150,7 +163,7 @@ class VisitVoucherViewSet(viewsets.ModelViewSet):
         Visitor rates the visit after it has been validated.
         """
         visit = self.get_object()
-        if request.user != visit.visitor:
+        if request.user.pk != visit.visitor_id:
              return Response({"error": "Seul le visiteur peut noter"}, status=403)
              
         if visit.status != 'VALIDATED':
@@ -160,23 +173,29 @@ class VisitVoucherViewSet(viewsets.ModelViewSet):
         comment = request.data.get('comment', '')
         
         if rating:
+            try:
+                rating = int(rating)
+            except (TypeError, ValueError):
+                return Response({"error": "Note invalide"}, status=400)
+            if not 1 <= rating <= 5:
+                return Response({"error": "La note doit être comprise entre 1 et 5"}, status=400)
+
+            # La réputation de l'agent est mise à jour par delta (transactions.signals)
             visit.rating = rating
             visit.comment = comment
-            visit.save()
-            
-            # Update Agent Reputation (simple average logic)
-            agent = visit.agent
-            current_score = agent.reputation_score
-            # Ideal: Recalculate average from all ratings. existing score is simple float.
-            # Weighted average update for simplicity or re-aggregation
-            # simplified: 
-            # new_score = (old * n + new) / (n+1) -> but we don't store N
-            # Let's just do a 10% movement for now or Re-aggregate if heavy
-            # Better: Aggregate
-            avg = VisitVoucher.objects.filter(agent=agent, rating__isnull=False).aggregate(models.Avg('rating'))
-            if avg['rating__avg']:
-                agent.reputation_score = round(avg['rating__avg'], 1)
-                agent.save()
+            visit.save(update_fields=['rating', 'comment', 'updated_at'])
                 
             return Response({"status": "Note enregistrée"})
         return Response({"error": "Note requise"}, status=400)
+
+    @action(detail=False, methods=['get'], url_path='agent-stats')
+    def agent_stats(self, request):
+        """
+        Statistiques d'un agent (?agent=<id>, par défaut l'utilisateur connecté),
+        lues sur une seule ligne d'AgentStats.
+        """
+        agent_id = request.query_params.get('agent') or request.user.pk
+        agent = User.objects.filter(pk=agent_id).first() if str(agent_id).isdigit() else None
+        if agent is None:
+            return Response({"error": "Agent introuvable"}, status=404)
+        return Response(AgentStatsSerializer(get_agent_stats(agent)).data)